@@ -100,3 +100,15 @@ class AbstractExpression(ABC):
     @abstractmethod
     def evaluate(self, *args):
         NotImplementedError('Must be implemented in subclasses.')
+
+    def compile(self):
+        """
+        Compiles the expression tree rooted at this node into a single
+        callable with the same signature and outcome as `evaluate`.
+        Subclasses override it to resolve operators and constants once,
+        at plan time, instead of on every call.
+
+        Returns:
+            Callable
+        """
+        return self.evaluate
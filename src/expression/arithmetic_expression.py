@@ -1,6 +1,15 @@
+import operator
+
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType, ExpressionReturnType
 
+_ARITHMETIC_OPERATORS = {
+    ExpressionType.ARITHMETIC_ADD: operator.add,
+    ExpressionType.ARITHMETIC_SUBTRACT: operator.sub,
+    ExpressionType.ARITHMETIC_MULTIPLY: operator.mul,
+    ExpressionType.ARITHMETIC_DIVIDE: operator.truediv,
+}
+
 
 class ArithmeticExpression(AbstractExpression):
 
@@ -27,3 +36,8 @@ class ArithmeticExpression(AbstractExpression):
         elif(self.etype == ExpressionType.ARITHMETIC_DIVIDE):
             return vl / vr
 
+    def compile(self):
+        operation = _ARITHMETIC_OPERATORS[self.etype]
+        left = self.get_child(0).compile()
+        right = self.get_child(1).compile()
+        return lambda *args: operation(left(*args), right(*args))
@@ -1,6 +1,18 @@
+import numpy as np
+
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType, \
     ExpressionReturnType
+from src.expression.expression_utils import as_array, compare
+
+_COMPARISON_UFUNCS = {
+    ExpressionType.COMPARE_EQUAL: np.equal,
+    ExpressionType.COMPARE_GREATER: np.greater,
+    ExpressionType.COMPARE_LESSER: np.less,
+    ExpressionType.COMPARE_GEQ: np.greater_equal,
+    ExpressionType.COMPARE_LEQ: np.less_equal,
+    ExpressionType.COMPARE_NEQ: np.not_equal,
+}
 
 
 class ComparisonExpression(AbstractExpression):
@@ -15,27 +27,38 @@ class ComparisonExpression(AbstractExpression):
                          children=children)
 
     def evaluate(self, *args):
-        left_values = self.get_child(0).evaluate(*args)
+        """
+        Returns:
+            np.ndarray: boolean outcome of the comparison per value
+        """
+        left_values = as_array(self.get_child(0).evaluate(*args))
         right_values = self.get_child(1).evaluate(*args)
 
-        # Broadcasting scalars
-        if type(right_values) is not list:
-            right_values = [right_values] * len(left_values)
-        # TODO implement a better way to compare value_left and value_right
-        # Implement a generic return type
-        outcome = []
-        for value_left, value_right in zip(left_values, right_values):
-            if self.etype == ExpressionType.COMPARE_EQUAL:
-                outcome.append(value_left == value_right)
-            elif self.etype == ExpressionType.COMPARE_GREATER:
-                outcome.append(value_left > value_right)
-            elif self.etype == ExpressionType.COMPARE_LESSER:
-                outcome.append(value_left < value_right)
-            elif self.etype == ExpressionType.COMPARE_GEQ:
-                outcome.append(value_left >= value_right)
-            elif self.etype == ExpressionType.COMPARE_LEQ:
-                outcome.append(value_left <= value_right)
-            elif self.etype == ExpressionType.COMPARE_NEQ:
-                outcome.append(value_left != value_right)
-
-        return outcome
+        # Scalars are broadcast by the ufunc
+        if isinstance(right_values, (list, tuple)):
+            right_values = as_array(right_values)
+        return compare(_COMPARISON_UFUNCS[self.etype], left_values,
+                       right_values)
+
+    def compile(self):
+        ufunc = _COMPARISON_UFUNCS[self.etype]
+        left = self.get_child(0).compile()
+        right_child = self.get_child(1)
+
+        if right_child.etype == ExpressionType.CONSTANT_VALUE:
+            right_value = right_child.evaluate()
+            if isinstance(right_value, (list, tuple)):
+                right_value = as_array(right_value)
+
+            def _compare_constant(*args):
+                return compare(ufunc, as_array(left(*args)), right_value)
+            return _compare_constant
+
+        right = right_child.compile()
+
+        def _compare(*args):
+            right_values = right(*args)
+            if isinstance(right_values, (list, tuple)):
+                right_values = as_array(right_values)
+            return compare(ufunc, as_array(left(*args)), right_values)
+        return _compare
@@ -14,5 +14,9 @@ class ConstantValueExpression(AbstractExpression):
     def evaluate(self, *args):
         return self._value
 
+    def compile(self):
+        value = self._value
+        return lambda *args: value
+
     # ToDo implement other functinalities like maintaining hash
     # comparing two objects of this class(==)
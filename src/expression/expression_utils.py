@@ -0,0 +1,72 @@
+from typing import Callable
+
+import numpy as np
+
+from src.expression.abstract_expression import AbstractExpression
+
+
+def as_array(values) -> np.ndarray:
+    """
+    Converts the values returned by an expression into a one dimensional
+    array. Values which can not be stored in a flat typed array (e.g.
+    predictions or nested lists) are stored in an object array.
+
+    Arguments:
+        values (list or np.ndarray): values of an expression
+
+    Returns:
+        np.ndarray
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is None or array.ndim > 1:
+        array = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            array[i] = value
+    return array
+
+
+def compare(ufunc: np.ufunc, left_values: np.ndarray,
+            right_values) -> np.ndarray:
+    """
+    Applies the comparison ufunc on the values. Scalars on the right hand
+    side are broadcast by the ufunc.
+
+    Arguments:
+        ufunc (np.ufunc): comparison function e.g. np.equal
+        left_values (np.ndarray): values of the left expression
+        right_values (np.ndarray or scalar): values of the right expression
+
+    Returns:
+        np.ndarray: boolean outcome per value
+    """
+    try:
+        outcome = ufunc(left_values, right_values)
+    except TypeError:
+        # No typed loop for the operands (e.g. numbers against strings),
+        # fallback to comparing the python objects
+        outcome = ufunc(left_values.astype(object), right_values)
+    return np.asarray(outcome, dtype=bool)
+
+
+def compile_expression(expression) -> Callable:
+    """
+    Returns the callable used for evaluating the predicate of a plan.
+    Expression trees are compiled into a single closure, any other object
+    is evaluated through its `evaluate` method.
+
+    Arguments:
+        expression (AbstractExpression): predicate to compile
+
+    Returns:
+        Callable (None if there is no predicate)
+    """
+    if expression is None:
+        return None
+    if isinstance(expression, AbstractExpression):
+        return expression.compile()
+    return expression.evaluate
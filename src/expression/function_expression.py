@@ -3,7 +3,10 @@ from typing import Callable
 
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType
+from src.models.catalog.video_info import VideoMetaInfo
 from src.models.storage.batch import FrameBatch
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.udfs.udf_cache import CachedClassifierUDF, UDFResultCache
 
 
 @unique
@@ -29,16 +32,27 @@ class FunctionExpression(AbstractExpression):
         is_temp (bool, default:False): In case of EXEC type, decides if the
         outcome needs to be stored in BatchFrame temporarily.
 
+        video (VideoMetaInfo, optional): video the evaluated frames belong
+        to, required with udf_cache
+
+        udf_cache (UDFResultCache, optional): if func is a classifier UDF,
+        its predictions are stored in and read back from the cache, keyed
+        by video file, frame index, UDF name and version
+
     """
 
     def __init__(self, func: Callable,
                  mode: ExecutionMode = ExecutionMode.EVAL, name=None,
-                 is_temp: bool = False,
+                 is_temp: bool = False, video: VideoMetaInfo = None,
+                 udf_cache: UDFResultCache = None,
                  **kwargs):
         if mode == ExecutionMode.EXEC:
             assert name is not None
 
         super().__init__(ExpressionType.FUNCTION_EXPRESSION, **kwargs)
+        if udf_cache is not None and isinstance(func, AbstractClassifierUDF):
+            assert video is not None
+            func = CachedClassifierUDF(func, video, udf_cache)
         self.mode = mode
         self.name = name
         self.function = func
@@ -58,3 +72,18 @@ class FunctionExpression(AbstractExpression):
             batch.set_outcomes(self.name, outcome, is_temp=self.is_temp)
 
         return outcome
+
+    def compile(self):
+        function = self.function
+        child = None
+        if self.get_children_count() > 0:
+            child = self.get_child(0).compile()
+        name = self.name if self.mode == ExecutionMode.EXEC else None
+        is_temp = self.is_temp
+
+        def _evaluate(batch: FrameBatch):
+            outcome = function(child(batch) if child else batch)
+            if name is not None:
+                batch.set_outcomes(name, outcome, is_temp=is_temp)
+            return outcome
+        return _evaluate
@@ -1,6 +1,51 @@
+import numpy as np
+
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType, \
     ExpressionReturnType
+from src.expression.expression_utils import as_array
+from src.models.storage.batch import FrameBatch
+
+_LOGICAL_UFUNCS = {
+    ExpressionType.LOGICAL_AND: np.logical_and,
+    ExpressionType.LOGICAL_OR: np.logical_or,
+}
+
+
+def _evaluate_with_selection(etype: ExpressionType, left, right, *args):
+    """
+    Evaluates AND/OR using a selection vector. The right expression only
+    sees the frames left undecided by the left one (accepted for AND,
+    rejected for OR) and its outcome is scattered back. Without a
+    FrameBatch to select from, both sides are evaluated on all values.
+
+    Arguments:
+        etype (ExpressionType): LOGICAL_AND or LOGICAL_OR
+        left (Callable): evaluates the left expression
+        right (Callable): evaluates the right expression
+
+    Returns:
+        np.ndarray: boolean outcome per value
+    """
+    left_values = as_array(left(*args)).astype(bool)
+    if etype == ExpressionType.LOGICAL_AND:
+        undecided = np.flatnonzero(left_values)
+    else:
+        undecided = np.flatnonzero(~left_values)
+    if len(undecided) == 0:
+        return left_values
+
+    batch = args[0] if args else None
+    if not isinstance(batch, FrameBatch) or \
+            len(undecided) == len(left_values):
+        right_values = as_array(right(*args)).astype(bool)
+        return _LOGICAL_UFUNCS[etype](left_values, right_values)
+
+    selection = batch[undecided]
+    right_values = as_array(right(selection, *args[1:])).astype(bool)
+    batch.scatter_outcomes(selection, undecided)
+    left_values[undecided] = right_values
+    return left_values
 
 
 class LogicalExpression(AbstractExpression):
@@ -15,19 +60,32 @@ class LogicalExpression(AbstractExpression):
                          children=children)
 
     def evaluate(self, *args):
+        """
+        Returns:
+            np.ndarray: boolean outcome per value
+        """
         if self.get_children_count() == 2:
-            outcomes = []
-            left_values = self.get_child(0).evaluate(*args)
-            right_values = self.get_child(1).evaluate(*args)
-            for value_left, value_right in zip(left_values, right_values):
-                if self.etype == ExpressionType.LOGICAL_AND:
-                    outcomes.append(value_left and value_right)
-                elif self.etype == ExpressionType.LOGICAL_OR:
-                    outcomes.append(value_left or value_right)
-            return outcomes
+            return _evaluate_with_selection(self.etype,
+                                            self.get_child(0).evaluate,
+                                            self.get_child(1).evaluate,
+                                            *args)
 
         else:
-            values = self.get_child(0).evaluate(*args)
+            values = as_array(self.get_child(0).evaluate(*args))
 
             if self.etype == ExpressionType.LOGICAL_NOT:
-                return [not value for value in values]
+                return np.logical_not(values.astype(bool))
+
+    def compile(self):
+        if self.get_children_count() == 2:
+            etype = self.etype
+            left = self.get_child(0).compile()
+            right = self.get_child(1).compile()
+
+            def _combine(*args):
+                return _evaluate_with_selection(etype, left, right, *args)
+            return _combine
+
+        child = self.get_child(0).compile()
+        return lambda *args: np.logical_not(as_array(child(*args))
+                                            .astype(bool))
@@ -30,9 +30,17 @@ class TupleValueExpression(AbstractExpression):
         tuple1 = args[0]
         return tuple1[(self._col_idx)]
 
+    def compile(self):
+        col_idx = self._col_idx
+        return lambda *args: args[0][col_idx]
+
     # ToDo
     # implement other boilerplate functionality
 
+    @property
+    def col_idx(self) -> int:
+        return self._col_idx
+
     @property
     def col_name(self) -> str:
         return self._col_name
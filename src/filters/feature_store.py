@@ -0,0 +1,73 @@
+"""
+Cache of preprocessed features shared by the filters
+
+@Jaeho Bang
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FeatureStore:
+  """
+  Keeps the output of preprocessing transforms (PCA, downsampling, ...) so that each transform of an
+  input is computed once and shared by every classifier that consumes it, at train and at inference time.
+
+  Entries are keyed by the name of the transform and the identity of the input data: a key given by the
+  caller (e.g. video and frame range), else a fingerprint hashing the data. Callers transforming a batch
+  with several transforms should compute its key once. A transform which is retrained must be
+  invalidated. Cached features are read only, except identity transforms which return the caller's array.
+
+  :param max_entries: number of transformed inputs kept, least recently used ones are dropped first
+  """
+
+  def __init__(self, max_entries=8):
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+
+  @staticmethod
+  def fingerprint(X):
+    """
+    Key of X hashing its content, for inputs the caller has no identity for
+    """
+    X = np.ascontiguousarray(X)
+    digest = hashlib.blake2b(X.view(np.uint8).reshape(-1), digest_size=16).hexdigest()
+    return X.shape, X.dtype.str, digest
+
+  def get(self, name, transform, X, key=None):
+    """
+    :param name: name of the transform
+    :param transform: function computing the features of X, only called on a miss
+    :param X: input data
+    :param key: hashable identity of X, the fingerprint of X if None
+    :return: transform(X)
+    """
+    key = (name, self.fingerprint(X) if key is None else key)
+    if key in self._entries:
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return self._entries[key]
+
+    self.misses += 1
+    features = transform(X)
+    if isinstance(features, np.ndarray) and features is not X:
+      features.setflags(write=False)
+    self._entries[key] = features
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+    return features
+
+  def invalidate(self, name=None):
+    """
+    Drops the cached features of a transform, of all of them if name is None
+    """
+    for key in list(self._entries):
+      if name is None or key[0] == name:
+        del self._entries[key]
+
+  def __len__(self):
+    return len(self._entries)
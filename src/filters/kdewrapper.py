@@ -1,5 +1,5 @@
 import numpy as np
-from sklearn.neighbors.kde import KernelDensity
+from sklearn.neighbors import KernelDensity
 
 
 
@@ -55,7 +55,7 @@ class KernelDensityWrapper:
         scores.append( probs )
     scores = np.array(scores)
 
-    return np.argmax(scores, axis = 1)
+    return np.argmax(scores, axis = 0)
 
   def score(self, X, y):
     assert len(self.kernels) != 0
@@ -7,7 +7,7 @@ This file is composed of the composing preliminary and post filtering techniques
 import numpy as np
 import pandas as pd
 
-from copy import deepcopy
+from src.filters.feature_store import FeatureStore
 from src.filters.abstract_filter import FilterTemplate
 from src.filters.models.ml_randomforest import MLRandomForest
 
@@ -42,6 +42,8 @@ class FilterMinimum(FilterTemplate):
     self.pre_models = {}
     self.post_models = {}
     self.all_models = {}
+    # features of the pre models, shared by all the post models trained on them
+    self.features = FeatureStore()
 
     rf = MLRandomForest()
     self.addPostModel('rf', rf)
@@ -62,7 +64,7 @@ class FilterMinimum(FilterTemplate):
       for pre_model_name in pre_model_names:
         if pre_model_name not in self.all_models[post_model_name]:
           self.all_models[post_model_name][pre_model_name] = (self.pre_models[pre_model_name],
-                                                              deepcopy(self.post_models[post_model_name]))
+                                                              self.post_models[post_model_name].clone())
 
 
 
@@ -122,21 +124,24 @@ class FilterMinimum(FilterTemplate):
       print("  ", self.post_models.keys(), "are available")
 
 
-  def train(self, X:np.ndarray, y:np.ndarray):
+  def train(self, X:np.ndarray, y:np.ndarray, key=None):
     for post_model_name, post_model in self.post_models.items():
       post_model.train(X, y)
 
     for pre_model_name, pre_model in self.pre_models.items():
       pre_model.train(X,y)
+      self.features.invalidate(pre_model_name)
 
+    # X is hashed once for all the pre models, unless the caller gives its identity (video, frame range)
+    key = self.features.fingerprint(X) if key is None else key
     for post_model_names, internal_dict in self.all_models.items():
       for pre_model_names, pre_post_instance_pair in internal_dict.items():
         pre_model, post_model = pre_post_instance_pair
-        X_transform = pre_model.predict(X)
+        X_transform = self.features.get(pre_model_names, pre_model.predict, X, key)
         post_model.train(X_transform)
 
 
-  def predict(self, X:np.ndarray, pre_model_name:str = None, post_model_name:str = None)->np.ndarray:
+  def predict(self, X:np.ndarray, pre_model_name:str = None, post_model_name:str = None, key=None)->np.ndarray:
     pre_model_names = self.pre_models.keys()
     post_model_names = self.post_models.keys()
 
@@ -163,7 +168,7 @@ class FilterMinimum(FilterTemplate):
       return self.post_models[post_model_name].predict(X)
     else:
       pre_model, post_model = self.all_models[post_model_name][pre_model_name]
-      X_transform = pre_model.predict(X)
+      X_transform = self.features.get(pre_model_name, pre_model.predict, X, key)
       return post_model.predict(X_transform)
 
 
@@ -9,7 +9,9 @@ If any issues arise, please email jaeho.bang@gmail.com
 """
 
 from abc import ABCMeta, abstractmethod
+import copy
 import numpy as np
+from sklearn.base import clone
 
 
 
@@ -33,6 +35,16 @@ class MLBase(metaclass = ABCMeta):
   def predict(self, X:np.ndarray):
     pass
 
+  def clone(self):
+    """
+    Returns an untrained copy with the same parameters, without copying what was learned
+    """
+    new = copy.copy(self)
+    new.C = new.A = new.R = -1
+    if self.model is not None:
+      new.model = clone(self.model)
+    return new
+
 
 
 
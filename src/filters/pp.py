@@ -6,20 +6,85 @@ Outputs model statistics needed for the query optimizer
 @Jaeho Bang
 """
 
+import ctypes
+import itertools
+import multiprocessing
 import numpy as np
 import time
 
+from .feature_store import FeatureStore
 from .kdewrapper import KernelDensityWrapper
 from sklearn.svm import LinearSVC
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.decomposition import PCA
 from sklearn.neural_network import MLPClassifier
 
+# Unfitted model per model name, shared by the serial and the parallel training
+MODEL_FACTORIES = {"kde": lambda: KernelDensityWrapper(kernel='gaussian', bandwidth=0.2),
+                   "svm": lambda: LinearSVC(random_state=0),
+                   "dnn": lambda: MLPClassifier(solver='lbfgs', alpha=1e-5,
+                                                hidden_layer_sizes=(5, 2), random_state=1),
+                   "rf": lambda: RandomForestClassifier(max_depth=2, random_state=0)}
+
+LABELS = {"vehicle_type": ["car", "van", "bus", "others"],
+          "color": ["red", "white", "black", "silver"],
+          "speed": ["s>40", "s>50", "s>60", "s<65", "s<70"],
+          "intersection": ["pt335", "pt211", "pt342", "pt208"]}
+LABEL_PREFIXES = {"vehicle_type": ["t="], "color": ["c="], "intersection": ["i=", "o="]}
+SPEED_LABELS = {"s>40": (np.greater, 40), "s>50": (np.greater, 50), "s>60": (np.greater, 60),
+                "s<65": (np.less, 65), "s<70": (np.less, 70)}
+
+# Training data of a worker process of the parallel training, set once per worker
+_worker_data = {}
+
+
+def _to_shared(array):
+  """
+  Copies an array into shared memory. The result is handed to the worker processes
+  once, when they start, instead of being pickled with every task.
+  """
+  array = np.ascontiguousarray(array)
+  raw = multiprocessing.RawArray(ctypes.c_byte, max(array.nbytes, 1))
+  np.frombuffer(raw, dtype=array.dtype, count=array.size)[:] = array.ravel()
+  return raw, array.shape, array.dtype.str
+
+
+def _from_shared(shared):
+  raw, shape, dtype = shared
+  count = int(np.prod(shape))
+  return np.frombuffer(raw, dtype=np.dtype(dtype), count=count).reshape(shape)
+
+
+def _init_worker(shared_X, label_dict):
+  _worker_data["X"] = {pre: _from_shared(shared) for pre, shared in shared_X.items()}
+  _worker_data["labels"] = label_dict
+
+
+def _fit(task):
+  """
+  Fits one (preprocessing, model, label) combination in a worker process
+  """
+  pre, model_name, label = task
+  X = _worker_data["X"][pre]
+  y = _worker_data["labels"][label]
+  tic = time.time()
+  if model_name == "svm" and len(np.unique(y)) == 1:
+    return task, None, 0
+  model = MODEL_FACTORIES[model_name]()
+  model.fit(X, y)
+  return task, model, time.time() - tic
+
+
 # Meant to be a black box for trying all models available and returning statistics and model for
 # the query optimizer to choose for a given query
 
 class PP:
-  def __init__(self):
+  def __init__(self, num_workers=1):
+    """
+    :param num_workers: number of processes fitting the models in parallel, every
+    (preprocessing, model, label) combination is fitted independently
+    """
+    self.num_workers = num_workers
 
     self.model_library = {"kde": self._kde,
                           "svm": self._svm,
@@ -38,114 +103,66 @@ class PP:
                              #made this just in case there could be stats that are not saved
     self.pre_category_library = {}
     self.pre_category_stats = {"none": {"C": 0}}
+    # preprocessed images per pre model, shared by all the models and labels at train and predict time
+    self.features = FeatureStore()
 
   def _generate_binary_labels(self, X):
     """
     Example label dict is going to be {"car": [0,0,0,1,0,0,0.....],"others": [0,1,0,0,0...}
-    :param X:
+    All the labels of a column are set in one vectorized pass over its objects
+    :param X: per frame lists of values of each column, or per object columns (see _label_columns)
     :return:
     """
-
-    labels = {"vehicle_type": ["car", "van", "bus", "others"],
-                  "color": ["red", "white", "black", "silver"],
-                  "speed": ["s>40", "s>50", "s>60", "s<65", "s<70"],
-                  "intersection": ["pt335", "pt211", "pt342", "pt208"]}
-
+    if "num_frames" not in X:
+      X = self._label_columns(X)
+    num_frames = X["num_frames"]
 
     label_dict = {}
-
     for c in X:
       if c == "speed":
-        #TODO: Need some special parsing to do this
-        column_of_interest = X[c]
-        sub_labels = labels[c]
-        for item in sub_labels:
-          label_dict[item] = []
-        for data in column_of_interest:
-          for item in sub_labels:
-            label_dict[item].append(0)
-          if data == None:
-            continue
-          else:
-            for sub_data in data:
-              if sub_data == None:
-                continue
-              if sub_data > 40:
-                label_dict["s>40"][-1] = 1
-              if sub_data > 50 :
-                label_dict["s>50"][-1] = 1
-              if sub_data > 60:
-                label_dict["s>60"][-1] = 1
-              if sub_data < 65:
-                label_dict["s<65"][-1] = 1
-              if sub_data < 70:
-                label_dict["s<70"][-1] = 1
-
-      elif c == "intersection":
-        column_of_interest = X[c]
-        sub_labels = labels[c]
-        for item in sub_labels:
-          label_dict["i=" + item] = []
-          label_dict["o=" + item] = []
-        for data in column_of_interest: #column_of_interest would be vehicle type; data would be ("car", "van", "car")
-          for item in sub_labels:
-            label_dict["i=" + item].append(0)
-            label_dict["o=" + item].append(0)
-          if data == None:
-            continue
-          else:
-            for sub_data in data: #sub_data would be "car"
-              if sub_data == None:
-                continue
-              elif sub_data not in sub_labels:
-                continue
-              else:
-                label_dict["i=" + sub_data][-1] = 1
-                label_dict["o=" + sub_data][-1] = 1
-
-      elif c == "vehicle_type":
-        column_of_interest = X[c]
-        sub_labels = labels[c]
-        for item in sub_labels:
-          label_dict["t=" + item] = []
-        for data in column_of_interest: #column_of_interest would be vehicle type; data would be ("car", "van", "car")
-          for item in sub_labels:
-            label_dict["t=" + item].append(0)
-          if data == None:
-            continue
-          else:
-            for sub_data in data: #sub_data would be "car"
-              if sub_data == None:
-                continue
-              elif sub_data not in sub_labels:
-                continue
-              else:
-                label_dict["t=" + sub_data][-1] = 1
-
-      elif c == "color":
-        column_of_interest = X[c]
-        sub_labels = labels[c]
-        for item in sub_labels:
-          label_dict["c=" + item] = []
-        for data in column_of_interest: #column_of_interest would be vehicle type; data would be ("car", "van", "car")
-          for item in sub_labels:
-            label_dict["c=" + item].append(0)
-          if data == None:
-            continue
-          else:
-            for sub_data in data: #sub_data would be "car"
-              if sub_data == None:
-                continue
-              elif sub_data not in sub_labels:
-                continue
-              else:
-                label_dict["c=" + sub_data][-1] = 1
-
-    for k,v in list(label_dict.items()):
-      label_dict[k] = np.array(v)
+        frame, speed = X[c]
+        for item, (compare, threshold) in SPEED_LABELS.items():
+          label_dict[item] = np.zeros(num_frames, dtype=int)
+          label_dict[item][frame[compare(speed, threshold)]] = 1
+
+      elif c in LABEL_PREFIXES:
+        frame, codes, vocabulary = X[c]
+        sub_labels = LABELS[c]
+        # position in sub_labels of every object, -1 for values which are not labels and missing (-1) codes
+        positions = np.array([sub_labels.index(value) if value in sub_labels else -1
+                              for value in vocabulary] + [-1])[codes]
+        found = positions >= 0
+        hits = np.zeros((len(sub_labels), num_frames), dtype=int)
+        hits[positions[found], frame[found]] = 1
+        for item, hit in zip(sub_labels, hits):
+          for prefix in LABEL_PREFIXES[c]:
+            label_dict[prefix + item] = hit.copy()
 
     return label_dict
 
+
+  def _label_columns(self, X):
+    """
+    Flattens per frame lists of values into per object columns
+    {"num_frames": n, "speed": (frame, speed), "vehicle_type": (frame, codes, vocabulary), ...}
+    :param X: {"vehicle_type": [["car", "van"], None, ["car"], ...], "speed": [[40.5, 12.], None, ...], ...}
+    :return:
+    """
+    columns = {"num_frames": max([len(column) for column in X.values()] + [0])}
+    for c, column in X.items():
+      if c not in LABELS:
+        continue
+      per_frame = [data if data is not None else [] for data in column]
+      frame = np.repeat(np.arange(len(per_frame)), [len(data) for data in per_frame])
+      values = list(itertools.chain.from_iterable(per_frame))
+      if c == "speed":
+        columns[c] = (frame, np.array([np.nan if value is None else value for value in values], dtype=float))
+      else:
+        vocabulary = {}
+        codes = np.array([vocabulary.setdefault(value, len(vocabulary)) for value in values], dtype=np.int64)
+        columns[c] = (frame, codes, list(vocabulary))
+    return columns
+
   def _reshape_image(self, X):
     print(('inside reshape images, shape of image dataseries is ' + str(X.shape)))
     reduction_rate = 12
@@ -178,11 +195,11 @@ class PP:
 
 
 
-  def train_all(self, image_matrix, data_table):
+  def train_all(self, image_matrix, data_table, key=None):
     label_dict = self._generate_binary_labels(data_table)
     image_reshaped = self._reshape_image(image_matrix)
 
-    X_preprocessed = self._preprocess(image_reshaped, label_dict)
+    X_preprocessed = self._preprocess(image_reshaped, label_dict, key)
     X_train, X_val, label_dict_train, label_dict_val = self._split_train_val(X_preprocessed, label_dict)
     self._process(X_train, label_dict_train)
     self._evaluate(X_val, label_dict_val)
@@ -190,18 +207,50 @@ class PP:
 
 
   def _process(self, X, label_dict):
+    if self.num_workers > 1:
+      self._process_parallel(X, label_dict)
+      return
     for process_method in X:
       for model in self.model_library:
         self.model_library[model]([X[process_method], label_dict, process_method])
 
 
-  def _preprocess(self, X, label_dict):
+  def _process_parallel(self, X, label_dict):
+    """
+    Fits the combinations on a process pool. The preprocessed images live in shared
+    memory, only the task names and the fitted models are pickled.
+    """
+    shared_X = {pre: _to_shared(X[pre]) for pre in X}
+    tasks = [(pre, model_name, label) for pre in X
+             for model_name in self.model_library for label in label_dict]
+    pool = multiprocessing.Pool(self.num_workers, initializer=_init_worker,
+                                initargs=(shared_X, label_dict))
+    try:
+      for (pre, model_name, label), model, seconds in pool.imap_unordered(_fit, tasks):
+        if model is None:
+          continue
+        name = pre + "/" + model_name
+        self.category_library.setdefault(label, {})[name] = model
+        self.category_stats.setdefault(label, {})[name] = {
+          "C": round(seconds + self.pre_category_stats[pre]["C"], 2)}
+    finally:
+      pool.close()
+      pool.join()
+
+
+  def _preprocess(self, X, label_dict, key=None):
     X_preprocessed = {}
+    # the images are hashed once for all the pre models
+    key = self.features.fingerprint(X) if key is None else key
     for model in self.pre_model_library:
-      X_preprocessed[model], _ = self.pre_model_library[model]([X,label_dict])
+      X_preprocessed[model] = self._pre_features(model, X, key)
     return X_preprocessed
 
 
+  def _pre_features(self, pre, X, key=None):
+    return self.features.get(pre, lambda X: self.pre_model_library[pre]([X, {}])[0], X, key)
+
+
   def _evaluate(self, X_test, label_dict):
     """
 
@@ -227,12 +276,16 @@ class PP:
         self.category_stats[category_name][model_name]["R"] = 1 - float(sum(y_hat)) / len(y_hat)
 
 
-  def predict(self, X_test, category_name, model_name):
+  def predict(self, X_test, category_name, model_name, key=None):
+    """
+    :param key: identity of X_test (e.g. video and frame range), its features are then looked up without
+    hashing the images, see FeatureStore
+    """
     X_test_reduced = self._reshape_image(X_test)
 
     model = self.category_library[category_name][model_name]
     pre, pro = model_name.split("/")
-    X_pre, _ = self.pre_model_library[pre]([X_test_reduced, {}])
+    X_pre = self._pre_features(pre, X_test_reduced, key)
     y_hat = model.predict(X_pre)
     return y_hat
 
@@ -242,7 +295,7 @@ class PP:
     X, label_dict, pre = args
     for label in label_dict:
       tic = time.time()
-      rf = RandomForestClassifier(max_depth=2, random_state=0)
+      rf = MODEL_FACTORIES["rf"]()
       rf.fit(X, label_dict[label])
       if label not in self.category_library:
         self.category_library[label] = {}
@@ -258,8 +311,7 @@ class PP:
     X, label_dict, pre = args
     for label in label_dict:
       tic = time.time()
-      dnn = MLPClassifier(solver='lbfgs', alpha=1e-5,
-                          hidden_layer_sizes = (5, 2), random_state = 1)
+      dnn = MODEL_FACTORIES["dnn"]()
       dnn.fit(X, label_dict[label])
       if label not in self.category_library:
         self.category_library[label] = {}
@@ -275,10 +327,10 @@ class PP:
     X, label_dict, pre = args
     for label in label_dict:
       tic = time.time()
-      if len(np.unique(label)) == 1:
+      if len(np.unique(label_dict[label])) == 1:
         continue
       else:
-        svm = LinearSVC(random_state=0)
+        svm = MODEL_FACTORIES["svm"]()
         svm.fit(X, label_dict[label])
         if label not in self.category_library:
           self.category_library[label] = {}
@@ -293,7 +345,7 @@ class PP:
     X, label_dict, pre = args
     for label in label_dict:
       tic = time.time()
-      kde = KernelDensityWrapper(kernel='gaussian', bandwidth=0.2)
+      kde = MODEL_FACTORIES["kde"]()
       # We will assume each label is one-shot encoding
       kde.fit(X, label_dict[label])
       if label not in self.category_library:
@@ -313,6 +365,7 @@ class PP:
       pca = PCA()
       X_new = pca.fit_transform(X)
       self.pre_category_library["pca"] = pca
+      self.features.invalidate("pca")
       if "pca" not in self.pre_category_stats:
         self.pre_category_stats["pca"] = {"C": round(time.time() - tic, 2) }
     else:
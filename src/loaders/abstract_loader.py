@@ -41,15 +41,19 @@ class AbstractVideoLoader(metaclass=ABCMeta):
                                      while fetching the video
         offset (int, optional): Start frame location in video
         limit (int, optional): Number of frames needed from the video
+        prefetch (int, optional): Number of batches decoded ahead on a
+                                  background thread. 0 decodes on the
+                                  caller's thread
     """
 
     def __init__(self, video_metadata: VideoMetaInfo, batch_size=1,
-                 skip_frames=0, offset=None, limit=None):
+                 skip_frames=0, offset=None, limit=None, prefetch=0):
         self.video_metadata = video_metadata
         self.batch_size = batch_size
         self.skip_frames = skip_frames
         self.offset = offset
         self.limit = limit
+        self.prefetch = prefetch
 
     @abstractmethod
     def load(self):
@@ -0,0 +1,224 @@
+"""
+This file implements a columnar representation of the UA-detrac annotations
+If any problem occurs, please email jaeho.bang@gmail.com
+
+
+@Jaeho Bang
+
+"""
+
+import os
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+
+VEHICLE_TYPES = ['car', 'van', 'bus', 'others']
+COLORS = ['white', 'black', 'silver', 'red']
+INTERSECTIONS = ['pt335', 'pt342', 'pt211', 'pt208']
+
+# columns with one value per row, saved as one .npy file each
+COLUMNS = ['object', 'vehicle_type', 'speed', 'color', 'intersection', 'box']
+
+
+class AnnotationTable:
+    """
+    One row per annotated object, rows are sorted by frame
+
+    Attributes:
+        frame (np.ndarray): index of the frame over all the annotation files
+        object (np.ndarray): id of the object within its annotation file
+        vehicle_type (np.ndarray): index in vehicle_types, -1 if missing
+        speed (np.ndarray): speed given by the dataset, nan if missing
+        color (np.ndarray): index in colors, -1 if missing
+        intersection (np.ndarray): index in intersections, -1 if missing
+        box (np.ndarray): left, top, width, height of the object's box in
+        the original image
+        num_frames (int): number of frames spanned by the annotations
+        video_start_indices (np.ndarray): first frame of each annotation file
+    """
+
+    def __init__(self, frame, object, vehicle_type, speed, color, box,
+                 num_frames, video_start_indices, intersection=None,
+                 vehicle_types=None, colors=None, intersections=None):
+        self.frame = frame
+        self.object = object
+        self.vehicle_type = vehicle_type
+        self.speed = speed
+        self.color = color
+        self.box = box
+        if intersection is None:
+            intersection = np.full(len(frame), -1, dtype=np.int8)
+        self.intersection = intersection
+        self.num_frames = num_frames
+        self.video_start_indices = video_start_indices
+        self.vehicle_types = list(vehicle_types or VEHICLE_TYPES)
+        self.colors = list(colors or COLORS)
+        self.intersections = list(intersections or INTERSECTIONS)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def frame_offsets(self, mask=None):
+        """
+        Rows of frame i are rows offsets[i]:offsets[i + 1] (of the masked
+        rows when a mask is given)
+        """
+        frame = self.frame if mask is None else self.frame[mask]
+        counts = np.bincount(frame, minlength=self.num_frames)
+        offsets = np.zeros(self.num_frames + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets
+
+    def save(self, directory):
+        """
+        Saves the table as one .npy file per column plus the per frame
+        offsets of the rows (CSR), none of them needs pickle
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in COLUMNS}
+        arrays.update(offsets=self.frame_offsets(),
+                      video_start_indices=self.video_start_indices,
+                      vehicle_types=np.array(self.vehicle_types, dtype=str),
+                      colors=np.array(self.colors, dtype=str),
+                      intersections=np.array(self.intersections, dtype=str))
+        for name, values in arrays.items():
+            np.save(os.path.join(directory, name + '.npy'), values,
+                    allow_pickle=False)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Loads a table written by save, the columns are memory mapped
+        unless mmap_mode is None
+        """
+        def load(name, mmap_mode=mmap_mode):
+            return np.load(os.path.join(directory, name + '.npy'),
+                           mmap_mode=mmap_mode, allow_pickle=False)
+
+        offsets = load('offsets', None)
+        num_frames = len(offsets) - 1
+        frame = np.repeat(np.arange(num_frames), np.diff(offsets))
+        columns = {name: load(name) for name in COLUMNS}
+        return cls(frame=frame, num_frames=num_frames,
+                   video_start_indices=load('video_start_indices', None),
+                   vehicle_types=load('vehicle_types', None).tolist(),
+                   colors=load('colors', None).tolist(),
+                   intersections=load('intersections', None).tolist(),
+                   **columns)
+
+    def decode(self, codes, vocabulary):
+        """
+        Maps codes to their names, missing (-1) codes to None
+        """
+        return np.array(list(vocabulary) + [None], dtype=object)[codes]
+
+    def per_frame(self, values, mask=None, empty=None):
+        """
+        Splits a column into one python list per frame
+        :param values: column with one value per row
+        :param mask: rows to keep
+        :param empty: value of the frames without any row
+        :return: list of num_frames lists
+        """
+        if mask is not None:
+            values = values[mask]
+        offsets = self.frame_offsets(mask).tolist()
+        values = values.tolist()
+        return [values[start:stop] if stop > start else empty
+                for start, stop in zip(offsets[:-1], offsets[1:])]
+
+    def corners(self, width_scale=1., height_scale=1.):
+        """
+        :return: top, left, bottom, right of the boxes in a resized image
+        """
+        left, top, width, height = self.box.T
+        corners = np.stack([top * height_scale, left * width_scale,
+                            (top + height) * height_scale,
+                            (left + width) * width_scale], axis=1)
+        return np.trunc(corners).astype(np.int32)
+
+
+def _code(name, vocabulary):
+    if not name:
+        return -1
+    if name not in vocabulary:
+        vocabulary.append(name)
+    return vocabulary.index(name)
+
+
+def parse_annotations(directory):
+    """
+    Parses all the xml annotation files of a directory in a single pass.
+    Files are streamed and every frame is dropped once read, only the
+    columns of the table are kept in memory.
+    :param directory: directory walked for xml files
+    :return: AnnotationTable
+    """
+    vehicle_types = list(VEHICLE_TYPES)
+    colors = list(COLORS)
+    frames, objects = array('l'), array('l')
+    types, color_codes = array('b'), array('b')
+    speeds, boxes = array('d'), array('d')
+    video_start_indices = []
+    num_frames = 0
+
+    for root, subdirs, files in os.walk(directory):
+        subdirs.sort()
+        files.sort()
+        for file in files:
+            if not file.endswith('.xml'):
+                continue
+            video_start_indices.append(num_frames)
+            last_frame = 0
+            tree_root = None
+            frame = None
+            in_target = False
+            for event, elem in ET.iterparse(os.path.join(root, file),
+                                            events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tree_root is None:
+                        tree_root = elem
+                    elif tag == 'frame':
+                        last_frame = int(elem.attrib['num'])
+                        frame = num_frames + last_frame - 1
+                    elif tag == 'target':
+                        in_target = True
+                        frames.append(frame)
+                        objects.append(int(elem.attrib['id']))
+                        types.append(-1)
+                        speeds.append(np.nan)
+                        color_codes.append(-1)
+                        boxes.extend((np.nan,) * 4)
+                    elif in_target and tag == 'box':
+                        boxes[-4:] = array('d', [
+                            float(elem.attrib[key])
+                            for key in ('left', 'top', 'width', 'height')])
+                    elif in_target and tag == 'attribute':
+                        attrib = elem.attrib
+                        types[-1] = _code(attrib.get('vehicle_type'),
+                                          vehicle_types)
+                        if attrib.get('speed'):
+                            speeds[-1] = float(attrib['speed'])
+                        color_codes[-1] = _code(attrib.get('color'), colors)
+                elif tag == 'target':
+                    in_target = False
+                elif tag == 'frame':
+                    # frames are only needed until their targets are read
+                    tree_root.clear()
+            num_frames += last_frame
+
+    frame = np.frombuffer(frames, dtype=frames.typecode)
+    order = np.argsort(frame, kind='stable')
+    return AnnotationTable(
+        frame=frame[order],
+        object=np.frombuffer(objects, dtype=objects.typecode)[order],
+        vehicle_type=np.frombuffer(types, dtype=np.int8)[order],
+        speed=np.frombuffer(speeds, dtype=np.float64)[order],
+        color=np.frombuffer(color_codes, dtype=np.int8)[order],
+        box=np.frombuffer(boxes, dtype=np.float64).reshape(-1, 4)[order],
+        num_frames=num_frames,
+        video_start_indices=np.array(video_start_indices, dtype=np.int64),
+        vehicle_types=vehicle_types,
+        colors=colors)
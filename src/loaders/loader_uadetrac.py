@@ -8,22 +8,28 @@ If any problem occurs, please email jaeho.bang@gmail.com
 """
 
 import argparse
+import concurrent.futures
 import os
+import time
 import warnings
-import xml.etree.ElementTree as ET
 
 import cv2
 import numpy as np
 
 from src.loaders.TaskManager import TaskManager
+from src.loaders.annotation_table import AnnotationTable, \
+    parse_annotations
 from src.loaders.abstract_loader import AbstractLoader
 
 
 # Make this return a dictionary of label to data for the whole dataset
 
 class UADetracLoader(AbstractLoader):
-    def __init__(self, args, image_width=300, image_height=300):
+    def __init__(self, args, image_width=300, image_height=300,
+                 num_workers=1):
         self.args = args
+        # number of threads decoding images, cv2 releases the GIL
+        self.num_workers = num_workers
         self.data_dict = {}
         self.label_dict = {}
         self.vehicle_type_filters = ['car', 'van', 'bus', 'others']
@@ -40,6 +46,8 @@ class UADetracLoader(AbstractLoader):
         self.images = None
         self.labels = None
         self.boxes = None
+        self.annotations = None
+        self.annotation_dir = None
         self.eva_dir = os.path.dirname(os.path.dirname(
             os.path.dirname(os.path.abspath(__file__))))
         self.video_start_indices = []
@@ -61,12 +69,32 @@ class UADetracLoader(AbstractLoader):
         if dir is None:
             dir = os.path.join(self.eva_dir, 'data', 'ua_detrac',
                                self.args.anno_path)
-        self.boxes = np.array(self.get_boxes(dir))
+        boxes = self.get_boxes(dir)
+        self.boxes = np.empty(len(boxes), dtype=object)
+        self.boxes[:] = boxes
         return self.boxes
 
-    def load_images(self, image_dir: str = None, image_size=None):
+    def load_annotations(self, dir: str = None):
+        """
+        Parses the annotations once into a columnar table shared by the
+        labels and the boxes
+        :return: AnnotationTable
+        """
+        if dir is None:
+            dir = os.path.join(self.eva_dir, 'data', 'ua_detrac',
+                               self.args.anno_path)
+        if self.annotations is None or self.annotation_dir != dir:
+            self.annotations = parse_annotations(dir)
+            self.annotation_dir = dir
+        return self.annotations
+
+    def load_images(self, image_dir: str = None, image_size=None,
+                    cache_file: str = None):
         """
         This function simply loads image of given image
+        When cache_file is given, the images are decoded into a memory-mapped
+        .npy file at that path instead of memory, so that datasets larger
+        than RAM can be loaded and paged in on demand
         :return: image_array (numpy)
         """
         if image_size is not None:
@@ -85,19 +113,44 @@ class UADetracLoader(AbstractLoader):
 
         print("Number of files added: ", len(file_names))
 
-        self.images = np.ndarray(shape=(
-            len(file_names), self.image_height, self.image_width,
-            self.image_channels),
-            dtype=np.uint8)
-
-        for i in range(len(file_names)):
-            file_name = file_names[i]
-            img = cv2.imread(file_name)
-            img = cv2.resize(img, (self.image_width, self.image_height))
-            self.images[i] = img
-
+        shape = (len(file_names), self.image_height, self.image_width,
+                 self.image_channels)
+        if cache_file is None:
+            self.images = np.ndarray(shape=shape, dtype=np.uint8)
+        else:
+            self.images = np.lib.format.open_memmap(cache_file, mode='w+',
+                                                    dtype=np.uint8,
+                                                    shape=shape)
+
+        st = time.time()
+        num_workers = max(1, min(self.num_workers, len(file_names)))
+        if num_workers == 1:
+            self._decode_images(file_names, 0, len(file_names))
+        else:
+            # each worker decodes a contiguous range of frames into its own
+            # slots of the output array
+            bounds = np.linspace(0, len(file_names), num_workers * 4 + 1,
+                                 dtype=int)
+            with concurrent.futures.ThreadPoolExecutor(num_workers) as pool:
+                futures = [pool.submit(self._decode_images, file_names,
+                                       start, stop)
+                           for start, stop in zip(bounds[:-1], bounds[1:])]
+                for future in futures:
+                    future.result()
+        elapsed = time.time() - st
+        print("Decoded %d images in %.2f seconds (%.1f images/s)" % (
+            len(file_names), elapsed, len(file_names) / max(elapsed, 1e-9)))
+
+        if cache_file is not None:
+            self.images.flush()
         return self.images
 
+    def _decode_images(self, file_names, start, stop):
+        for i in range(start, stop):
+            img = cv2.imread(file_names[i])
+            self.images[i] = cv2.resize(img, (self.image_width,
+                                              self.image_height))
+
     def load_labels(self, dir: str = None):
         """
         Loads vehicle type, speed, color, and intersection of ua-detrac
@@ -122,6 +175,26 @@ class UADetracLoader(AbstractLoader):
         else:
             return None
 
+    def get_label_columns(self):
+        """
+        Per object label columns of the loaded annotations, the input of
+        PP._generate_binary_labels which needs no per frame lists
+        :return: dict of column name to (frame, codes, vocabulary), or
+        (frame, values) for speed
+        """
+        if self.annotations is None:
+            warnings.warn("No labels loaded, call load_labels() first",
+                          Warning)
+            return None
+        table = self.annotations
+        return {'num_frames': table.num_frames,
+                'vehicle_type': (table.frame, table.vehicle_type,
+                                 table.vehicle_types),
+                'color': (table.frame, table.color, table.colors),
+                'speed': (table.frame, self._convert_speed(table.speed)),
+                'intersection': (table.frame, table.intersection,
+                                 table.intersections)}
+
     def get_video_start_indices(self):
         """
         This function returns the starting indexes for each video bc
@@ -139,7 +212,15 @@ class UADetracLoader(AbstractLoader):
                                    self.args.cache_vi_name)
         if self.images is None:
             warnings.warn("No image loaded, call load_images() first", Warning)
-        elif type(self.images) is np.ndarray:
+        elif isinstance(self.images, np.memmap) and \
+                os.path.abspath(self.images.filename) == \
+                os.path.abspath(save_dir):
+            # images were decoded straight into the cache file
+            self.images.flush()
+            np.save(save_dir_vi, np.array(self.video_start_indices))
+            print("flushed images to", save_dir)
+            print("saved video indices to", save_dir_vi)
+        elif isinstance(self.images, np.ndarray):
             np.save(save_dir, self.images)
             np.save(save_dir_vi, np.array(self.video_start_indices))
             print("saved images to", save_dir)
@@ -149,35 +230,45 @@ class UADetracLoader(AbstractLoader):
                           Warning)
 
     def save_labels(self):
-        save_dir = os.path.join(self.eva_dir, 'data', self.args.cache_path,
-                                self.args.cache_label_name)
-        if self.labels is None:
+        """
+        Saves the annotation table the labels are derived from as flat
+        .npy columns with per frame offsets, see AnnotationTable.save
+        """
+        save_dir = self._label_cache_dir()
+        if self.annotations is None:
             warnings.warn("No labels loaded, call load_labels() first",
                           Warning)
-        elif type(self.labels) is dict:
-            np.save(save_dir, self.labels, allow_pickle=True)
-            print("saved labels to", save_dir)
         else:
-            warnings.warn("Labels type is not dict....cannot save", Warning)
-            print("labels type is ", type(self.labels))
+            self.annotations.save(save_dir)
+            print("saved labels to", save_dir)
+
+    def _label_cache_dir(self):
+        return os.path.join(self.eva_dir, 'data', self.args.cache_path,
+                            os.path.splitext(self.args.cache_label_name)[0])
 
     def save_boxes(self):
         save_dir = os.path.join(self.eva_dir, 'data', self.args.cache_path,
                                 self.args.cache_box_name)
-        if self.images is None:
-            warnings.warn("No labels loaded, call load_boxes() first", Warning)
-        elif type(self.images) is np.ndarray:
+        if self.boxes is None:
+            warnings.warn("No boxes loaded, call load_boxes() first", Warning)
+        elif isinstance(self.boxes, np.ndarray):
             np.save(save_dir, self.boxes)
             print("saved boxes to", save_dir)
         else:
-            warnings.warn("Labels type is not np....cannot save", Warning)
+            warnings.warn("Boxes type is not np....cannot save", Warning)
 
-    def load_cached_images(self):
+    def load_cached_images(self, mmap_mode='c'):
+        """
+        Maps the cached images instead of reading them, frames are paged in
+        when accessed. The default copy-on-write mode keeps the images
+        writable without modifying the cache; use None to read them in memory
+        :return: images
+        """
         save_dir = os.path.join(self.eva_dir, 'data', self.args.cache_path,
                                 self.args.cache_image_name)
         save_dir_vi = os.path.join(self.eva_dir, 'data', self.args.cache_path,
                                    self.args.cache_vi_name)
-        self.images = np.load(save_dir)
+        self.images = np.load(save_dir, mmap_mode=mmap_mode)
         self.video_start_indices = np.load(save_dir_vi)
         return self.images
 
@@ -187,62 +278,48 @@ class UADetracLoader(AbstractLoader):
         self.boxes = np.load(save_dir, allow_pickle=True)
         return self.boxes
 
-    def load_cached_labels(self):
-        save_dir = os.path.join(self.eva_dir, 'data', self.args.cache_path,
-                                self.args.cache_label_name)
-        labels_pickeled = np.load(save_dir, allow_pickle=True)
-        self.labels = labels_pickeled.item()
+    def load_cached_labels(self, mmap_mode='r'):
+        """
+        Loads the annotation table saved by save_labels, its columns are
+        memory mapped unless mmap_mode is None. No per frame list is built:
+        get_label_columns gives the input of PP from the mapped columns and
+        labels_as_lists the per frame lists load_labels returns
+        :return: AnnotationTable
+        """
+        self.annotations = AnnotationTable.load(self._label_cache_dir(),
+                                                mmap_mode)
+        self.annotation_dir = None
+        self.labels = None
+        return self.annotations
+
+    def labels_as_lists(self):
+        """
+        Per frame lists of the labels of the loaded annotations, as
+        returned by load_labels
+        :return: labels
+        """
+        if self.annotations is None:
+            warnings.warn("No labels loaded, call load_labels() first",
+                          Warning)
+            return None
+        if self.labels is None:
+            vehicle_type_labels, speed_labels, color_labels, \
+                intersection_labels = self._labels_from_table(
+                    self.annotations)
+            self.labels = {'vehicle': vehicle_type_labels,
+                           'speed': speed_labels,
+                           'color': color_labels,
+                           'intersection': intersection_labels}
         return self.labels
 
     def get_boxes(self, anno_dir):
-        width = self.image_width
-        height = self.image_height
-        import xml.etree.ElementTree as ET
         original_height = 540
         original_width = 960
-        anno_files = os.listdir(anno_dir)
-        anno_files.sort()
-        boxes_dataset = []
-        cumu_count = 0
-
-        for anno_file in anno_files:
-            if ".xml" not in anno_file:
-                print("skipping", anno_file)
-                continue
-            file_path = os.path.join(anno_dir, anno_file)
-
-            tree = ET.parse(file_path)
-            tree_root = tree.getroot()
-
-            for frame in tree_root.iter('frame'):
-                boxes_frame = []
-                curr_frame_num = int(frame.attrib['num'])
-                if len(boxes_dataset) < cumu_count + curr_frame_num - 1:
-                    boxes_dataset.extend([None] * (
-                        cumu_count + curr_frame_num - len(boxes_dataset)))
-                for box in frame.iter('box'):
-                    top, left, bottom, right = self.get_corners(box,
-                                                                width /
-                                                                original_width,
-                                                                height /
-                                                                original_height
-                                                                )
-                    boxes_frame.append((top, left, bottom, right))
-
-                boxes_dataset.append(boxes_frame)
-
-        return boxes_dataset
-
-    def get_corners(self, box, width_scale, height_scale):
-        left = int(
-            float(box.attrib['left']) * width_scale)
-        top = int(
-            float(box.attrib['top']) * height_scale)
-        right = int((float(box.attrib['left']) + float(
-            box.attrib['width'])) * width_scale)
-        bottom = int((float(box.attrib['top']) + float(
-            box.attrib['height'])) * height_scale)
-        return top, left, bottom, right
+        table = self.load_annotations(anno_dir)
+        corners = table.corners(self.image_width / original_width,
+                                self.image_height / original_height)
+        return [[tuple(box) for box in boxes_frame]
+                for boxes_frame in table.per_frame(corners, empty=[])]
 
     def _convert_speed(self, original_speed):
         """
@@ -257,29 +334,6 @@ class UADetracLoader(AbstractLoader):
 
         return original_speed * 5
 
-    def parse_frame_att(self, frame):
-        car_per_frame = []
-        speed_per_frame = []
-        color_per_frame = []
-        intersection_per_frame = []
-
-        for att in frame.iter('attribute'):
-            if att.attrib['vehicle_type']:
-                car_per_frame.append(att.attrib['vehicle_type'])
-            if att.attrib['speed']:
-                speed_per_frame.append(self._convert_speed(
-                    float(att.attrib['speed'])))
-            if 'color' in att.attrib.keys():
-                color_per_frame.append(att.attrib['color'])
-        return car_per_frame, speed_per_frame, color_per_frame, \
-            intersection_per_frame
-
-    def populate_label(self, per_frame, labels):
-        if len(per_frame) == 0:
-            labels.append(None)
-        else:
-            labels.append(per_frame)
-
     def _load_XML(self, directory):
         """
         UPDATE: vehicle colors can now be extracted through the xml files!!!
@@ -292,42 +346,20 @@ class UADetracLoader(AbstractLoader):
                           Warning)
             return None
 
-        car_labels = []
-        speed_labels = []
-        color_labels = []
-        intersection_labels = []
-
         print("walking", directory, "for xml parsing")
-        for root, subdirs, files in os.walk(directory):
-            files.sort()
-            for file in files:
-                file_path = os.path.join(root, file)
-                if ".swp" in file_path:
-                    continue
-                tree = ET.parse(file_path)
-                tree_root = tree.getroot()
-                start_frame_num = 1
-                start_frame = True
-                for frame in tree_root.iter('frame'):
-                    curr_frame_num = int(frame.attrib['num'])
-                    if start_frame and curr_frame_num != start_frame_num:
-                        car_labels.append(
-                            [None] * (curr_frame_num - start_frame_num))
-                        speed_labels.append(
-                            [None] * (curr_frame_num - start_frame_num))
-
-                    car_per_frame, speed_per_frame, color_per_frame, \
-                        intersection_per_frame = self.parse_frame_att(frame)
-
-                    assert (len(car_per_frame) == len(speed_per_frame))
-
-                    self.populate_label(car_per_frame, car_labels)
-                    self.populate_label(speed_per_frame, speed_labels)
-                    self.populate_label(color_per_frame, color_labels)
-                    self.populate_label(intersection_per_frame,
-                                        intersection_labels)
-
-                    start_frame = False
+        return self._labels_from_table(self.load_annotations(directory))
+
+    def _labels_from_table(self, table):
+        car_labels = table.per_frame(
+            table.decode(table.vehicle_type, table.vehicle_types),
+            table.vehicle_type >= 0)
+        speed_labels = table.per_frame(self._convert_speed(table.speed),
+                                       ~np.isnan(table.speed))
+        color_labels = table.per_frame(
+            table.decode(table.color, table.colors), table.color >= 0)
+        intersection_labels = table.per_frame(
+            table.decode(table.intersection, table.intersections),
+            table.intersection >= 0)
 
         return [car_labels, speed_labels, color_labels, intersection_labels]
 
@@ -354,6 +386,11 @@ def get_parser():
     parser.add_argument('--cache_vi_name', default='ua_detrac_vi.npy',
                         help='Define filename for saving and loading cached '
                              'video indices')
+    parser.add_argument('--num_workers', type=int, default=1,
+                        help='Define number of threads decoding images')
+    parser.add_argument('--mmap_images', action='store_true',
+                        help='Decode images straight into the memory-mapped '
+                             'image cache instead of memory')
     return parser
 
 
@@ -365,8 +402,12 @@ if __name__ == "__main__":
     import time
 
     st = time.time()
-    loader = UADetracLoader(args)
-    images = loader.load_images()
+    loader = UADetracLoader(args, num_workers=args.num_workers)
+    image_cache = None
+    if args.mmap_images:
+        image_cache = os.path.join(loader.eva_dir, 'data', args.cache_path,
+                                   args.cache_image_name)
+    images = loader.load_images(cache_file=image_cache)
     labels = loader.load_labels()
     boxes = loader.load_boxes()
 
@@ -378,10 +419,11 @@ if __name__ == "__main__":
 
     st = time.time()
     images_cached = loader.load_cached_images()
-    labels_cached = loader.load_cached_labels()
+    loader.load_cached_labels()
     boxes_cached = loader.load_cached_boxes()
     print("Time taken to load everything from npy", time.time() - st,
           "seconds")
+    labels_cached = loader.labels_as_lists()
 
     assert (images.shape == images_cached.shape)
     assert (boxes.shape == boxes_cached.shape)
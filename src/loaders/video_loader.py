@@ -1,47 +1,100 @@
 from src.loaders.abstract_loader import AbstractVideoLoader
 import cv2
+import numpy as np
 
 from src.models.catalog.frame_info import FrameInfo
 from src.models.catalog.properties import ColorSpace
 from src.models.catalog.video_info import VideoMetaInfo
 from src.models.storage.batch import FrameBatch
-from src.models.storage.frame import Frame
+from src.utils.generic_utils import prefetch
 
 
 class SimpleVideoLoader(AbstractVideoLoader):
-    def __init__(self, video_metadata: VideoMetaInfo, *args, **kwargs):
+    """
+    Video loader based on cv2.VideoCapture
+
+    Skipped frames are only grabbed and never decoded. When the number of
+    frames to skip in one go reaches `seek_threshold`, the loader seeks to
+    the next frame instead. Seeking makes the decoder restart from the
+    closest preceding keyframe, so it only pays off for strides larger
+    than the keyframe interval of the video.
+
+    Arguments:
+        seek_threshold (int, optional): Minimum number of consecutive
+        skipped frames for which seeking is used. Seeking is disabled
+        when None
+    """
+
+    def __init__(self, video_metadata: VideoMetaInfo, *args,
+                 seek_threshold=None, **kwargs):
         super().__init__(video_metadata, *args, **kwargs)
+        self.seek_threshold = seek_threshold
 
     def load(self):
+        if self.prefetch > 0:
+            # decode runs on a background thread (cv2 releases the GIL)
+            # so that it overlaps with the consumer's processing
+            return prefetch(self._load(), self.prefetch)
+        return self._load()
+
+    def _next_frame_index(self, frame_ind):
+        """
+        Returns the index of the first frame after `frame_ind` which is
+        not skipped
+        """
+        next_ind = frame_ind + 1
+        if self.skip_frames > 0:
+            next_ind = -(-next_ind // self.skip_frames) * self.skip_frames
+        return next_ind
+
+    def _load(self):
         video = cv2.VideoCapture(self.video_metadata.file)
         video_start = self.offset if self.offset else 0
         video.set(cv2.CAP_PROP_POS_FRAMES, video_start)
-
-        _, frame = video.read()
         frame_ind = video_start - 1
 
         info = None
-        if frame is not None:
-            (height, width, channels) = frame.shape
-            info = FrameInfo(height, width, channels, ColorSpace.BGR)
-
-        frames = []
-        while frame is not None:
-            frame_ind += 1
-            eva_frame = Frame(frame_ind, frame, info)
-            if self.skip_frames > 0 and frame_ind % self.skip_frames != 0:
-                _, frame = video.read()
-                continue
-
-            frames.append(eva_frame)
-            if self.limit and frame_ind >= self.limit:
-                return FrameBatch(frames, info)
-
-            if len(frames) % self.batch_size == 0:
-                yield FrameBatch(frames, info)
-                frames = []
-
-            _, frame = video.read()
-
-        if frames:
-            return FrameBatch(frames, info)
+        # Frames are decoded straight into a contiguous (N, H, W, C) buffer
+        # which backs the emitted FrameBatch
+        buffer, indices = None, None
+        num_frames = 0
+        while True:
+            next_ind = self._next_frame_index(frame_ind)
+            if self.limit and next_ind >= self.limit:
+                break
+
+            gap = next_ind - frame_ind - 1
+            if self.seek_threshold and gap >= self.seek_threshold:
+                video.set(cv2.CAP_PROP_POS_FRAMES, next_ind)
+            elif not all(video.grab() for _ in range(gap)):
+                break
+            frame_ind = next_ind
+
+            if buffer is None:
+                success, frame = video.read()
+                if not success:
+                    break
+                if info is None:
+                    (height, width, channels) = frame.shape
+                    info = FrameInfo(height, width, channels, ColorSpace.BGR)
+                buffer = np.empty((self.batch_size,) + frame.shape,
+                                  dtype=frame.dtype)
+                indices = np.empty(self.batch_size, dtype=np.int64)
+                buffer[num_frames] = frame
+            else:
+                success, frame = video.read(buffer[num_frames])
+                if not success:
+                    break
+                if not np.may_share_memory(frame, buffer):
+                    buffer[num_frames] = frame
+            indices[num_frames] = frame_ind
+            num_frames += 1
+
+            if num_frames == self.batch_size:
+                yield FrameBatch.from_numpy(buffer, info, indices)
+                buffer, indices = None, None
+                num_frames = 0
+
+        if num_frames:
+            yield FrameBatch.from_numpy(buffer[:num_frames], info,
+                                        indices[:num_frames])
@@ -2,6 +2,8 @@ from typing import List
 
 import numpy as np
 
+from src.models.storage.frame import Frame
+
 
 class FrameBatch:
     """
@@ -13,6 +15,10 @@ class FrameBatch:
         outcomes (Dict[str, List[BasePrediction]]): outcomes of running a udf
         with name 'x' as key
 
+    A batch can also be backed by a single contiguous (N, H, W, C) ndarray
+    (see `FrameBatch.from_numpy`). The `Frame` objects of such a batch are
+    zero-copy views into the buffer and are only created when `frames` is
+    accessed.
 
     """
 
@@ -28,11 +34,100 @@ class FrameBatch:
         self._batch_size = len(frames)
         self._outcomes = outcomes
         self._temp_outcomes = temp_outcomes
+        self._data = None
+        self._indices = None
+
+    @staticmethod
+    def from_numpy(data: np.ndarray, info, indices=None, outcomes=None,
+                   temp_outcomes=None) -> 'FrameBatch':
+        """
+        Factory method for creating a batch backed by a contiguous buffer
+
+        Arguments:
+            data (np.ndarray): (N, H, W, C) buffer holding the frames
+            info (FrameInfo): Information about the frames in the batch
+            indices (np.ndarray, optional): index of each frame in the
+            video. Defaults to 0..N-1
+
+        Returns:
+            FrameBatch
+        """
+        batch = FrameBatch([], info, outcomes=outcomes,
+                           temp_outcomes=temp_outcomes)
+        if indices is None:
+            indices = np.arange(len(data))
+        batch._data = data
+        batch._indices = np.asarray(indices)
+        batch._frames = None
+        batch._batch_size = len(data)
+        return batch
+
+    @staticmethod
+    def concatenate(batches: List['FrameBatch']) -> 'FrameBatch':
+        """
+        Factory method for merging batches into a single batch. The result
+        is columnar if all the batches are columnar with the same frame
+        shape. Outcomes missing in some of the batches are filled with
+        None.
+
+        Arguments:
+            batches (List[FrameBatch]): batches to merge, in order
+
+        Returns:
+            FrameBatch
+        """
+        info = batches[0].info if batches else None
+        outcomes = dict()
+        temp_outcomes = dict()
+        for merged, attribute in ((outcomes, '_outcomes'),
+                                  (temp_outcomes, '_temp_outcomes')):
+            names = set()
+            for batch in batches:
+                names.update(getattr(batch, attribute))
+            for name in names:
+                merged[name] = []
+                for batch in batches:
+                    merged[name].extend(getattr(batch, attribute).get(
+                        name, [None] * batch.batch_size))
+
+        shapes = set(batch._data.shape[1:] for batch in batches
+                     if batch.is_columnar)
+        if batches and len(shapes) == 1 and \
+                all(batch.is_columnar for batch in batches):
+            return FrameBatch.from_numpy(
+                np.concatenate([batch._data for batch in batches]), info,
+                np.concatenate([batch._indices for batch in batches]),
+                outcomes=outcomes, temp_outcomes=temp_outcomes)
+        return FrameBatch([frame for batch in batches
+                           for frame in batch.frames], info,
+                          outcomes=outcomes, temp_outcomes=temp_outcomes)
 
     @property
     def frames(self):
+        if self._frames is None:
+            self._frames = tuple(Frame(int(index), data, self._info)
+                                 for index, data in zip(self._indices,
+                                                        self._data))
         return self._frames
 
+    @property
+    def indices(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: index of each frame of the batch in the video
+        """
+        if self._indices is None:
+            return np.array([frame.index for frame in self.frames])
+        return self._indices
+
+    @property
+    def is_columnar(self) -> bool:
+        """
+        Returns:
+            bool: True if the batch is backed by a contiguous buffer
+        """
+        return self._data is not None
+
     @property
     def info(self):
         return self._info
@@ -42,6 +137,13 @@ class FrameBatch:
         return self._batch_size
 
     def frames_as_numpy_array(self):
+        """
+        Returns the frames as an (N, H, W, C) array. For columnar batches
+        this is the backing buffer itself and no copy is made, so callers
+        must not modify it in place.
+        """
+        if self._data is not None:
+            return self._data
         return np.array([frame.data for frame in self.frames])
 
     def __eq__(self, other: 'FrameBatch'):
@@ -83,6 +185,28 @@ class FrameBatch:
         else:
             return self._temp_outcomes.get(name, [])
 
+    def scatter_outcomes(self, batch: 'FrameBatch', indices):
+        """
+        Copies the outcomes of a batch holding a selection of the frames
+        of this batch back into this batch. Frames outside of the
+        selection keep their outcome, or None if they had none.
+
+        Arguments:
+            batch (FrameBatch): batch with the selected frames
+            indices (List[int]): position of the selected frames in this
+            batch
+        """
+        for outcomes, selected_outcomes in (
+                (self._outcomes, batch._outcomes),
+                (self._temp_outcomes, batch._temp_outcomes)):
+            for name, predictions in selected_outcomes.items():
+                merged = list(outcomes.get(name, []))
+                if len(merged) != self.batch_size:
+                    merged = [None] * self.batch_size
+                for i, prediction in zip(indices, predictions):
+                    merged[i] = prediction
+                outcomes[name] = merged
+
     def has_outcome(self, name: str):
         """
         Method used for checking if the outcome with given name is present.
@@ -97,8 +221,20 @@ class FrameBatch:
         return name in self._outcomes or name in self._temp_outcomes
 
     def _get_frames_from_indices(self, required_frame_ids):
-        new_frames = [self.frames[i] for i in required_frame_ids]
-        new_batch = FrameBatch(new_frames, self.info)
+        if self._data is not None:
+            if type(required_frame_ids) is range:
+                # basic slicing keeps the new buffer a view of this one
+                selector = slice(required_frame_ids.start,
+                                 required_frame_ids.stop,
+                                 required_frame_ids.step)
+            else:
+                selector = np.asarray(required_frame_ids, dtype=np.intp)
+            new_batch = FrameBatch.from_numpy(self._data[selector],
+                                              self.info,
+                                              self._indices[selector])
+        else:
+            new_frames = [self.frames[i] for i in required_frame_ids]
+            new_batch = FrameBatch(new_frames, self.info)
         for key in self._outcomes:
             new_batch._outcomes[key] = [self._outcomes[key][i]
                                         for i in required_frame_ids]
@@ -111,16 +247,14 @@ class FrameBatch:
         """
         Takes as input the slice for the list
         Arguments:
-            item (list or Slice):
+            item (list, np.ndarray or Slice):
 
         :return:
         """
-        if type(indices) is list:
+        if type(indices) is list or isinstance(indices, np.ndarray):
             return self._get_frames_from_indices(indices)
         elif type(indices) is slice:
-            start = indices.start if indices.start else 0
-            end = indices.stop if indices.stop else len(self.frames)
-            if end < 0:
-                end = len(self.frames) + end
-            step = indices.step if indices.step else 1
-            return self._get_frames_from_indices(range(start, end, step))
+            # resolved against batch_size, len(self.frames) would build
+            # the frames of a columnar batch
+            return self._get_frames_from_indices(
+                range(*indices.indices(self.batch_size)))
@@ -1,11 +1,12 @@
 import os
 import sys
+import time
 
 import numpy as np
 
 from src import filters as pp, constants
-import loaders.load as load
-import query_optimizer.query_optimizer as qo
+import src.loaders.load as load
+import src.query_optimizer.query_optimizer as qo
 
 try:
     pass
@@ -15,6 +16,33 @@ except ImportError:
     import src.constants
 
 
+TRAF_20 = ["t=van", "s>60",
+           "c=white", "c!=white", "o=pt211", "c=white && t=van",
+           "s>60 && s<65", "t=car || t=others", "i=pt335 && o=pt211",
+           "t=van && c!=white", "c=white && t!=van && t!=car",
+           "t=van && s>60 && s<65", "t=car || t=others && c!=white",
+           "i=pt335 && o!=pt211 && o!=pt208",
+           "t=van && i=pt335 && o=pt211",
+           "t!=car && c!=black && c!=silver && t!=others",
+           "t=van && s>60 && s<65 && o=pt211",
+           "t!=sedan && t!=van && c!=red && t!=white",
+           "i=pt335 || i=pt342 && o!=pt211 && o!=pt208",
+           "i=pt335 && o=pt211 && t=van && c=red"]
+
+SYNTHETIC_PP_LIST = ["t=car", "t=bus", "t=van", "t=others",
+                     "c=red", "c=white", "c=black", "c=silver",
+                     "s>40", "s>50", "s>60", "s<65", "s<70",
+                     "i=pt335", "i=pt211", "i=pt342", "i=pt208",
+                     "o=pt335", "o=pt211", "o=pt342", "o=pt208"]
+
+LABEL_DESC = {
+    "t": [constants.DISCRETE, ["car", "others", "bus", "van"]],
+    "s": [constants.CONTINUOUS, [40, 50, 60, 65, 70]],
+    "c": [constants.DISCRETE, ["white", "red", "black", "silver"]],
+    "i": [constants.DISCRETE, ["pt335", "pt342", "pt211", "pt208"]],
+    "o": [constants.DISCRETE, ["pt335", "pt342", "pt211", "pt208"]]}
+
+
 # TODO: Fill this file in with the components loaded from other files
 class Pipeline:
     """1. Load the dataset
@@ -105,32 +133,6 @@ class Pipeline:
         return pp_category_stats
 
     def execute(self, pp_category_stats, pp_category_models):
-        TRAF_20 = ["t=van", "s>60",
-                   "c=white", "c!=white", "o=pt211", "c=white && t=van",
-                   "s>60 && s<65", "t=car || t=others", "i=pt335 && o=pt211",
-                   "t=van && c!=white", "c=white && t!=van && t!=car",
-                   "t=van && s>60 && s<65", "t=car || t=others && c!=white",
-                   "i=pt335 && o!=pt211 && o!=pt208",
-                   "t=van && i=pt335 && o=pt211",
-                   "t!=car && c!=black && c!=silver && t!=others",
-                   "t=van && s>60 && s<65 && o=pt211",
-                   "t!=sedan && t!=van && c!=red && t!=white",
-                   "i=pt335 || i=pt342 && o!=pt211 && o!=pt208",
-                   "i=pt335 && o=pt211 && t=van && c=red"]
-
-        synthetic_pp_list = ["t=car", "t=bus", "t=van", "t=others",
-                             "c=red", "c=white", "c=black", "c=silver",
-                             "s>40", "s>50", "s>60", "s<65", "s<70",
-                             "i=pt335", "i=pt211", "i=pt342", "i=pt208",
-                             "o=pt335", "o=pt211", "o=pt342", "o=pt208"]
-
-        label_desc = {
-            "t": [constants.DISCRETE, ["car", "others", "bus", "van"]],
-            "s": [constants.CONTINUOUS, [40, 50, 60, 65, 70]],
-            "c": [constants.DISCRETE, ["white", "red", "black", "silver"]],
-            "i": [constants.DISCRETE, ["pt335", "pt342", "pt211", "pt208"]],
-            "o": [constants.DISCRETE, ["pt335", "pt342", "pt211", "pt208"]]}
-
         query_plans = []
         for query in TRAF_20:
             # TODO: After running the query optimizer, we want the list of
@@ -138,7 +140,7 @@ class Pipeline:
             # TODO: Then we want to execute the queries with the PPs and
             #  send it to the UDF after
             best_query, best_operators, reduction_rate = self.QO.run(
-                query, synthetic_pp_list, pp_category_stats, label_desc)
+                query, SYNTHETIC_PP_LIST, pp_category_stats, LABEL_DESC)
             # TODO: Assume the best_query is in the form ["(PP_name,
             #  model_name) , (PP_name, model_name), (PP_name, model_name),
             #  (PP_name, model_name), (UDF_name, model_name - None)]
@@ -181,7 +183,68 @@ class Pipeline:
                 print(("No existing udf for this query: " + query))
 
 
+def synthetic_pp_stats(pp_list, seed=0):
+    """
+    Random R, C and A statistics of three models per PP
+    """
+    random = np.random.RandomState(seed)
+    return {pp_name: {model: {"R": round(random.uniform(0.02, 0.4), 3),
+                              "C": round(random.uniform(0.01, 0.3), 3),
+                              "A": round(random.uniform(0.85, 1.0), 3)}
+                      for model in ["none/svm", "none/dnn", "pca/kde"]}
+            for pp_name in pp_list}
+
+
+def benchmark_query_optimizer(k=3, accuracy_budget=0.9, udf_cost=None,
+                              repetitions=10, seed=0):
+    """
+    Runs the query optimizer on the TRAF-20 queries with synthetic PP
+    statistics. The PP expression it picks is compared to a greedy choice
+    which uses every PP of the query's own sub-queries (best C/R model
+    within the accuracy budget for each) joined by the query's operators,
+    regardless of k and of the accuracy of the whole expression.
+    """
+    optimizer = qo.QueryOptimizer()
+    pp_stats = synthetic_pp_stats(SYNTHETIC_PP_LIST, seed)
+    total_greedy = total_optimized = 0
+    for query in TRAF_20:
+        tic = time.time()
+        for _ in range(repetitions):
+            pps, _, reduction_rate = optimizer.run(
+                query, SYNTHETIC_PP_LIST, pp_stats, LABEL_DESC, k=k,
+                accuracy_budget=accuracy_budget, udf_cost=udf_cost)
+        elapsed = (time.time() - tic) / repetitions
+
+        sub_queries, operators = optimizer._parseQuery(query)
+        greedy_rates = []
+        greedy_accuracy = 1.
+        for i, sub_query in enumerate(sub_queries):
+            pp_name = "".join(sub_query)
+            model = optimizer._find_model(pp_name, pp_stats,
+                                          accuracy_budget) \
+                if pp_name in pp_stats else None
+            greedy_rates.append(model[1] if model else 0)
+            if model:
+                accuracy = pp_stats[pp_name][model[0]]["A"]
+                greedy_accuracy = min(greedy_accuracy, accuracy) \
+                    if i > 0 and operators[i - 1] == "||" \
+                    else greedy_accuracy * accuracy
+        greedy_rate = optimizer._update_stats(greedy_rates, operators)
+
+        total_greedy += greedy_rate
+        total_optimized += reduction_rate
+        print("%-45s greedy R=%.3f A=%.3f  optimized R=%.3f with %d PPs "
+              "(%.1fms)" % (query, greedy_rate, greedy_accuracy,
+                            reduction_rate, len(pps), elapsed * 1000))
+    print("mean reduction rate: greedy %.3f, optimized %.3f"
+          % (total_greedy / len(TRAF_20), total_optimized / len(TRAF_20)))
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        # python -m src.pipeline benchmark
+        benchmark_query_optimizer()
+        sys.exit(0)
     pipeline = Pipeline()
     pipeline.run()
 
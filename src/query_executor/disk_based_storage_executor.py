@@ -22,7 +22,9 @@ class DiskStorageExecutor(AbstractStorageExecutor):
                                          batch_size=node.batch_size,
                                          skip_frames=node.skip_frames,
                                          limit=node.limit,
-                                         offset=node.offset)
+                                         offset=node.offset,
+                                         prefetch=node.prefetch,
+                                         seek_threshold=node.seek_threshold)
 
     def validate(self):
         pass
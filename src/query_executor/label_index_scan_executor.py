@@ -0,0 +1,46 @@
+from typing import Iterator
+
+import numpy as np
+
+from src.models.storage.batch import FrameBatch
+from src.query_executor.abstract_executor import AbstractExecutor
+from src.query_planner.label_index_scan_plan import LabelIndexScanPlan
+
+
+class LabelIndexScanExecutor(AbstractExecutor):
+    """
+    Answers the predicate of the plan with bitmap operations on a
+    LabelIndex. No frame is decoded: the emitted batches only carry the
+    indices of the frames satisfying the predicate and their frames hold
+    empty arrays.
+
+    Arguments:
+        node (LabelIndexScanPlan): The LabelIndexScanPlan
+
+    """
+
+    def __init__(self, node: LabelIndexScanPlan):
+        super().__init__(node)
+        self.predicate = node.predicate
+        self.label_index = node.label_index
+        self.batch_size = node.batch_size
+        self.offset = node.offset if node.offset else 0
+        self.limit = node.limit
+
+    def validate(self):
+        pass
+
+    def next(self) -> Iterator[FrameBatch]:
+        bitmap = self.label_index.evaluate(self.predicate)
+        if bitmap is None:
+            raise ValueError('Predicate can not be answered by the index')
+        frame_ids = self.label_index.frame_ids(bitmap)
+        start, stop = np.searchsorted(
+            frame_ids, [self.offset,
+                        self.limit if self.limit else np.iinfo(np.int64).max])
+        frame_ids = frame_ids[start:stop]
+        for i in range(0, len(frame_ids), self.batch_size):
+            indices = frame_ids[i:i + self.batch_size]
+            yield FrameBatch.from_numpy(
+                np.empty((len(indices), 0, 0, 0), dtype=np.uint8), None,
+                indices)
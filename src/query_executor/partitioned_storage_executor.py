@@ -0,0 +1,127 @@
+import multiprocessing
+from typing import Iterator, List, Union
+
+import cv2
+import numpy as np
+
+from src.expression.abstract_expression import AbstractExpression
+from src.expression.expression_utils import compile_expression
+from src.loaders.video_loader import SimpleVideoLoader
+from src.models.storage.batch import FrameBatch
+from src.query_executor.abstract_storage_executor import \
+    AbstractStorageExecutor
+from src.query_planner.storage_plan import StoragePlan
+
+_END_OF_SEGMENT = None
+
+
+def _scan_segment(loader: SimpleVideoLoader,
+                  predicates: List[AbstractExpression],
+                  batches: multiprocessing.Queue):
+    """
+    Worker process body: decodes one segment of the video, applies the
+    predicates in order and puts the batches in the queue
+    """
+    try:
+        evaluate_predicates = [compile_expression(predicate)
+                               for predicate in predicates]
+        for batch in loader.load():
+            for evaluate_predicate in evaluate_predicates:
+                batch = batch[np.flatnonzero(evaluate_predicate(batch))]
+            batches.put(batch)
+    except Exception as e:
+        batches.put(e)
+    batches.put(_END_OF_SEGMENT)
+
+
+class PartitionedStorageExecutor(AbstractStorageExecutor):
+    """
+    Storage executor which splits the frame range of the video into
+    `num_partitions` contiguous offset/limit segments. Every segment is
+    decoded (and optionally filtered) by its own worker process and the
+    resulting batches are returned in frame order.
+
+    Arguments:
+        node (StoragePlan): The storage plan
+        predicate (AbstractExpression or List[AbstractExpression],
+        optional): predicate(s) evaluated in the worker processes, each
+        one on the frames kept by the previous ones. Must be picklable
+
+    """
+
+    def __init__(self, node: StoragePlan,
+                 predicate: Union[AbstractExpression,
+                                  List[AbstractExpression]] = None):
+        super().__init__(node)
+        if predicate is None:
+            predicate = []
+        elif not isinstance(predicate, list):
+            predicate = [predicate]
+        self.predicates = predicate
+        self.num_partitions = node.num_partitions
+        # Number of batches a worker may decode ahead of the consumer
+        self.queue_size = max(node.prefetch, 1)
+
+    def validate(self):
+        pass
+
+    def _frame_count(self) -> int:
+        video = cv2.VideoCapture(self._node.video.file)
+        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        video.release()
+        return frame_count
+
+    def _segments(self):
+        """
+        Returns the list of (offset, limit) segments of the video.
+        The last segment keeps the limit of the plan, so that it reads
+        till the end of the video when the frame count is not exact.
+        """
+        start = self._node.offset if self._node.offset else 0
+        end = self._node.limit if self._node.limit else self._frame_count()
+        size = max(-(-(end - start) // self.num_partitions), 1)
+        segments = []
+        for offset in range(start, end, size):
+            segments.append((offset, offset + size))
+        if not segments:
+            return [(start, self._node.limit)]
+        segments[-1] = (segments[-1][0], self._node.limit)
+        return segments
+
+    def _loader(self, offset, limit) -> SimpleVideoLoader:
+        return SimpleVideoLoader(self._node.video,
+                                 batch_size=self._node.batch_size,
+                                 skip_frames=self._node.skip_frames,
+                                 offset=offset,
+                                 limit=limit,
+                                 seek_threshold=self._node.seek_threshold)
+
+    def next(self) -> Iterator[FrameBatch]:
+        workers = []
+        queues = []
+        for offset, limit in self._segments():
+            batches = multiprocessing.Queue(maxsize=self.queue_size)
+            worker = multiprocessing.Process(
+                target=_scan_segment,
+                args=(self._loader(offset, limit), self.predicates,
+                      batches),
+                daemon=True)
+            worker.start()
+            workers.append(worker)
+            queues.append(batches)
+
+        try:
+            # Segments are contiguous so draining them one after the other
+            # keeps the frame order. Later segments keep decoding ahead
+            # until their queue is full.
+            for batches in queues:
+                batch = batches.get()
+                while batch is not _END_OF_SEGMENT:
+                    if isinstance(batch, Exception):
+                        raise batch
+                    yield batch
+                    batch = batches.get()
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
@@ -0,0 +1,31 @@
+from typing import Iterator
+
+from src.models.storage.batch import FrameBatch
+from src.query_executor.abstract_executor import AbstractExecutor
+from src.utils.generic_utils import prefetch
+
+
+class PipelineStageExecutor(AbstractExecutor):
+    """
+    Runs the wrapped executor on its own worker thread and hands its
+    batches to the parent through a bounded queue, so that consecutive
+    operators (decode, PP filtering, UDF evaluation) work on different
+    batches at the same time.
+
+    Arguments:
+        executor (AbstractExecutor): executor run as a pipeline stage
+        queue_size (int): maximum number of batches buffered between the
+        stage and its parent
+
+    """
+
+    def __init__(self, executor: AbstractExecutor, queue_size: int = 2):
+        super().__init__(executor._node)
+        self.append_child(executor)
+        self.queue_size = queue_size
+
+    def validate(self):
+        pass
+
+    def next(self) -> Iterator[FrameBatch]:
+        yield from prefetch(self.children[0].next(), self.queue_size)
@@ -1,9 +1,18 @@
+from typing import Iterator
+
+from src.models.storage.batch import FrameBatch
 from src.query_executor.abstract_executor import AbstractExecutor
 from src.query_executor.seq_scan_executor import SequentialScanExecutor
 from src.query_planner.abstract_plan import AbstractPlan
 from src.query_planner.types import PlanNodeType
 from src.query_executor.disk_based_storage_executor import DiskStorageExecutor
+from src.query_executor.partitioned_storage_executor import \
+    PartitionedStorageExecutor
+from src.query_executor.pipeline_stage_executor import \
+    PipelineStageExecutor
 from src.query_executor.pp_executor import PPExecutor
+from src.query_executor.label_index_scan_executor import \
+    LabelIndexScanExecutor
 
 
 class PlanExecutor:
@@ -14,10 +23,20 @@ class PlanExecutor:
     Arguments:
         plan (AbstractPlan): Physical plan tree which needs to be executed
 
+        pipelined (bool, default: False): Run every child executor as a
+        pipeline stage on its own thread, connected to its parent by a
+        bounded queue
+
+        queue_size (int, default: 2): Number of batches buffered between
+        two pipeline stages
+
     """
 
-    def __init__(self, plan: AbstractPlan):
+    def __init__(self, plan: AbstractPlan, pipelined: bool = False,
+                 queue_size: int = 2):
         self._plan = plan
+        self._pipelined = pipelined
+        self._queue_size = queue_size
 
     def _build_execution_tree(self, plan: AbstractPlan) -> AbstractExecutor:
         """build the execution tree from plan tree
@@ -32,30 +51,101 @@ class PlanExecutor:
         if plan is None:
             return root
 
+        partitioned_scan = self._partitioned_scan(plan)
+        if partitioned_scan is not None:
+            return partitioned_scan
+
         # Get plan node type
         plan_node_type = plan.node_type
 
         if plan_node_type == PlanNodeType.SEQUENTIAL_SCAN_TYPE:
             executor_node = SequentialScanExecutor(node=plan)
         elif plan_node_type == PlanNodeType.STORAGE_PLAN:
-            executor_node = DiskStorageExecutor(node=plan)
+            if plan.num_partitions > 1:
+                executor_node = PartitionedStorageExecutor(node=plan)
+            else:
+                executor_node = DiskStorageExecutor(node=plan)
         elif plan_node_type == PlanNodeType.PP_FILTER_TYPE:
             executor_node = PPExecutor(node=plan)
+        elif plan_node_type == PlanNodeType.LABEL_INDEX_SCAN:
+            executor_node = LabelIndexScanExecutor(node=plan)
 
         # Build Executor Tree for children
         for children in plan.children:
-            executor_node.append_child(self._build_execution_tree(children))
+            child_executor = self._build_execution_tree(children)
+            if self._pipelined:
+                child_executor = PipelineStageExecutor(child_executor,
+                                                       self._queue_size)
+            executor_node.append_child(child_executor)
 
         return executor_node
 
+    def _partitioned_scan(self, plan: AbstractPlan) \
+            -> PartitionedStorageExecutor:
+        """
+        Returns the executor of a chain of sequential scans and PPs over a
+        partitioned storage plan, the predicates of the chain are pushed
+        down into the worker processes so that only the frames satisfying
+        them leave the workers. None if the plan is not such a chain.
+        Sequential scans merging batches for the UDFs are not pushed down.
+        """
+        predicates = []
+        node = plan
+        while node.node_type in (PlanNodeType.SEQUENTIAL_SCAN_TYPE,
+                                 PlanNodeType.PP_FILTER_TYPE):
+            if len(node.children) != 1 or \
+                    getattr(node, 'udf_batch_size', None):
+                return None
+            if node.predicate is not None:
+                predicates.append(node.predicate)
+            node = node.children[0]
+        if node is plan or node.node_type != PlanNodeType.STORAGE_PLAN or \
+                node.num_partitions <= 1:
+            return None
+        return PartitionedStorageExecutor(node=node,
+                                          predicate=predicates[::-1])
+
     def _clean_execution_tree(self, tree_root: AbstractExecutor):
         """clean the execution tree from memory
-        
+
         Arguments:
             tree_root {AbstractExecutor} -- root of execution tree to delete
         """
-        # ToDo
-        # clear all the nodes from the execution tree
+        if tree_root is None:
+            return
+        for child in tree_root.children:
+            self._clean_execution_tree(child)
+        tree_root.children.clear()
+
+    def execute_plan_iter(self, limit: int = None) -> Iterator[FrameBatch]:
+        """execute the plan tree and yield the output batches as soon as
+        they are produced
+
+        Arguments:
+            limit {int} -- maximum number of frames returned. Upstream
+            executors stop producing once it is reached (default: {None})
+
+        Yields:
+            FrameBatch -- output batches of the plan
+        """
+        execution_tree = self._build_execution_tree(self._plan)
+        batches = execution_tree.next()
+        try:
+            if limit is not None and limit <= 0:
+                return
+            num_frames = 0
+            for batch in batches:
+                if limit is not None and \
+                        num_frames + batch.batch_size >= limit:
+                    yield batch[:limit - num_frames]
+                    return
+                num_frames += batch.batch_size
+                yield batch
+        finally:
+            # closing the root generator stops the upstream executors,
+            # including the worker threads/processes they started
+            batches.close()
+            self._clean_execution_tree(execution_tree)
 
     def execute_plan(self):
         """execute the plan tree
@@ -63,12 +153,4 @@ class PlanExecutor:
         """
         # TODO: for now this returns list of batch frames. Update to return
         # a stitched output
-        execution_tree = self._build_execution_tree(self._plan)
-
-        output_batches = []
-
-        for batch in execution_tree.next():
-            output_batches.append(batch)
-
-        self._clean_execution_tree(execution_tree)
-        return output_batches
+        return list(self.execute_plan_iter())
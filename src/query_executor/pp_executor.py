@@ -1,5 +1,8 @@
 from typing import Iterator
 
+import numpy as np
+
+from src.expression.expression_utils import compile_expression
 from src.models.storage.batch import FrameBatch
 from src.query_executor.abstract_executor import AbstractExecutor
 from src.query_planner.abstract_plan import AbstractPlan
@@ -20,6 +23,8 @@ class PPExecutor(AbstractExecutor):
     def __init__(self, node: PPScanPlan):
         super().__init__(node)
         self.predicate = node.predicate
+        # compiled once when the plan is built and reused for every batch
+        self._evaluate_predicate = compile_expression(self.predicate)
 
     def validate(self):
         pass
@@ -27,10 +32,7 @@ class PPExecutor(AbstractExecutor):
     def next(self) -> Iterator[FrameBatch]:
         child_executor = self.children[0]
         for batch in child_executor.next():
-            outcomes = self.predicate.evaluate(batch)
-            required_frame_ids = []
-            for i, outcome in enumerate(outcomes):
-                if outcome:
-                    required_frame_ids.append(i)
+            outcomes = self._evaluate_predicate(batch)
+            required_frame_ids = np.flatnonzero(outcomes)
 
             yield batch[required_frame_ids]
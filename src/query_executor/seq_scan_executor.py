@@ -1,8 +1,14 @@
-from typing import Iterator
+import queue
+import time
+from typing import Iterator, List
 
+import numpy as np
+
+from src.expression.expression_utils import compile_expression
 from src.models.storage.batch import FrameBatch
 from src.query_executor.abstract_executor import AbstractExecutor
 from src.query_planner.seq_scan_plan import SeqScanPlan
+from src.utils.generic_utils import Prefetcher
 
 
 class SequentialScanExecutor(AbstractExecutor):
@@ -11,25 +17,91 @@ class SequentialScanExecutor(AbstractExecutor):
     Arguments:
         node (AbstractPlan): The SequentialScanPlan
 
+    When the plan sets a `udf_batch_size`, consecutive (e.g. PP filtered)
+    child batches are merged until they hold that many frames, or until
+    `udf_batch_deadline` seconds passed since the first one arrived, and
+    the predicate (and the UDFs in it) is evaluated once on the merged
+    batch. The outcome is split back into the originating batches. With
+    a deadline the child is read on a background thread, so that waiting
+    frames are released at the deadline even if the child stalls.
     """
 
     def __init__(self, node: SeqScanPlan):
         super().__init__(node)
         self.predicate = node.predicate
+        # compiled once when the plan is built and reused for every batch
+        self._evaluate_predicate = compile_expression(self.predicate)
+        self.udf_batch_size = getattr(node, 'udf_batch_size', None)
+        self.udf_batch_deadline = getattr(node, 'udf_batch_deadline', None)
 
     def validate(self):
         pass
 
+    def _micro_batches(self, batches: Iterator[FrameBatch]) \
+            -> Iterator[List[FrameBatch]]:
+        """
+        Groups consecutive batches until they hold `udf_batch_size` frames
+        or the deadline passed
+        """
+        pending = []
+        num_frames = 0
+        if self.udf_batch_deadline is None:
+            for batch in batches:
+                pending.append(batch)
+                num_frames += batch.batch_size
+                if num_frames >= self.udf_batch_size:
+                    yield pending
+                    pending = []
+                    num_frames = 0
+        else:
+            prefetcher = Prefetcher(batches, 1)
+            deadline = None
+            try:
+                while True:
+                    timeout = None
+                    if pending:
+                        timeout = max(deadline - time.monotonic(), 0)
+                    try:
+                        batch = prefetcher.get(timeout)
+                    except queue.Empty:
+                        yield pending
+                        pending = []
+                        num_frames = 0
+                        continue
+                    except StopIteration:
+                        break
+                    if not pending:
+                        deadline = time.monotonic() + self.udf_batch_deadline
+                    pending.append(batch)
+                    num_frames += batch.batch_size
+                    if num_frames >= self.udf_batch_size or \
+                            time.monotonic() >= deadline:
+                        yield pending
+                        pending = []
+                        num_frames = 0
+            finally:
+                prefetcher.close()
+        if pending:
+            yield pending
+
     def next(self) -> Iterator[FrameBatch]:
 
         child_executor = self.children[0]
+        if self.predicate is not None and self.udf_batch_size:
+            for batches in self._micro_batches(child_executor.next()):
+                merged = FrameBatch.concatenate(batches)
+                outcomes = np.asarray(self._evaluate_predicate(merged))
+                start = 0
+                for batch in batches:
+                    stop = start + batch.batch_size
+                    yield merged[start + np.flatnonzero(outcomes[start:stop])]
+                    start = stop
+            return
+
         for batch in child_executor.next():
             if self.predicate is not None:
-                outcomes = self.predicate.evaluate(batch)
-                required_frame_ids = []
-                for i, outcome in enumerate(outcomes):
-                    if outcome:
-                        required_frame_ids.append(i)
+                outcomes = self._evaluate_predicate(batch)
+                required_frame_ids = np.flatnonzero(outcomes)
 
                 yield batch[required_frame_ids]
 
@@ -0,0 +1,210 @@
+"""
+Cost based choice of the physical plan of a scan with a predicate.
+
+The candidate plans are:
+    * full scan: StoragePlan -> SeqScanPlan, the predicate (and the UDFs
+      in it) runs on every frame
+    * PP scan: StoragePlan -> PPScanPlan -> SeqScanPlan, a probabilistic
+      predicate drops frames before the predicate runs
+    * label index scan: LabelIndexScanPlan, the predicate is answered from
+      the labels cached in a LabelIndex, nothing is decoded
+"""
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.expression.abstract_expression import AbstractExpression
+from src.models.catalog.video_info import VideoMetaInfo
+from src.query_planner.abstract_plan import AbstractPlan
+from src.query_planner.label_index_scan_plan import LabelIndexScanPlan
+from src.query_planner.pp_plan import PPScanPlan
+from src.query_planner.seq_scan_plan import SeqScanPlan
+from src.query_planner.storage_plan import StoragePlan
+from src.udfs.label_index import LabelIndex
+
+
+class CostModel:
+    """
+    Per frame costs, in seconds, of the operators of a scan
+
+    Arguments:
+        decode_cost (float): decoding a frame
+        udf_cost (float): evaluating the predicate, UDFs included, on a
+        frame
+        index_cost (float): evaluating the predicate on the bitmaps of a
+        LabelIndex, per frame of the video
+        default_selectivity (float): fraction of frames assumed to satisfy
+        a predicate when no index tells otherwise
+
+    """
+
+    def __init__(self, decode_cost: float = 0.005, udf_cost: float = 0.1,
+                 index_cost: float = 1e-8, default_selectivity: float = 0.5):
+        self.decode_cost = decode_cost
+        self.udf_cost = udf_cost
+        self.index_cost = index_cost
+        self.default_selectivity = default_selectivity
+
+
+class PlanCost:
+    """
+    Estimated cost of a physical plan, split by operator
+
+    Attributes:
+        decode (float): seconds spent decoding frames
+        pp (float): seconds spent evaluating probabilistic predicates
+        udf (float): seconds spent evaluating the predicate
+        index (float): seconds spent on label index lookups
+        selectivity (float): estimated fraction of the scanned frames
+        returned by the plan
+    """
+
+    def __init__(self, decode: float = 0., pp: float = 0., udf: float = 0.,
+                 index: float = 0., selectivity: float = 1.):
+        self.decode = decode
+        self.pp = pp
+        self.udf = udf
+        self.index = index
+        self.selectivity = selectivity
+
+    @property
+    def total(self) -> float:
+        return self.decode + self.pp + self.udf + self.index
+
+    def __repr__(self):
+        return 'PlanCost(total={:.4f}, decode={:.4f}, pp={:.4f}, ' \
+               'udf={:.4f}, index={:.6f}, selectivity={:.3f})'.format(
+                   self.total, self.decode, self.pp, self.udf, self.index,
+                   self.selectivity)
+
+
+class CostBasedOptimizer:
+    """
+    Enumerates the physical plans of a scan with a predicate, estimates
+    their cost and picks the cheapest one
+
+    Arguments:
+        cost_model (CostModel): per frame costs of the operators
+
+        label_index (LabelIndex, optional): labels cached for the video
+
+        pps (List[Tuple[AbstractExpression, Dict]]): available
+        probabilistic predicates for the query, each with its statistics:
+        C (cost per frame), R (reduction rate, the fraction of frames it
+        drops) and A (accuracy)
+
+        accuracy_budget (float): minimum accuracy of a usable PP
+
+    """
+
+    def __init__(self, cost_model: CostModel = None,
+                 label_index: LabelIndex = None,
+                 pps: List[Tuple[AbstractExpression, Dict]] = None,
+                 accuracy_budget: float = 0.9):
+        self.cost_model = cost_model if cost_model else CostModel()
+        self.label_index = label_index
+        self.pps = pps if pps else []
+        self.accuracy_budget = accuracy_budget
+
+    def _video_length(self, video: VideoMetaInfo) -> int:
+        capture = cv2.VideoCapture(video.file)
+        length = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        return length
+
+    def _stop(self, video: VideoMetaInfo, limit: int) -> int:
+        """
+        Returns the end of the scanned range, the end of the video when
+        there is no limit (0 if its length is unknown)
+        """
+        if limit is None:
+            return max(self._video_length(video), 0)
+        return limit
+
+    def _measured_selectivity(self, predicate: AbstractExpression):
+        """
+        Returns the fraction of frames satisfying the predicate according
+        to the label index, None if the index can not tell
+        """
+        if self.label_index is not None:
+            bitmap = self.label_index.evaluate(predicate)
+            if bitmap is not None and self.label_index.num_frames:
+                matched = int(np.unpackbits(bitmap).sum())
+                return matched / self.label_index.num_frames
+        return None
+
+    def enumerate_plans(self, video: VideoMetaInfo,
+                        predicate: AbstractExpression, batch_size: int = 1,
+                        skip_frames: int = 0, offset: int = None,
+                        limit: int = None, need_frames: bool = True) \
+            -> List[Tuple[PlanCost, AbstractPlan]]:
+        """
+        Returns the candidate plans with their estimated cost
+
+        Arguments:
+            need_frames (bool): False if only the indices of the frames
+            satisfying the predicate are needed, which allows answering it
+            from the label index
+        """
+        model = self.cost_model
+        start = offset if offset else 0
+        stop = self._stop(video, limit)
+        num_frames = max(stop - start, 0)
+        if skip_frames > 0:
+            num_frames = -(-num_frames // skip_frames)
+        measured = self._measured_selectivity(predicate)
+        selectivity = measured if measured is not None \
+            else self.cost_model.default_selectivity
+        decode = num_frames * model.decode_cost
+
+        def storage_plan():
+            return StoragePlan(video, batch_size=batch_size,
+                               skip_frames=skip_frames, offset=offset,
+                               limit=limit)
+
+        plans = []
+        seq_scan = SeqScanPlan(predicate, [], [], [])
+        seq_scan.append_child(storage_plan())
+        plans.append((PlanCost(decode=decode,
+                               udf=num_frames * model.udf_cost,
+                               selectivity=selectivity), seq_scan))
+
+        for pp_predicate, stats in self.pps:
+            if stats['A'] < self.accuracy_budget:
+                continue
+            pp_scan = PPScanPlan(pp_predicate)
+            pp_scan.append_child(storage_plan())
+            seq_scan = SeqScanPlan(predicate, [], [], [])
+            seq_scan.append_child(pp_scan)
+            # an accurate PP keeps the frames satisfying the predicate, it
+            # can not drop more than the others whatever its R
+            passed = 1 - stats['R']
+            if measured is not None:
+                passed = max(passed, measured)
+            passed *= num_frames
+            plans.append((PlanCost(decode=decode,
+                                   pp=num_frames * stats['C'],
+                                   udf=passed * model.udf_cost,
+                                   selectivity=selectivity), seq_scan))
+
+        index = self.label_index
+        # the index answers the query only if it covers the whole scanned
+        # range, which is unknown when the length of the video is
+        if not need_frames and skip_frames <= 1 and index is not None and \
+                stop > 0 and index.covers(start, stop) and \
+                index.evaluate(predicate) is not None:
+            plans.append((PlanCost(index=num_frames * model.index_cost,
+                                   selectivity=selectivity),
+                          LabelIndexScanPlan(predicate, index,
+                                             batch_size=batch_size,
+                                             offset=offset, limit=limit)))
+        return plans
+
+    def optimize(self, video: VideoMetaInfo, predicate: AbstractExpression,
+                 **kwargs) -> AbstractPlan:
+        """
+        Returns the cheapest plan, see enumerate_plans for the arguments
+        """
+        plans = self.enumerate_plans(video, predicate, **kwargs)
+        return min(plans, key=lambda candidate: candidate[0].total)[1]
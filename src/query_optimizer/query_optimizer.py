@@ -13,7 +13,6 @@ python query_optimizer/query_optimizer.py
 
 """
 import os
-import socket
 # The query optimizer decide how to label the data points
 # Load the series of queries from a txt file?
 import sys
@@ -28,6 +27,92 @@ eva_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(eva_dir)
 
 
+class _PPExpression:
+    """
+    PP expression explored by QueryOptimizer._compute_expression: a PP
+    model, or PP expressions joined by a single operator ("&&" or "||").
+    A node has at most one compound child, which is evaluated first, so
+    that the expression can be flattened into a left to right chain.
+    """
+
+    def __init__(self, operator=None, children=(), pp=None, model=None,
+                 cost=0., reduction=0., accuracy=1.):
+        self.operator = operator
+        self.children = list(children)
+        self.pp = pp
+        self.model = model
+        self.cost = cost
+        self.reduction = reduction
+        self.accuracy = accuracy
+        self.count = sum(child.count for child in self.children) \
+            if self.children else 1
+
+    @staticmethod
+    def leaf(pp, model, stats):
+        return _PPExpression(pp=pp, model=model, cost=stats["C"],
+                             reduction=stats["R"], accuracy=stats["A"])
+
+    @staticmethod
+    def combine(operator, left, right):
+        """
+        Returns left operator right, None if it can not be chained
+        """
+        children = []
+        for expression in (left, right):
+            if expression.operator == operator:
+                children.extend(expression.children)
+            else:
+                children.append(expression)
+        compound = [child for child in children if child.operator]
+        if len(compound) > 1:
+            return None
+
+        def rank(child):
+            # C/R for &&, C/(1-R) for ||: cheap and selective PPs first
+            passed = child.reduction if operator == "&&" \
+                else 1 - child.reduction
+            return child.cost / passed if passed > 0 else float("inf")
+
+        children = compound + sorted(
+            (child for child in children if not child.operator), key=rank)
+        # evaluation short circuits, a PP only sees the frames the previous
+        # ones did not decide on
+        cost = 0.
+        undecided = 1.
+        for child in children:
+            cost += undecided * child.cost
+            undecided *= 1 - child.reduction if operator == "&&" \
+                else child.reduction
+        if operator == "&&":
+            reduction = 1 - undecided
+            accuracy = float(np.prod([child.accuracy for child in children]))
+        else:
+            reduction = undecided
+            accuracy = min(child.accuracy for child in children)
+        return _PPExpression(operator, children, cost=cost,
+                             reduction=reduction, accuracy=accuracy)
+
+    def feasible(self, k, accuracy_budget):
+        return self.count <= k and self.accuracy >= accuracy_budget
+
+    def dominates(self, other):
+        return self.cost <= other.cost and \
+            self.reduction >= other.reduction and \
+            self.accuracy >= other.accuracy and self.count <= other.count
+
+    def flatten(self):
+        """
+        :return: [(pp_name, model_name), ...] and the operators between them
+        """
+        if not self.operator:
+            return [(self.pp, self.model)], []
+        pps, operators = self.children[0].flatten()
+        for child in self.children[1:]:
+            pps.append((child.pp, child.model))
+            operators.append(self.operator)
+        return pps, operators
+
+
 class QueryOptimizer:
     """
     TODO: If you have a classifier for =, you can make a classifier for !=
@@ -36,6 +121,7 @@ class QueryOptimizer:
 
     def __init__(self, ip_str="127.0.0.1"):
         self.ip_str = ip_str
+        self.server = None
         # self.startSocket()
         self.operators = ["!=", ">=", "<=", "=", "<", ">"]
         self.separators = ["||", "&&"]
@@ -67,19 +153,14 @@ class QueryOptimizer:
         """
         pass
 
-    def inputQueriesFromSocket(self):
-        sock = socket.socket()
-        sock.bind(self.ip_str, 123)
-        sock.listen(3)
-        print("Waiting on connection")
-        conn = sock.accept()
-        print("Client connected")
-        while True:
-            m = conn[0].recv(4096)
-            conn[0].send(m[::-1])
-
-        sock.shutdown(socket.SHUT_RDWR)
-        sock.close()
+    def inputQueriesFromSocket(self, port=123):
+        """
+        Serves FrameQL queries over TCP, see src.server.query_server
+        :param port: port to listen on
+        """
+        from src.server.query_server import QueryServer
+        self.server = QueryServer(self.ip_str, port)
+        self.server.serve_forever()
 
     def _findParenthesis(self, query):
 
@@ -194,13 +275,15 @@ class QueryOptimizer:
             if l_desc[0] == constants.DISCRETE:
                 equivalence = [self.convertL2S([query_sub_list], [])]
                 assert (operator == "=" or operator == "!=")
+                # t=van <=> t!=car && t!=bus, t!=van <=> t=car || t=bus
+                joiner = " && " if operator == "=" else " || "
                 alternate_string = ""
                 for category in l_desc[1]:
                     if category != object:
                         alternate_string += subject + self._logic_reverse(
-                            operator) + category + " && "
+                            operator) + category + joiner
                 alternate_string = alternate_string[
-                    :-len(" && ")]  # must strip the last ' || '
+                    :-len(joiner)]  # must strip the last joiner
                 # query_tmp, _ = self._parseQuery(alternate_string)
                 equivalence.append(alternate_string)
 
@@ -240,7 +323,7 @@ class QueryOptimizer:
         return query_transformed, query_operators
 
     def _compute_expression(self, query_info, pp_list, pp_stats, k,
-                            accuracy_budget):
+                            accuracy_budget, udf_cost=None):
         """
 
         def QueryOptimizer(P, {trained PPs}):
@@ -269,72 +352,125 @@ class QueryOptimizer:
         :param pp_stats: list of pp models associated with each pp name with
         R,C,A values saved
         :param k: number of pps we can use at maximum
-        :return: the list of pps to use that maximizes reduction rate (ATM)
+        :param accuracy_budget: minimum accuracy of the whole PP expression
+        :param udf_cost: cost of the UDF per frame, in the unit of C. The
+        expression minimizing C + (1 - R) * udf_cost is picked if given,
+        else the one with the highest reduction rate
+        :return: [[(pp_name, model_name), ...], operators, reduction rate]
+        of the best PP expression. Applying the operators from left to
+        right over the predictions of the PPs evaluates the expression
+
+        The search is a dynamic program over the left to right chain of
+        sub-queries. The best expressions of every alternative form of a
+        sub-query are memoized, and for each prefix of the chain only the
+        expressions which are not dominated in cost, reduction rate,
+        accuracy and number of PPs are kept. Sub-queries joined by && may
+        be left out; the accuracy budget is spent across the PPs through
+        the accuracy of their models (AND multiplies accuracies, OR takes
+        the lowest one). Within an expression the PPs joined by && are
+        ordered by C/R and the ones joined by || by C/(1-R), which
+        minimizes the expected cost when evaluation short circuits.
         """
-        evaluations = []
-        evaluation_models = []
-        evaluations_stats = []
         query_transformed, query_operators = query_info
-        # query_transformed = [[["t", "!=", "car"], ["t", "=", "van"]], ... ]
-        for possible_query in query_transformed:
-            evaluation = []
-            evaluation_stats = []
-            k_count = 0
-            op_index = 0
-            for query_sub in possible_query:  # Even inside query_sub it can
-                # be divided into query_sub_sub
-                if k_count > k:  # TODO: If you exceed a certain number,
-                    # you just ignore the expression
-                    evaluation = []
-                    evaluation_stats = []
+        if len(query_transformed) == 0:
+            return [[], [], 0]
+        # alternative forms of each sub-query of the chain, in order
+        alternatives = [list(dict.fromkeys(forms))
+                        for forms in zip(*query_transformed)]
+        memo = {}
+
+        def pp_options(pp_name):
+            if pp_name not in pp_list or pp_name not in pp_stats:
+                return []
+            return [_PPExpression.leaf(pp_name, model, stats)
+                    for model, stats in pp_stats[pp_name].items()
+                    if stats["A"] >= accuracy_budget]
+
+        def form_options(form):
+            # best expressions of one alternative form, memoized
+            if form not in memo:
+                pp_names, operators = self._parseQuery(form)
+                pp_names = [''.join(pp_name) for pp_name in pp_names]
+                memo[form] = self._search_chain(
+                    [pp_options(pp_name) for pp_name in pp_names],
+                    operators, k, accuracy_budget)
+            return memo[form]
+
+        sub_options = []
+        for forms in alternatives:
+            options = []
+            for form in forms:
+                options.extend(option for option in form_options(form)
+                               if option is not None)
+            sub_options.append(self._pareto(options, k, accuracy_budget))
+
+        candidates = [expression for expression in self._search_chain(
+            sub_options, query_operators, k, accuracy_budget)
+            if expression is not None]
+        if len(candidates) == 0:
+            return [[], [], 0]
+        if udf_cost is None:
+            best = max(candidates,
+                       key=lambda e: (e.reduction, -e.cost, -e.count))
+        else:
+            best = min(candidates,
+                       key=lambda e: e.cost + (1 - e.reduction) * udf_cost)
+
+        pps, operators = best.flatten()
+        op_names = [np.logical_and if operator == "&&" else np.logical_or
+                    for operator in operators]
+        return [pps, op_names, best.reduction]
+
+    def _search_chain(self, options, operators, k, accuracy_budget):
+        """
+        Dynamic program over a left to right chain `x1 op1 x2 op2 ...`
+        :param options: candidate PP expressions for each element
+        :param operators: "&&" or "||" between the elements
+        :return: non dominated PP expressions for the whole chain, None
+        stands for no filtering
+        """
+        states = [None]
+        for i, element_options in enumerate(options):
+            operator = "&&" if i == 0 else operators[i - 1]
+            next_states = []
+            for state in states:
+                if operator == "&&":
+                    # a conjunct can always be left out of the filter
+                    next_states.append(state)
+                elif state is None:
+                    # nothing || x keeps every frame
+                    next_states.append(None)
                     continue
-                query_sub_list, query_sub_operators = self._parseQuery(
-                    query_sub)
-                evaluation_tmp = []
-                evaluation_models_tmp = []
-                evaluation_stats_tmp = []
-                for i in range(len(query_sub_list)):
-                    query_sub_str = ''.join(query_sub_list[i])
-                    if query_sub_str in pp_list:
-                        # Find the best model for the pp
-
-                        data = self._find_model(query_sub_str, pp_stats,
-                                                accuracy_budget)
-                        if data is None:
-                            continue
-                        else:
-                            model, reduction_rate = data
-                            evaluation_tmp.append(query_sub_str)
-                            evaluation_models_tmp.append(
-                                model)  # TODO: We need to make sure this is
-                            # the model_name
-                            evaluation_stats_tmp.append(reduction_rate)
-                            k_count += 1
-
-                reduc_rate = 0
-                if len(evaluation_stats_tmp) != 0:
-                    reduc_rate = self._update_stats(evaluation_stats_tmp,
-                                                    query_sub_operators)
-
-                evaluation.append(query_sub)
-                evaluation_models.append(evaluation_models_tmp)
-                evaluation_stats.append(reduc_rate)
-            op_index += 1
-
-            evaluations.append(self.convertL2S(evaluation, query_operators))
-            evaluations_stats.append(
-                self._update_stats(evaluation_stats, query_operators))
-
-        max_index = np.argmax(np.array(evaluations_stats), axis=0)
-        best_query = evaluations[
-            max_index]  # this will be something like "t!=bus && t!=truck &&
-        # t!=car"
-        best_models = evaluation_models[max_index]
-        best_reduction_rate = evaluations_stats[max_index]
-
-        pp_names, op_names = self._convertQuery2PPOps(best_query)
-        return [list(zip(pp_names, best_models)), op_names,
-                best_reduction_rate]
+                for option in element_options:
+                    if state is None:
+                        next_states.append(option)
+                        continue
+                    combined = _PPExpression.combine(operator, state, option)
+                    if combined is not None:
+                        next_states.append(combined)
+            states = self._pareto(next_states, k, accuracy_budget)
+        return states
+
+    @staticmethod
+    def _pareto(expressions, k, accuracy_budget, max_size=64):
+        """
+        Drops infeasible and dominated expressions
+        """
+        feasible = []
+        for expression in expressions:
+            if expression is None:
+                if None not in feasible:
+                    feasible.append(None)
+            elif expression.feasible(k, accuracy_budget):
+                feasible.append(expression)
+        kept = [None] if None in feasible else []
+        expressions = sorted((e for e in feasible if e is not None),
+                             key=lambda e: (e.cost, -e.reduction))
+        for expression in expressions:
+            if not any(other.dominates(expression) for other in kept
+                       if other is not None):
+                kept.append(expression)
+        return kept[:max_size]
 
     def _convertQuery2PPOps(self, query):
         """
@@ -381,22 +517,37 @@ class QueryOptimizer:
             R = 0.000001
         return float(C) / R
 
-    def _find_model(self, pp_name, pp_stats, accuracy_budget):
+    def _compute_cost(self, C, R, udf_cost):
+        """
+        Cost per frame of a PP followed by the UDF on the frames it keeps
+        """
+        return C + (1 - R) * udf_cost
+
+    def _find_model(self, pp_name, pp_stats, accuracy_budget, udf_cost=None):
+        """
+        :param udf_cost: cost of the UDF per frame, in the unit of C. The
+        model minimizing C + (1 - R) * udf_cost is picked if given, else
+        the one with the lowest C/R
+        :return: (model name, reduction rate), None if no model is
+        accurate enough
+        """
         possible_models = pp_stats[pp_name]
-        best = []  # [best_model_name, best_model_cost /
+
+        def cost(stats):
+            if udf_cost is None:
+                return self._compute_cost_red_rate(stats["C"], stats["R"])
+            return self._compute_cost(stats["C"], stats["R"], udf_cost)
+
+        best = []  # [best_model_name, best_model_cost,
         # best_model_reduction_rate]
         for possible_model in possible_models:
             if possible_models[possible_model]["A"] < accuracy_budget:
                 continue
             if best == []:
-                best = [possible_model, self._compute_cost_red_rate(
-                    possible_models[possible_model]["C"],
-                    possible_models[possible_model]["R"]),
-                    possible_models[possible_model]["R"]]
+                best = [possible_model, cost(possible_models[possible_model]),
+                        possible_models[possible_model]["R"]]
             else:
-                alternative_best_cost = self._compute_cost_red_rate(
-                    possible_models[possible_model]["C"],
-                    possible_models[possible_model]["R"])
+                alternative_best_cost = cost(possible_models[possible_model])
                 if alternative_best_cost < best[1]:
                     best = [possible_model, alternative_best_cost,
                             possible_models[possible_model]["R"]]
@@ -406,8 +557,43 @@ class QueryOptimizer:
         else:
             return best[0], best[2]
 
+    def plan_scan(self, video, predicate, pp_predicates, pp_stats,
+                  cost_model=None, label_index=None, accuracy_budget=0.9,
+                  **kwargs):
+        """
+        Builds the physical plan of a scan of the video with the predicate:
+        a full scan, a scan filtered by one of the PPs or a label index
+        scan, whichever the cost model finds the cheapest
+
+        :param video: VideoMetaInfo of the scanned video
+        :param predicate: predicate of the query
+        :param pp_predicates: {pp_name: {model_name: expression}}, the PP
+        expressions usable for the query, for every trained model
+        :param pp_stats: R, C and A of the models, as given to run
+        :param cost_model: CostModel, per frame costs of the operators
+        :param label_index: LabelIndex of the labels cached for the video
+        :param accuracy_budget: minimum accuracy of a PP
+        :param kwargs: see CostBasedOptimizer.enumerate_plans
+        :return: the plan
+        """
+        from src.query_optimizer.cost_based_optimizer import \
+            CostBasedOptimizer, CostModel
+        cost_model = cost_model if cost_model else CostModel()
+        pps = []
+        for pp_name, expressions in pp_predicates.items():
+            if pp_name not in pp_stats:
+                continue
+            best = self._find_model(pp_name, pp_stats, accuracy_budget,
+                                    cost_model.udf_cost)
+            if best is not None and best[0] in expressions:
+                pps.append((expressions[best[0]], pp_stats[pp_name][best[0]]))
+        optimizer = CostBasedOptimizer(cost_model, label_index=label_index,
+                                       pps=pps,
+                                       accuracy_budget=accuracy_budget)
+        return optimizer.optimize(video, predicate, **kwargs)
+
     def run(self, query, pp_list, pp_stats, label_desc, k=3,
-            accuracy_budget=0.9):
+            accuracy_budget=0.9, udf_cost=None):
         """
 
         :param query: query of interest ex) TRAF-20
@@ -416,12 +602,15 @@ class QueryOptimizer:
                          it will have statistics saved which are R (
                          reduction_rate), C (cost_to_train), A (accuracy)
         :param k: number of different PPs that are in any expression E
+        :param accuracy_budget: minimum accuracy of the PP expression
+        :param udf_cost: cost of the UDF per frame, see _compute_expression
         :return: selected PPs to use for reduction
         """
         query_transformed, query_operators = self._wrangler(query, label_desc)
         # query_transformed is a comprehensive list of transformed queries
         return self._compute_expression([query_transformed, query_operators],
-                                        pp_list, pp_stats, k, accuracy_budget)
+                                        pp_list, pp_stats, k, accuracy_budget,
+                                        udf_cost)
 
 
 if __name__ == "__main__":
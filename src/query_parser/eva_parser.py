@@ -1,21 +1,91 @@
 import sys
+import time
+
 from antlr4 import InputStream, CommonTokenStream
-from third_party.evaQL.parser.frameQLParser import frameQLParser
-from third_party.evaQL.parser.frameQLLexer import frameQLLexer
-from src.query_parser.eva_ql_parser_visitor import EvaParserVisitor
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 
 
 class EvaFrameQLParser():
     """
     Parser for eva; based on frameQL grammar
+
+    The generated parser is only imported on the first parse, importing it
+    deserializes the ATN of the whole grammar.
+
+    Queries are first parsed in SLL prediction mode, which is much faster
+    than the default ALL(*) mode on this grammar and succeeds for most
+    queries. Only when it fails the query is parsed again in LL mode, which
+    also reports the syntax errors.
+
+    Arguments:
+        sll (bool): try SLL prediction before falling back to LL
     """
-    def __init__(self):
-        self._visitor = EvaParserVisitor()
-    
-    def parse(self, query_string: str) -> list:    
-        lexer = frameQLLexer(InputStream(query_string))
+    _lexer_class = None
+    _parser_class = None
+    _visitor_class = None
+
+    def __init__(self, sll: bool = True):
+        self.sll = sll
+        self._visitor = None
+
+    @classmethod
+    def _load(cls):
+        if cls._parser_class is None:
+            from third_party.evaQL.parser.frameQLLexer import frameQLLexer
+            from third_party.evaQL.parser.frameQLParser import frameQLParser
+            from src.query_parser.eva_ql_parser_visitor import \
+                EvaParserVisitor
+            cls._lexer_class = frameQLLexer
+            cls._visitor_class = EvaParserVisitor
+            cls._parser_class = frameQLParser
+
+    def parse(self, query_string: str) -> list:
+        if self._visitor is None:
+            self._load()
+            self._visitor = self._visitor_class()
+        lexer = self._lexer_class(InputStream(query_string))
         stream = CommonTokenStream(lexer)
-        parser = frameQLParser(stream)
-        tree = parser.root()
+        parser = self._parser_class(stream)
+        tree = None
+        if self.sll:
+            parser._interp.predictionMode = PredictionMode.SLL
+            parser._errHandler = BailErrorStrategy()
+            parser.removeErrorListeners()
+            try:
+                tree = parser.root()
+            except ParseCancellationException:
+                stream.seek(0)
+                parser.reset()
+                parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+                parser._errHandler = DefaultErrorStrategy()
+                parser._interp.predictionMode = PredictionMode.LL
+        if tree is None:
+            tree = parser.root()
         return self._visitor.visit(tree)
-        
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    # Startup benchmark, run in a fresh process:
+    # python -m src.query_parser.eva_parser [repetitions]
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    query = "SELECT CLASS,REDNESS FROM TAIPAI \
+        WHERE (CLASS = 'VAN' AND REDNESS < 300.0) OR REDNESS > 500.0;"
+
+    tic = time.time()
+    EvaFrameQLParser._load()
+    print("load parser: %.3fs" % (time.time() - tic))
+
+    for sll in (True, False):
+        parser = EvaFrameQLParser(sll=sll)
+        tic = time.time()
+        parser.parse(query)
+        first = time.time() - tic
+        tic = time.time()
+        for _ in range(repetitions):
+            parser.parse(query)
+        print("%s: first parse %.3fs, then %.2fms per query"
+              % ("SLL" if sll else "LL", first,
+                 (time.time() - tic) / repetitions * 1000))
@@ -0,0 +1,162 @@
+import copy
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+from src.expression.abstract_expression import AbstractExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.query_parser.eva_statement import EvaStatement
+
+# String and numeric literals of the frameQL lexer. Digits which are part
+# of an identifier (e.g. TRAF20) are not literals.
+_LITERAL = re.compile(r"""'(?:[^'\\]|\\.|'')*'"""
+                      r'''|"(?:[^"\\]|\\.|"")*"'''
+                      r'|(?<![\w$.])(?:\d*\.\d+|\d+\.?)(?:E-?\d+)?(?![\w$.])')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str):
+    """
+    Splits a query into its shape and its literal constants.
+    Queries which only differ in their constants and whitespace have the
+    same shape, e.g. `CLASS = 'VAN'` and `CLASS = 'CAR'`.
+
+    Returns:
+        (str, List[str]): shape of the query and its literals in order
+    """
+    literals = []
+    shape = []
+    position = 0
+    for match in _LITERAL.finditer(query):
+        shape.append(_WHITESPACE.sub(' ', query[position:match.start()]))
+        literal = match.group()
+        # strings and numbers are parsed into different trees
+        shape.append('?s' if literal[0] in '\'"' else '?n')
+        literals.append(literal)
+        position = match.end()
+    shape.append(_WHITESPACE.sub(' ', query[position:]))
+    return ''.join(shape).strip(), literals
+
+
+def _literal_value(literal: str):
+    # mirrors the constants built by EvaParserVisitor
+    if literal[0] in '\'"':
+        return literal
+    return float(literal)
+
+
+def _constants(statements: List[EvaStatement]) \
+        -> List[ConstantValueExpression]:
+    """
+    Returns the constants of the statements in query text order
+    """
+    constants = []
+
+    def visit(expression: AbstractExpression):
+        if isinstance(expression, ConstantValueExpression):
+            constants.append(expression)
+        for index in range(expression.get_children_count()):
+            visit(expression.get_child(index))
+
+    for statement in statements:
+        for expression in getattr(statement, 'target_list', None) or []:
+            visit(expression)
+        if getattr(statement, 'where_clause', None) is not None:
+            visit(statement.where_clause)
+    return constants
+
+
+class _Entry:
+    def __init__(self, statements, constants):
+        self.statements = statements
+        self.constants = constants
+        self.plans = None
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of parsed statements and plans, keyed by the shape of
+    the query (see normalize_query). A query with a cached shape is neither
+    parsed nor planned again: a copy of the cached statements and plans is
+    returned with the constants of the query bound in.
+
+    Arguments:
+        plan_builder (Callable): builds the plan of a statement
+        max_size (int): maximum number of cached query shapes
+        parser: parser of the queries, EvaFrameQLParser by default
+
+    """
+
+    def __init__(self, plan_builder: Callable = None, max_size: int = 128,
+                 parser=None):
+        self.plan_builder = plan_builder
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._parser = parser
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._parser_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _parse(self, query: str):
+        with self._parser_lock:
+            if self._parser is None:
+                from src.query_parser.eva_parser import EvaFrameQLParser
+                self._parser = EvaFrameQLParser()
+            return self._parser.parse(query)
+
+    def _lookup(self, query: str):
+        shape, literals = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(shape)
+            if entry is not None:
+                self._entries.move_to_end(shape)
+                self.hits += 1
+                return entry, literals
+            self.misses += 1
+
+        statements = self._parse(query)
+        constants = _constants(statements)
+        values = [_literal_value(literal) for literal in literals]
+        entry = _Entry(statements, constants)
+        # only shapes whose every literal maps to a constant of the tree
+        # can be rebound; anything else is parsed every time
+        if statements and [c.evaluate() for c in constants] == values:
+            with self._lock:
+                self._entries[shape] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry, literals
+
+    def _bind(self, entry: _Entry, literals: List[str], plans: bool):
+        # statements, plans and constants are copied together so that the
+        # copied plans share the copied expressions
+        with self._lock:
+            statements, built_plans, constants = copy.deepcopy(
+                (entry.statements, entry.plans if plans else None,
+                 entry.constants))
+        for constant, literal in zip(constants, literals):
+            constant._value = _literal_value(literal)
+        return statements, built_plans
+
+    def parse(self, query: str) -> List[EvaStatement]:
+        """
+        Returns the statements of the query
+        """
+        entry, literals = self._lookup(query)
+        return self._bind(entry, literals, False)[0]
+
+    def plan(self, query: str) -> list:
+        """
+        Returns the plans of the statements of the query
+        """
+        entry, literals = self._lookup(query)
+        with self._lock:
+            if entry.plans is None:
+                entry.plans = [self.plan_builder(statement)
+                               for statement in entry.statements]
+        return self._bind(entry, literals, True)[1]
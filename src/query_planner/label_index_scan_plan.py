@@ -0,0 +1,49 @@
+from src.expression.abstract_expression import AbstractExpression
+from src.query_planner.abstract_scan_plan import AbstractScan
+from src.query_planner.types import PlanNodeType
+from src.udfs.label_index import LabelIndex
+
+
+class LabelIndexScanPlan(AbstractScan):
+    """
+    This plan is used for answering a predicate over labels of a UDF from
+    a LabelIndex instead of scanning the video. It has no children.
+
+    Arguments:
+        predicate (AbstractExpression): A predicate expression the index
+        can answer (see LabelIndex.evaluate)
+
+        label_index (LabelIndex): Index of the labels of the video
+
+        batch_size (int, default: 1): Number of frame indices per batch
+
+        offset (int, optional): First frame of the scanned range
+
+        limit (int, optional): End (exclusive) of the scanned range
+    """
+
+    def __init__(self, predicate: AbstractExpression,
+                 label_index: LabelIndex, batch_size: int = 1,
+                 offset: int = None, limit: int = None):
+        super().__init__(predicate, [], [], [])
+        self._node_type = PlanNodeType.LABEL_INDEX_SCAN
+        self._label_index = label_index
+        self._batch_size = batch_size
+        self._offset = offset
+        self._limit = limit
+
+    @property
+    def label_index(self) -> LabelIndex:
+        return self._label_index
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def limit(self) -> int:
+        return self._limit
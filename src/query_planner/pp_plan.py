@@ -14,4 +14,5 @@ class PPScanPlan(AbstractScan):
     """
 
     def __init__(self, predicate: AbstractExpression):
-        super().__init__(PlanNodeType.PP_FILTER_TYPE, predicate)
+        super().__init__(predicate, [], [], [])
+        self._node_type = PlanNodeType.PP_FILTER_TYPE
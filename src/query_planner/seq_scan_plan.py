@@ -17,12 +17,32 @@ class SeqScanPlan(AbstractScan):
 
         column_ids List[int]: List of columns which need to be selected
         (Note: This attribute might be removed in future)
+
+        udf_batch_size (int, optional): Number of frames accumulated from
+        the child batches before the predicate is evaluated. Each input
+        batch is evaluated on its own when None
+
+        udf_batch_deadline (float, optional): Maximum number of seconds
+        spent accumulating frames for a single predicate evaluation,
+        enforced even while the child produces no batch
     """
 
     def __init__(self, predicate: AbstractExpression,
                  videos: List[AbstractVideoLoader],
-                 column_ids: List[str], foreign_column_ids: List[str]):
+                 column_ids: List[str], foreign_column_ids: List[str],
+                 udf_batch_size: int = None,
+                 udf_batch_deadline: float = None):
         super().__init__(predicate, videos, column_ids, foreign_column_ids)
+        self._udf_batch_size = udf_batch_size
+        self._udf_batch_deadline = udf_batch_deadline
+
+    @property
+    def udf_batch_size(self) -> int:
+        return self._udf_batch_size
+
+    @property
+    def udf_batch_deadline(self) -> float:
+        return self._udf_batch_deadline
 
     def get_node_type(self):
         return PlanNodeType.SEQUENTIAL_SCAN_TYPE
@@ -7,16 +7,31 @@ class StoragePlan(AbstractPlan):
     """
     This is the plan used for retrieving the frames from the storage and
     and returning to the higher levels.
+
+    Arguments:
+        prefetch (int, default: 0): Number of batches decoded ahead of the
+        consumer on a background thread
+
+        seek_threshold (int, default: None): Minimum number of consecutive
+        skipped frames for which the loader seeks instead of grabbing
+
+        num_partitions (int, default: 1): Number of segments of the video
+        which are scanned in parallel by worker processes
     """
 
     def __init__(self, video: VideoMetaInfo, batch_size: int = 1,
-                 skip_frames: int = 0, offset: int = None, limit: int = None):
+                 skip_frames: int = 0, offset: int = None, limit: int = None,
+                 prefetch: int = 0, seek_threshold: int = None,
+                 num_partitions: int = 1):
         super().__init__(PlanNodeType.STORAGE_PLAN)
         self._video = video
         self._batch_size = batch_size
         self._skip_frames = skip_frames
         self._offset = offset
         self._limit = limit
+        self._prefetch = prefetch
+        self._seek_threshold = seek_threshold
+        self._num_partitions = num_partitions
 
     @property
     def video(self):
@@ -37,3 +52,15 @@ class StoragePlan(AbstractPlan):
     @property
     def limit(self):
         return self._limit
+
+    @property
+    def prefetch(self):
+        return self._prefetch
+
+    @property
+    def seek_threshold(self):
+        return self._seek_threshold
+
+    @property
+    def num_partitions(self):
+        return self._num_partitions
@@ -10,3 +10,4 @@ class PlanNodeType(IntEnum):
     LOGICAL_PROJECTION = 5
     LOGICAL_INNER_JOIN = 6
     TABLE = 7
+    LABEL_INDEX_SCAN = 8
@@ -0,0 +1,273 @@
+"""
+asyncio based query server. Clients send one FrameQL query per line and
+get back one JSON message per line:
+
+    {"query_id": 1, "status": "accepted"}
+    {"query_id": 1, "frames": [0, 2, 5]}       (one per result batch)
+    {"query_id": 1, "status": "done"}          (or "cancelled"/"error")
+
+Sending `CANCEL <query_id>` cancels a running query. Queries of all the
+connected clients run on a bounded pool of worker threads.
+"""
+import asyncio
+import concurrent.futures
+import json
+import threading
+from typing import Callable, List
+
+from src.expression.abstract_expression import AbstractExpression, \
+    ExpressionType
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.query_executor.plan_executor import PlanExecutor
+from src.query_optimizer.cost_based_optimizer import CostBasedOptimizer
+from src.query_parser.query_cache import QueryCache
+from src.query_parser.select_statement import SelectStatement
+from src.query_planner.abstract_plan import AbstractPlan
+from src.query_planner.storage_plan import StoragePlan
+
+CANCEL_COMMAND = 'CANCEL'
+
+
+def _unbound_columns(expression: AbstractExpression) -> List[str]:
+    """
+    Returns the columns of an expression which are not bound to a column
+    of the scanned tuples
+    """
+    if expression.etype == ExpressionType.TUPLE_VALUE:
+        return [expression.col_name] if expression.col_idx is None else []
+    columns = []
+    for i in range(expression.get_children_count()):
+        columns += _unbound_columns(expression.get_child(i))
+    return columns
+
+
+def build_scan_plan(statement: SelectStatement,
+                    optimizer: CostBasedOptimizer = None) -> AbstractPlan:
+    """
+    Builds the physical plan of a simple select: a scan with the WHERE
+    predicate over the video named in the FROM clause. The scan is picked
+    by the optimizer, which knows the PPs and the label index available
+    (bind it with functools.partial to pass it as a plan_builder)
+
+    The scan reads raw frames and no column is bound to them, so this
+    builder only serves queries without a WHERE clause. Predicates over
+    unbound columns (e.g. UDF outputs) are rejected with a ValueError,
+    which the server reports as an "error" status. Servers answering
+    filtered queries need a plan_builder binding their columns.
+    """
+    video = VideoMetaInfo(statement.from_table.table_info.table_name, 30,
+                          VideoFormat.MOV)
+    storage_plan = StoragePlan(video, batch_size=32)
+    if statement.where_clause is None:
+        return storage_plan
+    columns = _unbound_columns(statement.where_clause)
+    if columns:
+        raise ValueError('Can not evaluate the WHERE clause, column(s) %s '
+                         'are not bound' % ', '.join(columns))
+    optimizer = optimizer if optimizer else CostBasedOptimizer()
+    return optimizer.optimize(video, statement.where_clause,
+                              batch_size=storage_plan.batch_size)
+
+
+class QueryServer:
+    """
+    Arguments:
+        host (str): address the server listens on
+        port (int): port the server listens on (0 picks a free port)
+        max_workers (int): number of queries executed concurrently
+        queue_size (int): number of result batches buffered per query
+        before the query is paused until the client reads them
+        plan_builder (Callable): builds the plan of a parsed statement,
+        plans are cached per query shape (see QueryCache). The default
+        build_scan_plan only serves queries without a WHERE clause
+
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 max_workers: int = 4, queue_size: int = 2,
+                 plan_builder: Callable = build_scan_plan):
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.plan_builder = plan_builder
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._slots = None
+        self._server = None
+        self._clients = set()
+        self._queries = QueryCache(plan_builder)
+        self._loop = None
+        # set once serve_forever listens
+        self.started = threading.Event()
+
+    async def start(self):
+        """
+        Starts listening. `port` is updated with the bound port.
+        """
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._server = await asyncio.start_server(self._accept, self.host,
+                                                  self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for client in self._clients:
+            client.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        self._pool.shutdown(wait=False)
+
+    def serve_forever(self):
+        """
+        Runs the server on a new event loop until stop() is called. May be
+        called from any thread.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self.start())
+            self.started.set()
+            loop.run_forever()
+        finally:
+            if self._server is not None:
+                loop.run_until_complete(self.close())
+            loop.close()
+
+    def stop(self):
+        """
+        Stops serve_forever, thread safe
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _accept(self, reader: asyncio.StreamReader,
+                writer: asyncio.StreamWriter):
+        client = asyncio.ensure_future(self._handle_client(reader, writer))
+        self._clients.add(client)
+        client.add_done_callback(self._clients.discard)
+
+    async def _handle_client(self, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter):
+        queries = {}
+        write_lock = asyncio.Lock()
+        query_id = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip()
+                if not command:
+                    continue
+                if command.startswith(CANCEL_COMMAND + ' '):
+                    task = queries.get(command[len(CANCEL_COMMAND):].strip())
+                    if task is not None:
+                        task.cancel()
+                    continue
+                query_id += 1
+                task = asyncio.ensure_future(
+                    self._run_query(query_id, command, writer, write_lock))
+                queries[str(query_id)] = task
+                task.add_done_callback(
+                    lambda _, key=str(query_id): queries.pop(key, None))
+                # let the query start so that a following CANCEL always
+                # gets it a terminal status message
+                await asyncio.sleep(0)
+        finally:
+            # the client is gone, stop everything it started
+            for task in list(queries.values()):
+                task.cancel()
+            await asyncio.gather(*list(queries.values()),
+                                 return_exceptions=True)
+            writer.close()
+
+    async def _send(self, writer, write_lock, message: dict):
+        async with write_lock:
+            writer.write((json.dumps(message) + '\n').encode())
+            # waits while the client is not reading (backpressure)
+            await writer.drain()
+
+    async def _run_query(self, query_id: int, query: str, writer,
+                         write_lock):
+        loop = asyncio.get_running_loop()
+        batches = asyncio.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        producer = None
+        status = 'done'
+        try:
+            await self._send(writer, write_lock,
+                             {'query_id': query_id, 'status': 'accepted'})
+            async with self._slots:
+                plans = await loop.run_in_executor(self._pool,
+                                                   self._queries.plan, query)
+                if not plans:
+                    raise ValueError('Could not parse query')
+                producer = loop.run_in_executor(
+                    self._pool, self._execute, plans, batches, loop,
+                    cancelled)
+                while True:
+                    batch = await batches.get()
+                    if batch is None:
+                        break
+                    await self._send(writer, write_lock,
+                                     {'query_id': query_id,
+                                      'frames': batch.indices.tolist()})
+                await producer
+        except asyncio.CancelledError:
+            cancelled.set()
+            await self._wait(producer)
+            status = 'cancelled'
+        except Exception as e:
+            cancelled.set()
+            await self._wait(producer)
+            status = 'error'
+            await self._send(writer, write_lock,
+                             {'query_id': query_id, 'status': status,
+                              'message': str(e)})
+            return
+        try:
+            await self._send(writer, write_lock,
+                             {'query_id': query_id, 'status': status})
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    @staticmethod
+    async def _wait(producer):
+        """
+        Waits until a stopped producer left its worker thread
+        """
+        if producer is not None:
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def _execute(self, plans, batches: asyncio.Queue,
+                 loop: asyncio.AbstractEventLoop,
+                 cancelled: threading.Event):
+        """
+        Runs on a worker thread: executes the plans and
+        hands the result batches to the event loop through the bounded
+        queue. Stops as soon as the query is cancelled.
+        """
+        try:
+            for plan in plans:
+                results = PlanExecutor(plan).execute_plan_iter()
+                try:
+                    for batch in results:
+                        if not self._put(batches, batch, loop, cancelled):
+                            return
+                finally:
+                    results.close()
+        finally:
+            self._put(batches, None, loop, cancelled)
+
+    @staticmethod
+    def _put(batches: asyncio.Queue, item, loop, cancelled) -> bool:
+        future = asyncio.run_coroutine_threadsafe(batches.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    return False
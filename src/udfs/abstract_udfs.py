@@ -28,6 +28,16 @@ class AbstractClassifierUDF(metaclass=ABCMeta):
     def name(self) -> str:
         pass
 
+    @property
+    def version(self) -> str:
+        """
+        Returns:
+            str: identifies the model and settings producing the
+            predictions. Cached predictions are only reused for the same
+            name and version
+        """
+        return ''
+
     @property
     @abstractmethod
     def labels(self) -> List[str]:
@@ -53,4 +63,4 @@ class AbstractClassifierUDF(metaclass=ABCMeta):
         pass
 
     def __call__(self, *args, **kwargs):
-        self.classify(*args, **kwargs)
+        return self.classify(*args, **kwargs)
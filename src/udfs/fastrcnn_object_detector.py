@@ -3,8 +3,8 @@
 from typing import List, Tuple
 
 import numpy as np
+import torch
 import torchvision
-from torchvision import transforms
 
 from src.models.catalog.frame_info import FrameInfo
 from src.models.catalog.properties import ColorSpace
@@ -19,19 +19,29 @@ class FastRCNNObjectDetector(AbstractClassifierUDF):
     Arguments:
         threshold (float): Threshold for classifier confidence score
 
+        num_threads (int, optional): Number of intra-op threads used by
+        torch for CPU inference. The setting is process wide, so it is only
+        applied while classifying and restored afterwards. Left to the
+        torch default when None
+
     """
 
     @property
     def name(self) -> str:
         return "fastrcnn"
 
-    def __init__(self, threshold=0.5):
+    def __init__(self, threshold=0.5, num_threads=None):
         super().__init__()
         self.threshold = threshold
+        self.num_threads = num_threads
         self.model = torchvision.models.detection.fasterrcnn_resnet50_fpn(
             pretrained=True)
         self.model.eval()
 
+    @property
+    def version(self) -> str:
+        return 'resnet50_fpn-threshold={}'.format(self.threshold)
+
     @property
     def input_format(self) -> FrameInfo:
         return FrameInfo(-1, -1, 3, ColorSpace.RGB)
@@ -82,25 +92,32 @@ class FastRCNNObjectDetector(AbstractClassifierUDF):
 
         """
 
-        transform = transforms.Compose([transforms.ToTensor()])
-        images = [transform(frame) for frame in frames]
-        predictions = self.model(images)
+        # (N, H, W, C) uint8 -> (N, C, H, W) float in [0, 1], same as
+        # transforms.ToTensor but for the whole batch at once
+        images = torch.from_numpy(np.ascontiguousarray(frames))
+        images = images.permute(0, 3, 1, 2).float().div_(255)
+        # inference_mode is only available from torch 1.9
+        inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+        previous_threads = torch.get_num_threads()
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+        try:
+            with inference_mode():
+                predictions = self.model(list(images))
+        finally:
+            if self.num_threads is not None:
+                torch.set_num_threads(previous_threads)
+
         prediction_boxes = []
         prediction_classes = []
         prediction_scores = []
         for prediction in predictions:
+            keep = prediction['scores'] > self.threshold
+            pred_score = prediction['scores'][keep].tolist()
             pred_class = [str(self.labels[i]) for i in
-                          list(prediction['labels'].numpy())]
+                          prediction['labels'][keep].tolist()]
             pred_boxes = [BoundingBox(Point(i[0], i[1]), Point(i[2], i[3]))
-                          for i in
-                          list(prediction['boxes'].detach().numpy())]
-            pred_score = list(prediction['scores'].detach().numpy())
-            pred_t = \
-                [pred_score.index(x) for x in pred_score if
-                 x > self.threshold][-1]
-            pred_boxes = list(pred_boxes[:pred_t + 1])
-            pred_class = list(pred_class[:pred_t + 1])
-            pred_score = list(pred_score[:pred_t + 1])
+                          for i in prediction['boxes'][keep].tolist()]
             prediction_boxes.append(pred_boxes)
             prediction_classes.append(pred_class)
             prediction_scores.append(pred_score)
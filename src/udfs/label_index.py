@@ -0,0 +1,229 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.expression.abstract_expression import AbstractExpression, \
+    ExpressionType
+from src.models.inference.classifier_prediction import Prediction
+
+
+def _set_bits(bitmap: np.ndarray, positions: np.ndarray):
+    positions = np.asarray(positions, dtype=np.int64)
+    np.bitwise_or.at(bitmap, positions >> 3,
+                     (0x80 >> (positions & 7)).astype(np.uint8))
+
+
+class LabelIndex:
+    """
+    Inverted index of the labels predicted by a UDF over the frames of one
+    video: every label maps to a bitmap of the frames it was predicted in
+    (bit i is frame i, packed 8 frames per byte). Predicates over the UDF
+    column are answered with bitmap operations, without decoding frames.
+
+    The index also keeps the range of scores each label was predicted
+    with and a bitmap of the indexed frames; frames outside of it are
+    unknown to the index, not frames without labels.
+
+    Arguments:
+        column (str): name of the column (or UDF) the labels belong to
+        num_frames (int): number of frames of the video, grows as frames
+        are added
+
+    """
+
+    def __init__(self, column: str, num_frames: int = 0):
+        self.column = column
+        self._num_frames = 0
+        self._covered = np.zeros(0, dtype=np.uint8)
+        self._bitmaps = {}  # type: Dict[str, np.ndarray]
+        self._score_ranges = {}  # type: Dict[str, List[float]]
+        self._grow(num_frames)
+
+    @property
+    def num_frames(self) -> int:
+        return self._num_frames
+
+    @property
+    def labels(self) -> List[str]:
+        return list(self._bitmaps)
+
+    def _grow(self, num_frames: int):
+        if num_frames <= self._num_frames:
+            return
+        num_bytes = (num_frames + 7) >> 3
+        pad = num_bytes - len(self._covered)
+        self._covered = np.pad(self._covered, (0, pad), 'constant')
+        for label in self._bitmaps:
+            self._bitmaps[label] = np.pad(self._bitmaps[label], (0, pad),
+                                          'constant')
+        self._num_frames = num_frames
+
+    def add(self, predictions: Iterable[Prediction]):
+        """
+        Indexes the labels of the predictions of frames
+        """
+        self.add_labels((prediction.frame.index, prediction.labels,
+                         prediction.scores) for prediction in predictions)
+
+    def add_labels(self, rows: Iterable[Tuple[int, List[str], List[float]]]):
+        """
+        Indexes (frame index, labels, scores) rows
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        self._grow(max(row[0] for row in rows) + 1)
+        postings = {}
+        for index, labels, scores in rows:
+            for label, score in zip(labels, scores):
+                postings.setdefault(label, []).append(index)
+                score_range = self._score_ranges.setdefault(
+                    label, [float(score), float(score)])
+                score_range[0] = min(score_range[0], float(score))
+                score_range[1] = max(score_range[1], float(score))
+        # frames which are indexed again lose their previous labels
+        indexed = np.zeros_like(self._covered)
+        _set_bits(indexed, [row[0] for row in rows])
+        for bitmap in self._bitmaps.values():
+            bitmap &= ~indexed
+        self._covered |= indexed
+        for label, frames in postings.items():
+            if label not in self._bitmaps:
+                self._bitmaps[label] = np.zeros_like(self._covered)
+            _set_bits(self._bitmaps[label], frames)
+
+    @staticmethod
+    def from_cache(cache, video: str, udf: str, version: str,
+                   column: str = None) -> 'LabelIndex':
+        """
+        Builds the index of the predictions of a UDF stored in a
+        UDFResultCache
+        """
+        index = LabelIndex(column if column is not None else udf)
+        index.add_labels(cache.scan(video, udf, version))
+        return index
+
+    def score_range(self, label: str) -> Tuple[float, float]:
+        """
+        Returns:
+            (float, float): lowest and highest score the label was
+            predicted with, None if it never was
+        """
+        score_range = self._score_ranges.get(label)
+        return tuple(score_range) if score_range is not None else None
+
+    def bitmap(self, label: str) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: packed bitmap of the frames the label was predicted
+            in
+        """
+        if label not in self._bitmaps:
+            return np.zeros_like(self._covered)
+        return self._bitmaps[label]
+
+    def covers(self, start: int = 0, stop: int = None) -> bool:
+        """
+        Returns:
+            bool: True if all the frames in [start, stop) are indexed
+        """
+        stop = self._num_frames if stop is None else stop
+        if stop > self._num_frames:
+            return False
+        covered = np.unpackbits(self._covered)[start:stop]
+        return bool(covered.all())
+
+    def frame_ids(self, bitmap: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: indices of the frames set in a bitmap
+        """
+        return np.flatnonzero(np.unpackbits(bitmap)[:self._num_frames])
+
+    def _label_of(self, left: AbstractExpression,
+                  right: AbstractExpression):
+        if right.etype != ExpressionType.CONSTANT_VALUE:
+            left, right = right, left
+        if right.etype != ExpressionType.CONSTANT_VALUE:
+            return None
+        if left.etype == ExpressionType.TUPLE_VALUE:
+            name = left.col_name
+        elif left.etype == ExpressionType.FUNCTION_EXPRESSION:
+            name = left.name
+        else:
+            return None
+        label = right.evaluate()
+        if name != self.column or not isinstance(label, str):
+            return None
+        # string constants keep their quotes after parsing
+        if len(label) > 1 and label[0] == label[-1] and label[0] in '\'"':
+            label = label[1:-1]
+        return label
+
+    def evaluate(self, predicate: AbstractExpression,
+                 min_score: float = None) -> np.ndarray:
+        """
+        Answers a predicate made of (in)equalities between the column and
+        labels, combined with AND, OR and NOT.
+
+        Arguments:
+            predicate (AbstractExpression): predicate to answer
+            min_score (float, optional): score threshold the predicate is
+            evaluated with. The index can only answer it if every label of
+            the predicate was indexed with scores at or above it
+
+        Returns:
+            np.ndarray: packed bitmap of the indexed frames satisfying the
+            predicate, None if the index can not answer the predicate
+        """
+        etype = predicate.etype
+        if etype in (ExpressionType.COMPARE_EQUAL,
+                     ExpressionType.COMPARE_NEQ):
+            label = self._label_of(predicate.get_child(0),
+                                   predicate.get_child(1))
+            if label is None:
+                return None
+            score_range = self._score_ranges.get(label)
+            if min_score is not None and score_range is not None and \
+                    score_range[0] < min_score:
+                return None
+            if etype == ExpressionType.COMPARE_EQUAL:
+                return self.bitmap(label) & self._covered
+            return ~self.bitmap(label) & self._covered
+
+        if etype in (ExpressionType.LOGICAL_AND, ExpressionType.LOGICAL_OR,
+                     ExpressionType.LOGICAL_NOT):
+            bitmaps = [self.evaluate(predicate.get_child(i), min_score)
+                       for i in range(predicate.get_children_count())]
+            if not bitmaps or any(bitmap is None for bitmap in bitmaps):
+                return None
+            if etype == ExpressionType.LOGICAL_NOT:
+                return ~bitmaps[0] & self._covered
+            operator = np.bitwise_and \
+                if etype == ExpressionType.LOGICAL_AND else np.bitwise_or
+            return operator.reduce(bitmaps)
+        return None
+
+    def save(self, path: str):
+        labels = self.labels
+        np.savez_compressed(
+            path, column=np.array(self.column),
+            num_frames=np.array(self._num_frames), covered=self._covered,
+            labels=np.array(labels, dtype=str),
+            bitmaps=np.array([self._bitmaps[label] for label in labels],
+                             dtype=np.uint8).reshape(len(labels), -1),
+            score_ranges=np.array([self._score_ranges[label]
+                                   for label in labels],
+                                  dtype=np.float64).reshape(len(labels), 2))
+
+    @staticmethod
+    def load(path: str) -> 'LabelIndex':
+        with np.load(path) as data:
+            index = LabelIndex(str(data['column']),
+                               int(data['num_frames']))
+            index._covered = data['covered']
+            for label, bitmap, score_range in zip(
+                    data['labels'], data['bitmaps'], data['score_ranges']):
+                index._bitmaps[str(label)] = bitmap
+                index._score_ranges[str(label)] = list(score_range)
+        return index
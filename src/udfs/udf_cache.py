@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Tuple
+
+from src.models.catalog.frame_info import FrameInfo
+from src.models.catalog.video_info import VideoMetaInfo
+from src.models.inference.classifier_prediction import Prediction
+from src.models.inference.representation import BoundingBox, Point
+from src.models.storage.batch import FrameBatch
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+
+
+class UDFResultCache:
+    """
+    Persistent on-disk cache of UDF predictions stored in a sqlite
+    database. Entries are keyed by (video file, frame index, UDF name,
+    UDF version) and the least recently used ones are evicted once the
+    stored predictions exceed `max_size` bytes.
+
+    Only labels, scores and boxes are stored, as JSON (the database may be
+    shared, so nothing is unpickled from it). The predictions are rebuilt
+    around the frames of the batch on lookup.
+
+    Arguments:
+        path (str): path of the database file
+        max_size (int, default: 1GB): maximum size of the stored
+        predictions in bytes
+
+    """
+
+    # frames looked up per query
+    QUERY_CHUNK = 500
+
+    def __init__(self, path: str, max_size: int = 1 << 30):
+        self.path = path
+        self.max_size = max_size
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS udf_predictions ('
+            'video TEXT, frame INTEGER, udf TEXT, version TEXT, '
+            'value TEXT, size INTEGER, last_access INTEGER, '
+            'PRIMARY KEY (video, frame, udf, version))')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS udf_predictions_last_access '
+            'ON udf_predictions (last_access)')
+        self._connection.commit()
+
+    @staticmethod
+    def _serialize(prediction: Prediction) -> str:
+        boxes = None
+        if prediction.boxes is not None:
+            boxes = [(float(box.top_left.x), float(box.top_left.y),
+                      float(box.bottom_right.x), float(box.bottom_right.y))
+                     for box in prediction.boxes]
+        return json.dumps([list(prediction.labels),
+                           [float(score) for score in prediction.scores],
+                           boxes])
+
+    @staticmethod
+    def _deserialize(value: str, frame) -> Prediction:
+        labels, scores, boxes = json.loads(value)
+        if boxes is not None:
+            boxes = [BoundingBox(Point(x1, y1), Point(x2, y2))
+                     for (x1, y1, x2, y2) in boxes]
+        return Prediction(frame, labels, scores, boxes=boxes)
+
+    def get(self, video: str, udf: str, version: str,
+            batch: FrameBatch) -> List[Prediction]:
+        """
+        Looks up the cached predictions of the frames of the batch
+
+        Returns:
+            List[Prediction]: prediction per frame, None on a cache miss
+        """
+        frames = batch.frames
+        indices = sorted(set(frame.index for frame in frames))
+        with self._lock:
+            rows = {}
+            # one query per chunk of frames, within sqlite's limit on the
+            # number of parameters
+            for start in range(0, len(indices), self.QUERY_CHUNK):
+                chunk = indices[start:start + self.QUERY_CHUNK]
+                rows.update(self._connection.execute(
+                    'SELECT frame, value FROM udf_predictions WHERE video=? '
+                    'AND udf=? AND version=? AND frame IN (%s)' %
+                    ', '.join('?' * len(chunk)),
+                    [video, udf, version] + chunk).fetchall())
+            if rows:
+                self._connection.execute('BEGIN IMMEDIATE')
+                clock = self._tick()
+                self._connection.executemany(
+                    'UPDATE udf_predictions SET last_access=? WHERE video=? '
+                    'AND frame=? AND udf=? AND version=?',
+                    [(clock, video, index, udf, version) for index in rows])
+                self._connection.commit()
+        return [self._deserialize(rows[frame.index], frame)
+                if frame.index in rows else None for frame in frames]
+
+    def put(self, video: str, udf: str, version: str,
+            predictions: List[Prediction]):
+        """
+        Stores the predictions and evicts the least recently used entries
+        if the cache grows over its maximum size
+        """
+        values = [(prediction.frame.index,
+                   self._serialize(prediction).encode())
+                  for prediction in predictions]
+        with self._lock:
+            # the write lock is held from here to the commit, so that the
+            # eviction sees the writes of the other processes sharing the
+            # database
+            self._connection.execute('BEGIN IMMEDIATE')
+            clock = self._tick()
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO udf_predictions VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)',
+                [(video, index, udf, version, value.decode(), len(value),
+                  clock) for index, value in values])
+            self._evict()
+            self._connection.commit()
+
+    def _tick(self) -> int:
+        """
+        Returns the next access time, read from the database since other
+        processes may share it
+        """
+        return self._connection.execute(
+            'SELECT COALESCE(MAX(last_access), 0) + 1 '
+            'FROM udf_predictions').fetchone()[0]
+
+    def scan(self, video: str, udf: str, version: str) \
+            -> List[Tuple[int, List[str], List[float]]]:
+        """
+        Returns the (frame index, labels, scores) of all the cached
+        predictions of a UDF over a video, ordered by frame
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT frame, value FROM udf_predictions WHERE video=? AND '
+                'udf=? AND version=? ORDER BY frame',
+                (video, udf, version)).fetchall()
+        scanned = []
+        for frame, value in rows:
+            labels, scores, _ = json.loads(value)
+            scanned.append((frame, labels, scores))
+        return scanned
+
+    def _evict(self):
+        size, = self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM udf_predictions').fetchone()
+        if size <= self.max_size:
+            return
+        excess = size - self.max_size
+        evicted = []
+        for rowid, size in self._connection.execute(
+                'SELECT rowid, size FROM udf_predictions '
+                'ORDER BY last_access'):
+            evicted.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._connection.executemany(
+            'DELETE FROM udf_predictions WHERE rowid=?', evicted)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM udf_predictions').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class CachedClassifierUDF(AbstractClassifierUDF):
+    """
+    Wraps a classifier so that the predictions of frames which were
+    already classified are read from a `UDFResultCache`. Only the frames
+    missing in the cache are passed on to the classifier.
+
+    Arguments:
+        udf (AbstractClassifierUDF): classifier being wrapped
+        video (VideoMetaInfo): video the classified frames belong to
+        cache (UDFResultCache): cache storing the predictions
+
+    """
+
+    def __init__(self, udf: AbstractClassifierUDF, video: VideoMetaInfo,
+                 cache: UDFResultCache):
+        super().__init__()
+        self.udf = udf
+        self.video = video
+        self.cache = cache
+
+    @property
+    def name(self) -> str:
+        return self.udf.name
+
+    @property
+    def version(self) -> str:
+        return self.udf.version
+
+    @property
+    def input_format(self) -> FrameInfo:
+        return self.udf.input_format
+
+    @property
+    def labels(self) -> List[str]:
+        return self.udf.labels
+
+    def classify(self, batch: FrameBatch) -> List[Prediction]:
+        key = (self.video.file, self.name, self.version)
+        predictions = self.cache.get(*key, batch)
+        missing = [i for i, prediction in enumerate(predictions)
+                   if prediction is None]
+        if missing:
+            computed = self.udf.classify(batch[missing])
+            self.cache.put(*key, computed)
+            for i, prediction in zip(missing, computed):
+                predictions[i] = prediction
+        return predictions
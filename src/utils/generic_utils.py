@@ -1,3 +1,5 @@
+import queue
+import threading
 
 
 def validate_kwargs(kwargs, allowed_kwargs,
@@ -6,3 +8,91 @@ def validate_kwargs(kwargs, allowed_kwargs,
     for kwarg in kwargs:
         if kwarg not in allowed_kwargs:
             raise TypeError(error_message, kwarg)
+
+
+_END_OF_STREAM = object()
+
+
+class Prefetcher:
+    """
+    Consumes `iterable` on a background thread and keeps at most `depth`
+    items buffered ahead of the caller
+
+    Arguments:
+        iterable (Iterable): source of items
+        depth (int): maximum number of items buffered ahead
+    """
+
+    def __init__(self, iterable, depth: int):
+        self._items = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._producer = threading.Thread(target=self._produce,
+                                          args=(iterable,), daemon=True)
+        self._producer.start()
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                if not self._put((item, None)):
+                    return
+        except Exception as e:
+            self._put((_END_OF_STREAM, e))
+            return
+        self._put((_END_OF_STREAM, None))
+
+    def get(self, timeout: float = None):
+        """
+        Returns the next item. Raises queue.Empty if none arrived within
+        `timeout` seconds, StopIteration at the end of the iterable and
+        the exceptions raised by the producer.
+        """
+        item, error = self._items.get(timeout=timeout)
+        if item is _END_OF_STREAM:
+            # keep reporting the end to later calls
+            self._items.put((item, error))
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self):
+        """
+        Stops the producer
+        """
+        self._stopped.set()
+        self._producer.join()
+
+
+def prefetch(iterable, depth: int):
+    """
+    Generator which consumes `iterable` on a background thread and keeps
+    at most `depth` items buffered ahead of the caller. Exceptions raised
+    by the producer are re-raised in the caller. Closing the generator
+    stops the producer.
+
+    Arguments:
+        iterable (Iterable): source of items
+        depth (int): maximum number of items buffered ahead
+
+    Yields:
+        items of `iterable` in order
+    """
+    prefetcher = Prefetcher(iterable, depth)
+    try:
+        while True:
+            try:
+                item = prefetcher.get()
+            except StopIteration:
+                return
+            yield item
+    finally:
+        prefetcher.close()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from src.expression.abstract_expression import ExpressionType
 from src.expression.comparison_expression import ComparisonExpression
 from src.expression.constant_value_expression import ConstantValueExpression
@@ -99,3 +101,30 @@ class ComparisonExpressionsTest(unittest.TestCase):
 
         tuple1 = [[3], 2, 3]
         self.assertEqual([True], cmpr_exp.evaluate(tuple1, None))
+
+    def test_comparison_should_return_numpy_array_broadcasting_scalars(self):
+        tpl_exp = TupleValueExpression(0)
+        const_exp = ConstantValueExpression(2)
+
+        cmpr_exp = ComparisonExpression(
+            ExpressionType.COMPARE_GREATER,
+            tpl_exp,
+            const_exp
+        )
+        tuple1 = [np.array([1, 2, 3, 4]), 2, 3]
+        outcome = cmpr_exp.evaluate(tuple1, None)
+        self.assertIsInstance(outcome, np.ndarray)
+        self.assertEqual([False, False, True, True], outcome.tolist())
+
+    def test_comparison_of_mismatching_types_should_be_false(self):
+        tpl_exp = TupleValueExpression(0)
+        const_exp = ConstantValueExpression("car")
+
+        cmpr_exp = ComparisonExpression(
+            ExpressionType.COMPARE_EQUAL,
+            tpl_exp,
+            const_exp
+        )
+        tuple1 = [[1, 2], 2, 3]
+        self.assertEqual([False, False],
+                         cmpr_exp.evaluate(tuple1, None).tolist())
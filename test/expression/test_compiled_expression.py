@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.arithmetic_expression import ArithmeticExpression
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.expression_utils import compile_expression
+from src.expression.function_expression import FunctionExpression, \
+    ExecutionMode
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.inference.classifier_prediction import Prediction
+from src.models.storage.batch import FrameBatch
+from src.models.storage.frame import Frame
+
+
+class CompiledExpressionTest(unittest.TestCase):
+
+    def test_compiled_tree_should_match_evaluate(self):
+        arithmetic_expr = ArithmeticExpression(
+            ExpressionType.ARITHMETIC_MULTIPLY,
+            TupleValueExpression(0),
+            ConstantValueExpression(2)
+        )
+        comparison_expr = ComparisonExpression(
+            ExpressionType.COMPARE_GEQ,
+            arithmetic_expr,
+            TupleValueExpression(1)
+        )
+        logical_expr = LogicalExpression(
+            ExpressionType.LOGICAL_NOT,
+            None,
+            comparison_expr
+        )
+        tuple1 = [np.arange(5), np.array([0, 3, 3, 9, 9])]
+        expected = logical_expr.evaluate(tuple1)
+        compiled = logical_expr.compile()
+        self.assertEqual(expected.tolist(), compiled(tuple1).tolist())
+        self.assertEqual([False, True, False, True, True],
+                         compiled(tuple1).tolist())
+
+    def test_compiled_function_expression_should_set_outcomes(self):
+        frame_1 = Frame(1, np.ones((1, 1)), None)
+        frame_2 = Frame(2, 2 * np.ones((1, 1)), None)
+        outcomes = [Prediction(frame_1, ["car", "bus"], [0.5, 0.6]),
+                    Prediction(frame_2, ["bus"], [0.6])]
+        func = FunctionExpression(lambda batch: [outcomes[frame.index - 1]
+                                                 for frame in batch.frames],
+                                  mode=ExecutionMode.EXEC, name="test")
+        expression_tree = LogicalExpression(
+            ExpressionType.LOGICAL_OR,
+            ComparisonExpression(ExpressionType.COMPARE_EQUAL, func,
+                                 ConstantValueExpression("car")),
+            ComparisonExpression(ExpressionType.COMPARE_EQUAL, func,
+                                 ConstantValueExpression("train")))
+        batch = FrameBatch(frames=[frame_1, frame_2], info=None)
+
+        compiled = compile_expression(expression_tree)
+        self.assertEqual([True, False], compiled(batch).tolist())
+        self.assertEqual(outcomes, batch.get_outcomes_for("test"))
+
+    def test_compile_expression_should_fallback_to_evaluate(self):
+        expression = type("AbstractExpression", (),
+                          {"evaluate": lambda x: [True]})
+        self.assertIsNone(compile_expression(None))
+        self.assertEqual([True], compile_expression(expression)(None))
@@ -28,4 +28,5 @@ class ExpressionEvaluationTest(unittest.TestCase):
             frame_1, frame_2
         ], info=None)
 
-        self.assertEqual([True, False], expression_tree.evaluate(batch))
+        self.assertEqual([True, False],
+                         list(expression_tree.evaluate(batch)))
@@ -1,10 +1,16 @@
 import unittest
 
+import numpy as np
+
 from src.expression.abstract_expression import ExpressionType
 from src.expression.comparison_expression import ComparisonExpression
 from src.expression.logical_expression import LogicalExpression
 from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression, \
+    ExecutionMode
 from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import FrameBatch
+from src.models.storage.frame import Frame
 
 
 class LogicalExpressionsTest(unittest.TestCase):
@@ -76,3 +82,65 @@ class LogicalExpressionsTest(unittest.TestCase):
         )
         tuple1 = [[1], 2, 3]
         self.assertEqual([True], logical_expr.evaluate(tuple1, None))
+
+    def test_logical_and_should_combine_numpy_arrays(self):
+        comparison_expression_left = ComparisonExpression(
+            ExpressionType.COMPARE_GREATER,
+            TupleValueExpression(0),
+            ConstantValueExpression(1)
+        )
+        comparison_expression_right = ComparisonExpression(
+            ExpressionType.COMPARE_LESSER,
+            TupleValueExpression(0),
+            ConstantValueExpression(4)
+        )
+        logical_expr = LogicalExpression(
+            ExpressionType.LOGICAL_AND,
+            comparison_expression_left,
+            comparison_expression_right
+        )
+        tuple1 = [np.arange(6), 2, 3]
+        outcome = logical_expr.evaluate(tuple1, None)
+        self.assertIsInstance(outcome, np.ndarray)
+        self.assertEqual([False, False, True, True, False, False],
+                         outcome.tolist())
+
+    def test_logical_and_should_evaluate_right_only_on_selected_frames(self):
+        frames = [Frame(i, np.ones((1, 1)), None) for i in range(4)]
+        batch = FrameBatch(frames=frames, info=None)
+        seen = []
+
+        def udf(selection):
+            seen.append([frame.index for frame in selection.frames])
+            return [frame.index == 2 for frame in selection.frames]
+
+        left = ComparisonExpression(
+            ExpressionType.COMPARE_GREATER,
+            FunctionExpression(lambda x: [frame.index for frame in x.frames]),
+            ConstantValueExpression(1)
+        )
+        right = FunctionExpression(udf, mode=ExecutionMode.EXEC, name="udf")
+        logical_expr = LogicalExpression(ExpressionType.LOGICAL_AND, left,
+                                         right)
+
+        self.assertEqual([False, False, True, False],
+                         logical_expr.evaluate(batch).tolist())
+        self.assertEqual([[2, 3]], seen)
+        self.assertEqual([None, None, True, False],
+                         batch.get_outcomes_for("udf"))
+
+        seen.clear()
+        self.assertEqual([False, False, True, False],
+                         logical_expr.compile()(batch).tolist())
+        self.assertEqual([[2, 3]], seen)
+
+    def test_logical_or_should_not_evaluate_right_when_all_accepted(self):
+        batch = FrameBatch(frames=[Frame(1, np.ones((1, 1)), None)],
+                           info=None)
+        right = FunctionExpression(lambda x: self.fail("evaluated"))
+        logical_expr = LogicalExpression(
+            ExpressionType.LOGICAL_OR,
+            FunctionExpression(lambda x: [True]),
+            right
+        )
+        self.assertEqual([True], logical_expr.evaluate(batch).tolist())
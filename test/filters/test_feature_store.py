@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.filters.feature_store import FeatureStore
+
+
+class FeatureStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    def double(self, X):
+        self.calls += 1
+        return X * 2
+
+    def test_should_transform_each_input_once(self):
+        store = FeatureStore()
+        X = np.arange(12.).reshape(4, 3)
+        first = store.get("double", self.double, X)
+        second = store.get("double", self.double, X.copy())
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(first.flags.writeable)
+
+        store.get("double", self.double, X + 1)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual((store.hits, store.misses), (1, 2))
+
+    def test_should_recompute_after_invalidate(self):
+        store = FeatureStore()
+        X = np.ones((2, 2))
+        store.get("double", self.double, X)
+        store.get("other", self.double, X)
+        store.invalidate("double")
+        self.assertEqual(len(store), 1)
+        store.get("double", self.double, X)
+        self.assertEqual(self.calls, 3)
+
+    def test_should_evict_least_recently_used(self):
+        store = FeatureStore(max_entries=2)
+        inputs = [np.full(3, i) for i in range(3)]
+        store.get("double", self.double, inputs[0])
+        store.get("double", self.double, inputs[1])
+        store.get("double", self.double, inputs[0])
+        store.get("double", self.double, inputs[2])
+        store.get("double", self.double, inputs[0])
+        self.assertEqual(self.calls, 3)
+        store.get("double", self.double, inputs[1])
+        self.assertEqual(self.calls, 4)
+
+    def test_should_not_hash_inputs_with_caller_key(self):
+        store = FeatureStore()
+        X = np.ones((2, 2))
+        with mock.patch.object(FeatureStore, "fingerprint") as fingerprint:
+            first = store.get("double", self.double, X, ("a.avi", 0, 2))
+            second = store.get("double", self.double, X, ("a.avi", 0, 2))
+            store.get("double", self.double, X, ("a.avi", 2, 4))
+        fingerprint.assert_not_called()
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,115 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.filters.feature_store import FeatureStore
+from src.filters.pp import PP
+from src.loaders.loader_uadetrac import UADetracLoader
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data")
+
+
+class PPTest(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+        num_samples = 40
+        self.X = {"none": random.rand(num_samples, 12)}
+        self.label_dict = {"t=car": np.arange(num_samples) % 2,
+                           "t=van": (np.arange(num_samples) % 3 == 0)
+                           .astype(int)}
+
+    def test_parallel_training_should_match_serial_training(self):
+        serial = PP()
+        serial._process(self.X, self.label_dict)
+        parallel = PP(num_workers=2)
+        parallel._process(self.X, self.label_dict)
+
+        self.assertEqual(serial.category_library.keys(),
+                         parallel.category_library.keys())
+        for label, models in serial.category_library.items():
+            self.assertEqual(sorted(models),
+                             sorted(parallel.category_library[label]))
+            self.assertEqual(sorted(models),
+                             sorted(parallel.category_stats[label]))
+            for name in ("none/rf", "none/svm"):
+                np.testing.assert_array_equal(
+                    models[name].predict(self.X["none"]),
+                    parallel.category_library[label][name].predict(
+                        self.X["none"]))
+
+    def test_predict_should_transform_images_once_per_pre_model(self):
+        random = np.random.RandomState(1)
+        images = random.rand(20, 24, 24, 3)
+        pp = PP()
+        X = pp._preprocess(pp._reshape_image(images), self.label_dict)
+        pp._process(X, {"t=car": np.arange(20) % 2})
+
+        y_hat = pp.predict(images, "t=car", "pca/rf")
+        misses = pp.features.misses
+        for model_name in ("pca/rf", "pca/svm", "pca/dnn"):
+            pp.predict(images, "t=car", model_name)
+        np.testing.assert_array_equal(
+            y_hat, pp.predict(images, "t=car", "pca/rf"))
+        self.assertEqual(misses, pp.features.misses)
+        self.assertEqual(misses, 2)
+
+    def test_should_reuse_training_features_at_predict_time(self):
+        random = np.random.RandomState(2)
+        images = random.rand(20, 24, 24, 3)
+        key = ("dummy.avi", 0, 20)
+        pp = PP()
+        with mock.patch.object(FeatureStore, "fingerprint",
+                               wraps=FeatureStore.fingerprint) as fingerprint:
+            X = pp._preprocess(pp._reshape_image(images), self.label_dict)
+            # hashed once for all the pre models
+            self.assertEqual(1, fingerprint.call_count)
+            pp._process(X, {"t=car": np.arange(20) % 2})
+            misses = pp.features.misses
+
+            y_hat = pp.predict(images, "t=car", "pca/rf")
+            self.assertEqual(misses, pp.features.misses)
+
+            fingerprint.reset_mock()
+            pp.predict(images, "t=car", "pca/svm", key=key)
+            np.testing.assert_array_equal(
+                y_hat, pp.predict(images, "t=car", "pca/rf", key=key))
+            fingerprint.assert_not_called()
+        self.assertEqual(misses + 1, pp.features.misses)
+
+    def test_binary_labels_should_be_set_per_frame(self):
+        data_table = {"vehicle_type": [["car", "van"], None, ["truck"],
+                                       ["car", None]],
+                      "speed": [[45.], [None, 70.], None, [62., 10.]],
+                      "intersection": [None, ["pt211"], None, None]}
+        label_dict = PP()._generate_binary_labels(data_table)
+
+        self.assertEqual(label_dict["t=car"].tolist(), [1, 0, 0, 1])
+        self.assertEqual(label_dict["t=van"].tolist(), [1, 0, 0, 0])
+        self.assertEqual(label_dict["t=bus"].tolist(), [0, 0, 0, 0])
+        self.assertEqual(label_dict["s>40"].tolist(), [1, 1, 0, 1])
+        self.assertEqual(label_dict["s>60"].tolist(), [0, 1, 0, 1])
+        self.assertEqual(label_dict["s<65"].tolist(), [1, 0, 0, 1])
+        self.assertEqual(label_dict["i=pt211"].tolist(), [0, 1, 0, 0])
+        self.assertEqual(label_dict["o=pt211"].tolist(), [0, 1, 0, 0])
+        self.assertNotIn("c=red", label_dict)
+
+    def test_binary_labels_from_label_columns(self):
+        loader = UADetracLoader(None)
+        loader.load_images(os.path.join(DATA_DIR, "small-data"))
+        labels = loader.load_labels(os.path.join(DATA_DIR,
+                                                 "small-annotations"))
+        data_table = {"vehicle_type": labels["vehicle"],
+                      "color": labels["color"],
+                      "speed": labels["speed"],
+                      "intersection": labels["intersection"]}
+
+        expected = PP()._generate_binary_labels(data_table)
+        label_dict = PP()._generate_binary_labels(loader.get_label_columns())
+        self.assertEqual(sorted(expected), sorted(label_dict))
+        for name, labels in expected.items():
+            np.testing.assert_array_equal(labels, label_dict[name])
+        self.assertEqual(label_dict["t=car"].tolist(), [1, 1])
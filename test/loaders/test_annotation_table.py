@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.loaders.annotation_table import AnnotationTable, parse_annotations
+
+ANNOTATION = """<?xml version="1.0" encoding="utf-8"?>
+<sequence name="{name}">
+   <ignored_region>
+      <box left="1" top="1" width="1" height="1"/>
+   </ignored_region>
+   <frame density="1" num="2">
+      <target_list>
+         <target id="4">
+            <box left="10" top="20" width="30" height="40"/>
+            <attribute speed="2.5" vehicle_type="{vehicle_type}"
+                       color="red"/>
+         </target>
+      </target_list>
+   </frame>
+   <frame density="2" num="3">
+      <target_list>
+         <target id="4">
+            <box left="12" top="22" width="30" height="40"/>
+            <attribute speed="" vehicle_type="truck"/>
+         </target>
+         <target id="5">
+            <box left="0" top="0" width="9" height="9"/>
+            <attribute speed="1" vehicle_type="car"/>
+         </target>
+      </target_list>
+   </frame>
+</sequence>
+"""
+
+
+class AnnotationTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name, vehicle_type in (("MVI_1", "van"), ("MVI_2", "bus")):
+            with open(os.path.join(self.dir, name + ".xml"), "w") as f:
+                f.write(ANNOTATION.format(name=name,
+                                          vehicle_type=vehicle_type))
+        open(os.path.join(self.dir, "MVI_1.xml.swp"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_should_parse_all_files_into_columns(self):
+        table = parse_annotations(self.dir)
+        self.assertEqual(len(table), 6)
+        self.assertEqual(table.num_frames, 6)
+        self.assertEqual(table.video_start_indices.tolist(), [0, 3])
+        self.assertEqual(table.frame.tolist(), [1, 2, 2, 4, 5, 5])
+        self.assertEqual(table.object.tolist(), [4, 4, 5, 4, 4, 5])
+        self.assertEqual(
+            table.decode(table.vehicle_type, table.vehicle_types).tolist(),
+            ["van", "truck", "car", "bus", "truck", "car"])
+        self.assertEqual(
+            table.decode(table.color, table.colors).tolist(),
+            ["red", None, None, "red", None, None])
+        np.testing.assert_array_equal(
+            table.speed, [2.5, np.nan, 1, 2.5, np.nan, 1])
+        np.testing.assert_array_equal(table.box[0], [10, 20, 30, 40])
+
+    def test_should_split_columns_per_frame(self):
+        table = parse_annotations(self.dir)
+        self.assertEqual(table.frame_offsets().tolist(),
+                         [0, 0, 1, 3, 3, 4, 6])
+        self.assertEqual(
+            table.per_frame(table.speed, ~np.isnan(table.speed)),
+            [None, [2.5], [1.0], None, [2.5], [1.0]])
+        self.assertEqual(table.corners(0.5, 2.)[0].tolist(),
+                         [40, 5, 120, 20])
+
+    def test_should_load_saved_table_memory_mapped(self):
+        table = parse_annotations(self.dir)
+        save_dir = os.path.join(self.dir, "labels")
+        table.save(save_dir)
+        loaded = AnnotationTable.load(save_dir)
+
+        self.assertIsInstance(loaded.speed, np.memmap)
+        self.assertEqual(loaded.num_frames, table.num_frames)
+        self.assertEqual(loaded.vehicle_types, table.vehicle_types)
+        self.assertEqual(loaded.colors, table.colors)
+        for name in ("frame", "object", "vehicle_type", "speed", "color",
+                     "intersection", "box", "video_start_indices"):
+            np.testing.assert_array_equal(getattr(loaded, name),
+                                          getattr(table, name))
@@ -1,5 +1,7 @@
 import os
 import unittest
+from unittest import mock
+from unittest.mock import patch
 
 import cv2
 import numpy as np
@@ -91,3 +93,45 @@ class SimpleVideoLoaderTest(unittest.TestCase):
         batches = list(video_loader.load())
         self.assertEqual(1, len(batches))
         self.assertEqual(dummy_frames, list(batches[0].frames))
+
+    def test_should_return_last_partial_batch_as_columnar_batch(self):
+        video_info = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+        video_loader = SimpleVideoLoader(video_info, batch_size=4)
+        dummy_frames = list(self.create_dummy_frames())
+        batches = list(video_loader.load())
+        self.assertEqual([4, 4, 2], [batch.batch_size for batch in batches])
+        self.assertTrue(all(batch.is_columnar for batch in batches))
+        self.assertEqual((4, 2, 2, 3),
+                         batches[0].frames_as_numpy_array().shape)
+        self.assertEqual(dummy_frames,
+                         [frame for batch in batches
+                          for frame in batch.frames])
+
+    def test_should_return_same_batches_when_prefetching(self):
+        video_info = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+        expected = list(SimpleVideoLoader(video_info, batch_size=3).load())
+        video_loader = SimpleVideoLoader(video_info, batch_size=3,
+                                         prefetch=2)
+        self.assertEqual(expected, list(video_loader.load()))
+
+    def test_should_return_same_frames_when_seeking_over_skipped_frames(
+            self):
+        video_info = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+        dummy_frames = list(
+            self.create_dummy_frames(filters=[0, 3, 6, 9]))
+        video_loader = SimpleVideoLoader(video_info, skip_frames=3,
+                                         seek_threshold=2)
+        batches = list(video_loader.load())
+        self.assertEqual(dummy_frames, [batch.frames[0] for batch in batches])
+
+    def test_should_only_grab_skipped_frames(self):
+        video_info = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+        video_loader = SimpleVideoLoader(video_info, skip_frames=5)
+        capture = mock.Mock(wraps=cv2.VideoCapture('dummy.avi'))
+        with patch('src.loaders.video_loader.cv2.VideoCapture',
+                   return_value=capture):
+            batches = list(video_loader.load())
+        self.assertEqual(2, len(batches))
+        # frames 0 and 5 are decoded, the read of frame 10 hits the end
+        self.assertEqual(3, capture.read.call_count)
+        self.assertEqual(8, capture.grab.call_count)
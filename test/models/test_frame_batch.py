@@ -121,3 +121,50 @@ class FrameBatchTest(unittest.TestCase):
 
         self.assertTrue(batch.has_outcome('test'))
         self.assertTrue(batch.has_outcome('test_temp'))
+
+    def test_frames_of_columnar_batch_should_be_views_of_the_buffer(self):
+        data = np.ones((2, 1, 1, 3), dtype=np.uint8)
+        batch = FrameBatch.from_numpy(data, None, np.array([4, 5]))
+        self.assertTrue(batch.is_columnar)
+        self.assertEqual(2, batch.batch_size)
+        self.assertIs(data, batch.frames_as_numpy_array())
+        self.assertEqual([4, 5], [frame.index for frame in batch.frames])
+        self.assertTrue(np.shares_memory(data, batch.frames[1].data))
+
+    def test_indexing_columnar_batch_should_return_columnar_batch(self):
+        data = np.arange(3, dtype=np.uint8).reshape((3, 1, 1, 1))
+        batch = FrameBatch.from_numpy(data, None, np.array([1, 2, 3]),
+                                      outcomes={'test': [[1], [2], [3]]})
+        expected = FrameBatch(frames=[Frame(1, data[0], None),
+                                      Frame(3, data[2], None)],
+                              info=None,
+                              outcomes={'test': [[1], [3]]})
+        output = batch[[0, 2]]
+        self.assertTrue(output.is_columnar)
+        self.assertEqual(expected, output)
+        self.assertEqual([1, 3], list(output.indices))
+        self.assertEqual(expected, batch[::2])
+        self.assertTrue(np.shares_memory(data, batch[::2].frames[1].data))
+
+    def test_open_ended_slices_should_not_build_frames_of_columnar_batch(
+            self):
+        data = np.arange(4, dtype=np.uint8).reshape((4, 1, 1, 1))
+        batch = FrameBatch.from_numpy(data, None, np.array([1, 2, 3, 4]))
+        self.assertEqual([2, 3, 4], list(batch[1:].indices))
+        self.assertEqual([4], list(batch[-1:].indices))
+        self.assertEqual([1, 2], list(batch[:-2].indices))
+        self.assertIsNone(batch._frames)
+
+    def test_concatenate_should_merge_frames_and_outcomes(self):
+        batch_1 = FrameBatch.from_numpy(np.zeros((1, 1, 1, 3)), None,
+                                        outcomes={'test': [1]})
+        batch_2 = FrameBatch.from_numpy(np.ones((2, 1, 1, 3)), None,
+                                        np.array([1, 2]),
+                                        temp_outcomes={'temp': [2, 3]})
+        merged = FrameBatch.concatenate([batch_1, batch_2])
+        self.assertTrue(merged.is_columnar)
+        self.assertEqual([0, 1, 2], list(merged.indices))
+        self.assertEqual(list(batch_1.frames) + list(batch_2.frames),
+                         list(merged.frames))
+        self.assertEqual([1, None, None], merged.get_outcomes_for('test'))
+        self.assertEqual([None, 2, 3], merged.get_outcomes_for('temp'))
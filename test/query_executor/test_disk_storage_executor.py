@@ -21,11 +21,13 @@ class DiskStorageExecutorTest(unittest.TestCase):
         class_instance.load.return_value = range(5)
         actual = list(executor.next())
 
-        mock_class.assert_called_once_with(video_info,
-                                           batch_size=storage_plan.batch_size,
-                                           limit=storage_plan.limit,
-                                           offset=storage_plan.offset,
-                                           skip_frames=storage_plan.skip_frames
-                                           )
+        mock_class.assert_called_once_with(
+            video_info,
+            batch_size=storage_plan.batch_size,
+            limit=storage_plan.limit,
+            offset=storage_plan.offset,
+            skip_frames=storage_plan.skip_frames,
+            prefetch=storage_plan.prefetch,
+            seek_threshold=storage_plan.seek_threshold)
         class_instance.load.assert_called_once()
         self.assertEqual(list(range(5)), actual)
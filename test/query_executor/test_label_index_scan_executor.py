@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.query_executor.plan_executor import PlanExecutor
+from src.query_planner.label_index_scan_plan import LabelIndexScanPlan
+from src.udfs.label_index import LabelIndex
+
+
+class LabelIndexScanExecutorTest(unittest.TestCase):
+
+    def test_should_return_matching_frame_indices_in_range(self):
+        index = LabelIndex('CLASS')
+        index.add_labels((i, ['car'] if i % 3 == 0 else ['bus'], [0.9])
+                         for i in range(20))
+        predicate = ComparisonExpression(
+            ExpressionType.COMPARE_EQUAL,
+            TupleValueExpression(col_name='CLASS'),
+            ConstantValueExpression("'car'"))
+        plan = LabelIndexScanPlan(predicate, index, batch_size=2, offset=2,
+                                  limit=16)
+
+        batches = PlanExecutor(plan).execute_plan()
+
+        self.assertEqual([2, 2, 1], [batch.batch_size for batch in batches])
+        self.assertEqual([3, 6, 9, 12, 15],
+                         list(np.concatenate([batch.indices
+                                              for batch in batches])))
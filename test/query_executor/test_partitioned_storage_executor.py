@@ -0,0 +1,79 @@
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
+from src.loaders.video_loader import SimpleVideoLoader
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.query_executor.partitioned_storage_executor import \
+    PartitionedStorageExecutor
+from src.query_planner.storage_plan import StoragePlan
+
+NUM_FRAMES = 10
+
+
+def frame_ids(batch):
+    return list(batch.indices)
+
+
+class PartitionedStorageExecutorTest(unittest.TestCase):
+
+    def create_sample_video(self):
+        try:
+            os.remove('dummy.avi')
+        except FileNotFoundError:
+            pass
+
+        out = cv2.VideoWriter('dummy.avi',
+                              cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'), 10,
+                              (2, 2))
+        for i in range(NUM_FRAMES):
+            frame = np.array(np.ones((2, 2, 3)) * 0.1 * float(i + 1) * 255,
+                             dtype=np.uint8)
+            out.write(frame)
+        out.release()
+
+    def setUp(self):
+        self.create_sample_video()
+        self.video_info = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+
+    def tearDown(self):
+        os.remove('dummy.avi')
+
+    def test_should_return_same_frames_in_order_as_sequential_scan(self):
+        storage_plan = StoragePlan(self.video_info, batch_size=2,
+                                   num_partitions=3)
+        executor = PartitionedStorageExecutor(storage_plan)
+
+        expected = [frame for batch in SimpleVideoLoader(
+            self.video_info, batch_size=2).load() for frame in batch.frames]
+        actual = [frame for batch in executor.next()
+                  for frame in batch.frames]
+        self.assertEqual(expected, actual)
+
+    def test_should_split_frame_range_into_segments(self):
+        storage_plan = StoragePlan(self.video_info, offset=2, limit=9,
+                                   num_partitions=3)
+        executor = PartitionedStorageExecutor(storage_plan)
+        self.assertEqual([(2, 5), (5, 8), (8, 9)], executor._segments())
+        actual = [index for batch in executor.next()
+                  for index in frame_ids(batch)]
+        self.assertEqual(list(range(2, 9)), actual)
+
+    def test_should_filter_frames_in_workers(self):
+        storage_plan = StoragePlan(self.video_info, batch_size=3,
+                                   num_partitions=2)
+        predicate = ComparisonExpression(
+            ExpressionType.COMPARE_GREATER,
+            FunctionExpression(frame_ids),
+            ConstantValueExpression(5))
+        executor = PartitionedStorageExecutor(storage_plan, predicate)
+        actual = [index for batch in executor.next()
+                  for index in frame_ids(batch)]
+        self.assertEqual([6, 7, 8, 9], actual)
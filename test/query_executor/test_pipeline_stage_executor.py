@@ -0,0 +1,51 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.models.storage.batch import FrameBatch
+from src.query_executor.pipeline_stage_executor import PipelineStageExecutor
+from src.query_executor.plan_executor import PlanExecutor
+from src.query_planner.seq_scan_plan import SeqScanPlan
+from src.query_planner.storage_plan import StoragePlan
+from ..query_executor.utils import DummyExecutor
+
+
+class PipelineStageExecutorTest(unittest.TestCase):
+
+    def test_should_run_child_executor_on_another_thread(self):
+        threads = []
+
+        class ThreadRecordingExecutor(DummyExecutor):
+            _node = None
+
+            def next(self):
+                threads.append(threading.current_thread())
+                yield from super().next()
+
+        stage = PipelineStageExecutor(ThreadRecordingExecutor([1, 2, 3]))
+        self.assertEqual([1, 2, 3], list(stage.next()))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    @patch('src.query_executor.disk_based_storage_executor.SimpleVideoLoader')
+    def test_pipelined_plan_should_return_same_batches(self, mock_class):
+        batches = [FrameBatch.from_numpy(np.zeros((3, 1, 1, 3)), None,
+                                         np.arange(3 * i, 3 * i + 3))
+                   for i in range(4)]
+        mock_class.return_value.load.side_effect = lambda: iter(batches)
+        predicate = type('dummy_expr', (),
+                         {"evaluate": lambda x: x.indices % 2 == 0})
+
+        storage_plan = StoragePlan(VideoMetaInfo("dummy.avi", 10,
+                                                 VideoFormat.AVI))
+        seq_scan = SeqScanPlan(predicate, [], [], [])
+        seq_scan.append_child(storage_plan)
+
+        expected = PlanExecutor(seq_scan).execute_plan()
+        executor = PlanExecutor(seq_scan, pipelined=True, queue_size=1)
+        tree = executor._build_execution_tree(seq_scan)
+        self.assertIsInstance(tree.children[0], PipelineStageExecutor)
+        self.assertEqual(expected, executor.execute_plan())
@@ -1,14 +1,34 @@
+import os
 import unittest
 from unittest.mock import patch
 
+import cv2
+import numpy as np
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
 from src.models.catalog.properties import VideoFormat
 from src.models.catalog.video_info import VideoMetaInfo
 from src.models.storage.batch import FrameBatch
+from src.query_executor.partitioned_storage_executor import \
+    PartitionedStorageExecutor
 from src.query_executor.plan_executor import PlanExecutor
+from src.query_planner.pp_plan import PPScanPlan
 from src.query_planner.seq_scan_plan import SeqScanPlan
 from src.query_planner.storage_plan import StoragePlan
 
 
+def frame_ids(batch):
+    return list(batch.indices)
+
+
+def frame_id_compare(etype, value):
+    return ComparisonExpression(etype, FunctionExpression(frame_ids),
+                                ConstantValueExpression(value))
+
+
 class PlanExecutorTest(unittest.TestCase):
 
     def test_tree_structure_for_build_execution_tree(self):
@@ -85,3 +105,57 @@ class PlanExecutorTest(unittest.TestCase):
         self.assertEqual(
             expected, actual
         )
+
+    @patch('src.query_executor.disk_based_storage_executor.SimpleVideoLoader')
+    def test_streaming_with_limit_should_stop_upstream(self, mock_class):
+        loaded = []
+
+        def load():
+            for i in range(10):
+                loaded.append(i)
+                yield FrameBatch.from_numpy(np.zeros((3, 1, 1, 3)), None,
+                                            np.arange(3 * i, 3 * i + 3))
+
+        mock_class.return_value.load.side_effect = load
+        storage_plan = StoragePlan(VideoMetaInfo("dummy.avi", 10,
+                                                 VideoFormat.AVI))
+        seq_scan = SeqScanPlan(None, [], [], [])
+        seq_scan.append_child(storage_plan)
+
+        for pipelined in [False, True]:
+            loaded.clear()
+            executor = PlanExecutor(seq_scan, pipelined=pipelined,
+                                    queue_size=1)
+            actual = list(executor.execute_plan_iter(limit=4))
+            self.assertEqual([[0, 1, 2], [3]],
+                             [list(batch.indices) for batch in actual])
+            self.assertLess(len(loaded), 10)
+
+    def test_should_push_predicates_down_into_partitioned_scan(self):
+        out = cv2.VideoWriter('dummy.avi',
+                              cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'), 10,
+                              (2, 2))
+        for i in range(10):
+            out.write(np.full((2, 2, 3), 20 * i, dtype=np.uint8))
+        out.release()
+        self.addCleanup(os.remove, 'dummy.avi')
+
+        storage_plan = StoragePlan(VideoMetaInfo("dummy.avi", 10,
+                                                 VideoFormat.AVI),
+                                   batch_size=3, num_partitions=2)
+        pp_scan = PPScanPlan(frame_id_compare(ExpressionType.COMPARE_LESSER,
+                                              9))
+        pp_scan.append_child(storage_plan)
+        seq_scan = SeqScanPlan(
+            frame_id_compare(ExpressionType.COMPARE_GREATER, 5), [], [], [])
+        seq_scan.append_child(pp_scan)
+
+        executor = PlanExecutor(seq_scan)
+        tree = executor._build_execution_tree(seq_scan)
+        self.assertIsInstance(tree, PartitionedStorageExecutor)
+        self.assertEqual([pp_scan.predicate, seq_scan.predicate],
+                         tree.predicates)
+
+        actual = [index for batch in executor.execute_plan_iter()
+                  for index in frame_ids(batch)]
+        self.assertEqual([6, 7, 8], actual)
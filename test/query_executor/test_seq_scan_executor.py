@@ -1,3 +1,4 @@
+import threading
 import unittest
 
 import numpy as np
@@ -69,3 +70,55 @@ class SeqScanExecutorTest(unittest.TestCase):
                                                  outcome_3]})
         filtered = list(predicate_executor.next())[0]
         self.assertEqual(expected, filtered)
+
+    def test_should_evaluate_predicate_on_micro_batches(self):
+        batches = [FrameBatch.from_numpy(
+            np.full((2, 1, 1, 3), i, dtype=np.uint8), None,
+            np.array([2 * i, 2 * i + 1])) for i in range(3)]
+        evaluated = []
+
+        def evaluate(batch):
+            evaluated.append(list(batch.indices))
+            return batch.indices % 2 == 0
+
+        expression = type("AbstractExpression", (), {"evaluate": evaluate})
+        plan = type("ScanPlan", (), {"predicate": expression,
+                                     "udf_batch_size": 4})
+        predicate_executor = SequentialScanExecutor(plan)
+        predicate_executor.append_child(DummyExecutor(batches))
+
+        filtered = list(predicate_executor.next())
+        self.assertEqual([[0, 1, 2, 3], [4, 5]], evaluated)
+        self.assertEqual([[0], [2], [4]],
+                         [list(batch.indices) for batch in filtered])
+        self.assertEqual(batches[1][[0]], filtered[1])
+
+    def test_should_evaluate_pending_frames_at_deadline_if_child_stalls(self):
+        batches = [FrameBatch.from_numpy(
+            np.full((2, 1, 1, 3), i, dtype=np.uint8), None,
+            np.array([2 * i, 2 * i + 1])) for i in range(2)]
+        released = threading.Event()
+
+        class StallingExecutor:
+            def next(self):
+                yield batches[0]
+                # the first batch must be evaluated while the child stalls
+                self.released = released.wait(10)
+                yield batches[1]
+
+        def evaluate(batch):
+            released.set()
+            return np.ones(batch.batch_size, dtype=bool)
+
+        expression = type("AbstractExpression", (), {"evaluate": evaluate})
+        plan = type("ScanPlan", (), {"predicate": expression,
+                                     "udf_batch_size": 4,
+                                     "udf_batch_deadline": 0.05})
+        predicate_executor = SequentialScanExecutor(plan)
+        child = StallingExecutor()
+        predicate_executor.append_child(child)
+
+        filtered = list(predicate_executor.next())
+        self.assertTrue(child.released)
+        self.assertEqual([[0, 1], [2, 3]],
+                         [list(batch.indices) for batch in filtered])
@@ -73,6 +73,26 @@ class ParserTest(unittest.TestCase):
         self.assertIsNotNone(select_stmt.where_clause)
         # other tests should go in expression testing
 
+    def test_sll_parse_should_match_ll_parse(self):
+        query = "SELECT CLASS, REDNESS FROM TAIPAI \
+            WHERE (CLASS = 'VAN' AND REDNESS < 300.0 ) OR REDNESS > 500.0;"
+        sll_stmt = EvaFrameQLParser(sll=True).parse(query)[0]
+        ll_stmt = EvaFrameQLParser(sll=False).parse(query)[0]
+
+        self.assertEqual(ll_stmt.from_table.table_info.table_name,
+                         sll_stmt.from_table.table_info.table_name)
+        self.assertEqual(ll_stmt.where_clause.etype,
+                         sll_stmt.where_clause.etype)
+        self.assertEqual(
+            ll_stmt.where_clause.get_child(1).get_child(1).evaluate(),
+            sll_stmt.where_clause.get_child(1).get_child(1).evaluate())
+
+    def test_sll_parse_should_fall_back_to_ll_on_error(self):
+        parser = EvaFrameQLParser(sll=True)
+        self.assertEqual([], parser.parse("SELECT FROM TAIPAI;"))
+        # the parser is still usable after a failed parse
+        self.assertEqual(1, len(parser.parse("SELECT CLASS FROM TAIPAI;")))
+
 
 if __name__ == '__main__':
     unittest.main()
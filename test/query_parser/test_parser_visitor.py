@@ -11,9 +11,8 @@ class ParserVisitorTest(unittest.TestCase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def test_should_query_specification_visitor(self):
-        EvaParserVisitor.visit = MagicMock()
-        mock_visit = EvaParserVisitor.visit
+    @mock.patch.object(EvaParserVisitor, 'visit')
+    def test_should_query_specification_visitor(self, mock_visit):
         mock_visit.side_effect = ["target",
                                   {"from": ["from"], "where": "where"}]
 
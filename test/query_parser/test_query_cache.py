@@ -0,0 +1,79 @@
+import unittest
+
+from src.expression.abstract_expression import ExpressionType
+from src.query_parser.eva_parser import EvaFrameQLParser
+from src.query_parser.query_cache import QueryCache, normalize_query
+from src.query_planner.seq_scan_plan import SeqScanPlan
+
+
+class CountingParser(EvaFrameQLParser):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def parse(self, query_string: str) -> list:
+        self.calls += 1
+        return super().parse(query_string)
+
+
+class QueryCacheTest(unittest.TestCase):
+
+    def test_normalize_should_replace_literals(self):
+        shape, literals = normalize_query(
+            "SELECT CLASS FROM TRAF20  WHERE CLASS = 'VAN' AND SPEED > 2.5;")
+        self.assertEqual(
+            "SELECT CLASS FROM TRAF20 WHERE CLASS = ?s AND SPEED > ?n;",
+            shape)
+        self.assertEqual(["'VAN'", '2.5'], literals)
+
+    def test_should_share_parse_of_queries_with_same_shape(self):
+        parser = CountingParser()
+        cache = QueryCache(parser=parser)
+        van = cache.parse(
+            "SELECT CLASS FROM TAIPAI WHERE CLASS = 'VAN' AND SPEED > 2.5;")
+        car = cache.parse(
+            "SELECT CLASS FROM TAIPAI WHERE CLASS = 'CAR' AND SPEED > 7.0;")
+
+        self.assertEqual(1, parser.calls)
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+        van_where = van[0].where_clause
+        car_where = car[0].where_clause
+        self.assertEqual(ExpressionType.LOGICAL_AND, car_where.etype)
+        self.assertEqual("'VAN'",
+                         van_where.get_child(0).get_child(1).evaluate())
+        self.assertEqual(2.5, van_where.get_child(1).get_child(1).evaluate())
+        self.assertEqual("'CAR'",
+                         car_where.get_child(0).get_child(1).evaluate())
+        self.assertEqual(7.0, car_where.get_child(1).get_child(1).evaluate())
+
+    def test_should_bind_constants_into_cached_plans(self):
+        def plan_builder(statement):
+            return SeqScanPlan(statement.where_clause, [], [], [])
+
+        cache = QueryCache(plan_builder)
+        van = cache.plan("SELECT CLASS FROM TAIPAI WHERE CLASS = 'VAN';")
+        car = cache.plan("SELECT CLASS FROM TAIPAI WHERE CLASS = 'CAR';")
+        self.assertEqual(1, cache.hits)
+        self.assertEqual("'VAN'", van[0].predicate.get_child(1).evaluate())
+        self.assertEqual("'CAR'", car[0].predicate.get_child(1).evaluate())
+
+    def test_should_not_cache_queries_with_unbound_literals(self):
+        # integer literals are not turned into constants by the parser
+        parser = CountingParser()
+        cache = QueryCache(parser=parser)
+        cache.parse("SELECT CLASS FROM TAIPAI WHERE CLASS = 5;")
+        cache.parse("SELECT CLASS FROM TAIPAI WHERE CLASS = 6;")
+        self.assertEqual(2, parser.calls)
+        self.assertEqual(0, len(cache))
+
+    def test_should_evict_least_recently_used_shape(self):
+        cache = QueryCache(max_size=2)
+        cache.parse("SELECT CLASS FROM A;")
+        cache.parse("SELECT CLASS FROM B;")
+        cache.parse("SELECT CLASS FROM A;")
+        cache.parse("SELECT CLASS FROM C;")
+        self.assertEqual(2, len(cache))
+        cache.parse("SELECT CLASS FROM A;")
+        self.assertEqual(2, cache.hits)
+        cache.parse("SELECT CLASS FROM B;")
+        self.assertEqual(2, cache.hits)
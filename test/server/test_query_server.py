@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.models.storage.batch import FrameBatch
+from src.query_executor.plan_executor import PlanExecutor
+from src.query_parser.eva_parser import EvaFrameQLParser
+from src.query_optimizer.query_optimizer import QueryOptimizer
+from src.query_planner.storage_plan import StoragePlan
+from src.server.query_server import QueryServer, build_scan_plan
+
+NUM_FRAMES = 10
+
+
+def dummy_plan_builder(statement):
+    video = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+    return StoragePlan(video, batch_size=3)
+
+
+class QueryServerTest(unittest.TestCase):
+
+    def create_sample_video(self):
+        try:
+            os.remove('dummy.avi')
+        except FileNotFoundError:
+            pass
+
+        out = cv2.VideoWriter('dummy.avi',
+                              cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'), 10,
+                              (2, 2))
+        for i in range(NUM_FRAMES):
+            frame = np.array(np.ones((2, 2, 3)) * 0.1 * float(i + 1) * 255,
+                             dtype=np.uint8)
+            out.write(frame)
+        out.release()
+
+    def setUp(self):
+        self.create_sample_video()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = QueryServer(max_workers=2,
+                                  plan_builder=dummy_plan_builder)
+        self.loop.run_until_complete(self.server.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.server.close())
+        self.loop.close()
+        os.remove('dummy.avi')
+
+    def run_client(self, commands, until):
+        async def client():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.server.port)
+            for command in commands:
+                writer.write((command + '\n').encode())
+            messages = []
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 30)
+                if not line:
+                    break
+                messages.append(json.loads(line.decode()))
+                if until(messages):
+                    break
+            writer.close()
+            return messages
+
+        return self.loop.run_until_complete(client())
+
+    def test_should_stream_result_frames(self):
+        messages = self.run_client(
+            ["SELECT CLASS FROM TAIPAI;"],
+            lambda m: m[-1].get('status') not in (None, 'accepted'))
+        self.assertEqual({'query_id': 1, 'status': 'accepted'}, messages[0])
+        frames = [f for m in messages[1:-1] for f in m['frames']]
+        self.assertEqual(list(range(NUM_FRAMES)), frames)
+        self.assertEqual({'query_id': 1, 'status': 'done'}, messages[-1])
+
+    def test_should_run_queries_of_a_client_concurrently(self):
+        def finished(messages):
+            return len([m for m in messages
+                        if m.get('status') == 'done']) == 2
+
+        messages = self.run_client(["SELECT CLASS FROM TAIPAI;"] * 2,
+                                   finished)
+        for query_id in (1, 2):
+            frames = [f for m in messages
+                      if m['query_id'] == query_id
+                      for f in m.get('frames', [])]
+            self.assertEqual(list(range(NUM_FRAMES)), frames)
+
+    def test_should_report_parse_errors(self):
+        messages = self.run_client(
+            ["SELECT FROM;"],
+            lambda m: m[-1].get('status') not in (None, 'accepted'))
+        self.assertEqual('error', messages[-1]['status'])
+
+    def test_should_cancel_query(self):
+        produced = []
+        closed = threading.Event()
+
+        def endless_results(executor):
+            try:
+                for i in itertools.count():
+                    produced.append(i)
+                    yield FrameBatch.from_numpy(
+                        np.zeros((1, 1, 1, 3), dtype=np.uint8), None,
+                        np.array([i]))
+            finally:
+                closed.set()
+
+        async def client():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.server.port)
+            writer.write(b"SELECT CLASS FROM TAIPAI;\n")
+            messages = []
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 30)
+                messages.append(json.loads(line.decode()))
+                if 'frames' in messages[-1] and len(messages) == 2:
+                    writer.write(b"CANCEL 1\n")
+                if messages[-1].get('status') not in (None, 'accepted'):
+                    break
+            writer.close()
+            return messages
+
+        with mock.patch.object(PlanExecutor, 'execute_plan_iter',
+                               endless_results):
+            messages = self.loop.run_until_complete(client())
+            self.assertEqual('cancelled', messages[-1]['status'])
+            # the producer was stopped instead of running to completion
+            self.assertTrue(closed.wait(5))
+
+    def test_should_report_predicates_it_can_not_bind(self):
+        statement = EvaFrameQLParser().parse(
+            "SELECT CLASS FROM TAIPAI WHERE CLASS = 'VAN';")[0]
+        with self.assertRaises(ValueError):
+            build_scan_plan(statement)
+
+        server = QueryServer(plan_builder=build_scan_plan)
+        self.loop.run_until_complete(server.start())
+        self.server, server = server, self.server
+        try:
+            messages = self.run_client(
+                ["SELECT CLASS FROM TAIPAI WHERE CLASS = 'VAN';"],
+                lambda m: m[-1].get('status') not in (None, 'accepted'))
+        finally:
+            self.loop.run_until_complete(self.server.close())
+            self.server = server
+        self.assertEqual('error', messages[-1]['status'])
+        self.assertNotIn('frames', messages[-2])
+
+
+class ServeForeverTest(unittest.TestCase):
+
+    def setUp(self):
+        out = cv2.VideoWriter('dummy.avi',
+                              cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'), 10,
+                              (2, 2))
+        for i in range(NUM_FRAMES):
+            out.write(np.full((2, 2, 3), 20 * i, dtype=np.uint8))
+        out.release()
+        # the default plan builder reads the video named in FROM
+        os.replace('dummy.avi', 'TAIPAI')
+
+    def tearDown(self):
+        os.remove('TAIPAI')
+
+    def test_should_serve_queries_from_socket_thread(self):
+        optimizer = QueryOptimizer()
+        thread = threading.Thread(target=optimizer.inputQueriesFromSocket,
+                                  kwargs={'port': 0}, daemon=True)
+        thread.start()
+        for _ in range(100):
+            if optimizer.server is not None and \
+                    optimizer.server.started.wait(0.1):
+                break
+        self.assertTrue(optimizer.server.started.is_set())
+
+        async def client():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', optimizer.server.port)
+            writer.write(b"SELECT CLASS FROM TAIPAI;\n")
+            messages = []
+            while not messages or \
+                    messages[-1].get('status') in (None, 'accepted'):
+                line = await asyncio.wait_for(reader.readline(), 30)
+                messages.append(json.loads(line.decode()))
+            writer.close()
+            return messages
+
+        loop = asyncio.new_event_loop()
+        try:
+            messages = loop.run_until_complete(client())
+        finally:
+            loop.close()
+            optimizer.server.stop()
+            thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual('done', messages[-1]['status'])
+        self.assertEqual(list(range(NUM_FRAMES)),
+                         [f for m in messages for f in m.get('frames', [])])
@@ -0,0 +1,137 @@
+import unittest
+from unittest import mock
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.query_optimizer.cost_based_optimizer import CostBasedOptimizer, \
+    CostModel
+from src.query_optimizer.query_optimizer import QueryOptimizer
+from src.query_planner.types import PlanNodeType
+from src.udfs.label_index import LabelIndex
+
+
+def label_equals(label):
+    return ComparisonExpression(ExpressionType.COMPARE_EQUAL,
+                                TupleValueExpression(col_name='CLASS'),
+                                ConstantValueExpression("'%s'" % label))
+
+
+def node_types(plan):
+    types = []
+    while plan is not None:
+        types.append(plan.node_type)
+        plan = plan.children[0] if plan.children else None
+    return types
+
+
+class CostBasedOptimizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.video = VideoMetaInfo('dummy.avi', 10, VideoFormat.MPEG)
+        self.cost_model = CostModel(decode_cost=0.01, udf_cost=0.1)
+        self.predicate = label_equals('van')
+
+    def test_should_pick_full_scan_without_alternatives(self):
+        optimizer = CostBasedOptimizer(self.cost_model)
+        plans = optimizer.enumerate_plans(self.video, self.predicate,
+                                          limit=100)
+        self.assertEqual(1, len(plans))
+        cost, plan = plans[0]
+        self.assertAlmostEqual(1.0, cost.decode)
+        self.assertAlmostEqual(10.0, cost.udf)
+        self.assertEqual([PlanNodeType.SEQUENTIAL_SCAN_TYPE,
+                          PlanNodeType.STORAGE_PLAN], node_types(plan))
+
+    def test_should_pick_cheapest_accurate_pp(self):
+        pps = [(label_equals('van'), {'C': 0.001, 'R': 0.5, 'A': 0.95}),
+               (label_equals('van'), {'C': 0.001, 'R': 0.9, 'A': 0.8}),
+               (label_equals('van'), {'C': 0.002, 'R': 0.7, 'A': 0.92})]
+        optimizer = CostBasedOptimizer(self.cost_model, pps=pps)
+        plans = optimizer.enumerate_plans(self.video, self.predicate,
+                                          limit=100)
+        # the PP below the accuracy budget is not considered
+        self.assertEqual(3, len(plans))
+
+        plan = optimizer.optimize(self.video, self.predicate, limit=100)
+        self.assertEqual([PlanNodeType.SEQUENTIAL_SCAN_TYPE,
+                          PlanNodeType.PP_FILTER_TYPE,
+                          PlanNodeType.STORAGE_PLAN], node_types(plan))
+        self.assertIs(pps[2][0], plan.children[0].predicate)
+
+    def test_should_skip_pp_costlier_than_it_saves(self):
+        pps = [(label_equals('van'), {'C': 0.2, 'R': 0.5, 'A': 0.95})]
+        optimizer = CostBasedOptimizer(self.cost_model, pps=pps)
+        plan = optimizer.optimize(self.video, self.predicate, limit=100)
+        self.assertEqual(PlanNodeType.STORAGE_PLAN,
+                         plan.children[0].node_type)
+
+    @mock.patch.object(CostBasedOptimizer, '_video_length',
+                       return_value=100)
+    def test_should_answer_from_label_index_when_frames_not_needed(self, _):
+        index = LabelIndex('CLASS')
+        index.add_labels((i, ['van'] if i % 4 == 0 else ['car'], [0.9])
+                         for i in range(100))
+        optimizer = CostBasedOptimizer(self.cost_model, label_index=index)
+
+        plan = optimizer.optimize(self.video, self.predicate,
+                                  need_frames=False)
+        self.assertEqual([PlanNodeType.LABEL_INDEX_SCAN], node_types(plan))
+        cost = optimizer.enumerate_plans(self.video, self.predicate,
+                                         need_frames=False)[-1][0]
+        self.assertAlmostEqual(0.25, cost.selectivity)
+
+        plan = optimizer.optimize(self.video, self.predicate)
+        self.assertEqual(PlanNodeType.SEQUENTIAL_SCAN_TYPE, plan.node_type)
+
+        # frames outside of the index can not be answered from it
+        plan = optimizer.optimize(self.video, self.predicate, limit=200,
+                                  need_frames=False)
+        self.assertEqual(PlanNodeType.SEQUENTIAL_SCAN_TYPE, plan.node_type)
+
+    @mock.patch.object(CostBasedOptimizer, '_video_length', return_value=50)
+    def test_should_not_use_label_index_covering_part_of_video(self, _):
+        index = LabelIndex('CLASS')
+        index.add_labels((i, ['van'], [0.9]) for i in range(10))
+        optimizer = CostBasedOptimizer(self.cost_model, label_index=index)
+
+        plans = optimizer.enumerate_plans(self.video, self.predicate,
+                                          need_frames=False)
+        self.assertEqual([PlanNodeType.SEQUENTIAL_SCAN_TYPE],
+                         [plan.node_type for _, plan in plans])
+        self.assertAlmostEqual(0.5, plans[0][0].decode)
+
+        plan = optimizer.optimize(self.video, self.predicate, limit=10,
+                                  need_frames=False)
+        self.assertEqual([PlanNodeType.LABEL_INDEX_SCAN], node_types(plan))
+
+    def test_query_optimizer_plan_depends_on_costs_and_selectivity(self):
+        pp_predicates = {'t=van': {'svm': label_equals('van')}}
+        pp_stats = {'t=van': {'svm': {'C': 0.02, 'R': 0.8, 'A': 0.95}}}
+        full_scan = [PlanNodeType.SEQUENTIAL_SCAN_TYPE,
+                     PlanNodeType.STORAGE_PLAN]
+        pp_scan = [PlanNodeType.SEQUENTIAL_SCAN_TYPE,
+                   PlanNodeType.PP_FILTER_TYPE, PlanNodeType.STORAGE_PLAN]
+
+        def plan(udf_cost, label_index=None):
+            return node_types(QueryOptimizer().plan_scan(
+                self.video, self.predicate, pp_predicates, pp_stats,
+                cost_model=CostModel(decode_cost=0.01, udf_cost=udf_cost),
+                label_index=label_index, limit=100))
+
+        # the PP only pays off when the UDF is expensive
+        self.assertEqual(pp_scan, plan(0.1))
+        self.assertEqual(full_scan, plan(0.005))
+
+        # it can not drop the frames satisfying the predicate, so it does
+        # not pay off on a video where most frames are vans
+        rare, frequent = LabelIndex('CLASS'), LabelIndex('CLASS')
+        rare.add_labels((i, ['van'] if i % 10 == 0 else ['car'], [0.9])
+                        for i in range(100))
+        frequent.add_labels((i, ['car'] if i % 10 == 0 else ['van'], [0.9])
+                            for i in range(100))
+        self.assertEqual(pp_scan, plan(0.1, rare))
+        self.assertEqual(full_scan, plan(0.1, frequent))
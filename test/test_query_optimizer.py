@@ -1,11 +1,15 @@
 import os
 import sys
 
+import numpy as np
+
 root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 try:
+    from src import constants
     from src.query_optimizer.query_optimizer import QueryOptimizer
 except ImportError:
     sys.path.append(root)
+    from src import constants
     from src.query_optimizer.query_optimizer import QueryOptimizer
 
 obj = QueryOptimizer()
@@ -78,5 +82,73 @@ def test_convertL2S():
     # assert True
 
 
+label_desc = {"t": [constants.DISCRETE, ["car", "bus", "van"]],
+              "s": [constants.CONTINUOUS, [40, 50, 60]]}
+
+
+def test_compute_expression_respects_accuracy_budget():
+    pp_stats = {"t=van": {"svm": {"R": 0.3, "C": 0.1, "A": 0.95},
+                          "dnn": {"R": 0.5, "C": 0.2, "A": 0.8}},
+                "s>60": {"svm": {"R": 0.2, "C": 0.1, "A": 0.94}}}
+    pps, ops, reduction = obj.run("t=van && s>60", list(pp_stats),
+                                  pp_stats, label_desc,
+                                  accuracy_budget=0.9)
+    # t=van/svm && s>60/svm is 0.893 accurate, only one PP fits the budget
+    assert pps == [("t=van", "svm")]
+    assert ops == []
+    assert abs(reduction - 0.3) < 1e-9
+
+    pps, ops, reduction = obj.run("t=van && s>60", list(pp_stats),
+                                  pp_stats, label_desc,
+                                  accuracy_budget=0.85)
+    assert sorted(pps) == [("s>60", "svm"), ("t=van", "svm")]
+    assert ops == [np.logical_and]
+    assert abs(reduction - (1 - 0.7 * 0.8)) < 1e-9
+
+
+def test_compute_expression_orders_conjuncts_by_cost_over_reduction():
+    pp_stats = {"t=van": {"svm": {"R": 0.2, "C": 0.4, "A": 1.0}},
+                "s>60": {"svm": {"R": 0.4, "C": 0.1, "A": 1.0}}}
+    pps, ops, _ = obj.run("t=van && s>60", list(pp_stats), pp_stats,
+                          label_desc)
+    assert pps == [("s>60", "svm"), ("t=van", "svm")]
+
+
+def test_compute_expression_uses_disjunction_for_not_equal():
+    pp_stats = {"t=car": {"svm": {"R": 0.5, "C": 0.1, "A": 0.99}},
+                "t=bus": {"svm": {"R": 0.4, "C": 0.1, "A": 0.99}}}
+    pps, ops, reduction = obj.run("t!=van", list(pp_stats), pp_stats,
+                                  label_desc)
+    assert sorted(pps) == [("t=bus", "svm"), ("t=car", "svm")]
+    assert ops == [np.logical_or]
+    assert abs(reduction - 0.2) < 1e-9
+
+
+def test_compute_expression_limits_number_of_pps():
+    pp_stats = {"t=van": {"svm": {"R": 0.3, "C": 0.1, "A": 1.0}},
+                "s>60": {"svm": {"R": 0.2, "C": 0.1, "A": 1.0}}}
+    pps, _, _ = obj.run("t=van && s>60", list(pp_stats), pp_stats,
+                        label_desc, k=1)
+    assert pps == [("t=van", "svm")]
+
+
+def test_compute_expression_trades_reduction_for_cost_with_udf_cost():
+    pp_stats = {"t=van": {"cheap": {"R": 0.3, "C": 0.01, "A": 1.0},
+                          "slow": {"R": 0.35, "C": 0.5, "A": 1.0}}}
+    pps, _, _ = obj.run("t=van", list(pp_stats), pp_stats, label_desc)
+    assert pps == [("t=van", "slow")]
+    pps, _, _ = obj.run("t=van", list(pp_stats), pp_stats, label_desc,
+                        udf_cost=1.0)
+    assert pps == [("t=van", "cheap")]
+
+
+def test_find_model_trades_reduction_for_cost_with_udf_cost():
+    pp_stats = {"t=van": {"cheap": {"R": 0.3, "C": 0.01, "A": 1.0},
+                          "slow": {"R": 0.9, "C": 0.05, "A": 1.0}}}
+    assert obj._find_model("t=van", pp_stats, 0.9) == ("cheap", 0.3)
+    assert obj._find_model("t=van", pp_stats, 0.9, udf_cost=1.0) == \
+        ("slow", 0.9)
+
+
 # test_parseQuery()
 # test_convertL2S()
@@ -1,15 +1,17 @@
 import os
 import sys
 
+import numpy as np
+
 root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 image_dir = root + "/test/data/small-data"
 anno_dir = root + "/test/data/small-annotations"
 
 try:
-    from src.loaders.loader_uadetrac import UADetracLoader
+    from src.loaders.loader_uadetrac import UADetracLoader, get_parser
 except ImportError:
     sys.path.append(root)
-    from src.loaders.loader_uadetrac import UADetracLoader
+    from src.loaders.loader_uadetrac import UADetracLoader, get_parser
 
 
 def test_load_images():
@@ -50,3 +52,53 @@ def test_load_boxes():
     right = int((592.75 + 160.05) * width_scale)
     box = (top, left, bottom, right)
     assert loader.boxes[0][0] == box
+
+
+def test_load_images_into_memory_map(tmpdir):
+    args = get_parser().parse_args(['--cache_path', str(tmpdir)])
+    in_memory = UADetracLoader(None, 400, 400).load_images(image_dir)
+
+    loader = UADetracLoader(args, 400, 400)
+    cache_file = os.path.join(str(tmpdir), args.cache_image_name)
+    images = loader.load_images(image_dir, cache_file=cache_file)
+    assert isinstance(images, np.memmap)
+    np.testing.assert_array_equal(images, in_memory)
+
+    loader.save_images()
+    cached_loader = UADetracLoader(args, 400, 400)
+    cached = cached_loader.load_cached_images()
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, in_memory)
+
+    # boxes are saved along with memory-mapped images
+    boxes = cached_loader.load_boxes(anno_dir)
+    cached_loader.save_boxes()
+    cached_boxes = UADetracLoader(args, 400, 400).load_cached_boxes()
+    assert cached_boxes.tolist() == boxes.tolist()
+
+
+def test_load_images_in_parallel():
+    serial = UADetracLoader(None, 400, 400).load_images(image_dir)
+    loader = UADetracLoader(None, 400, 400, num_workers=4)
+    np.testing.assert_array_equal(loader.load_images(image_dir), serial)
+
+
+def test_load_cached_labels(tmpdir):
+    args = get_parser().parse_args(['--cache_path', str(tmpdir)])
+    loader = UADetracLoader(args, 400, 400)
+    loader.load_images(image_dir)
+    labels = loader.load_labels(anno_dir)
+    loader.save_labels()
+
+    columns = loader.get_label_columns()
+
+    cached_loader = UADetracLoader(args, 400, 400)
+    table = cached_loader.load_cached_labels()
+    assert isinstance(table.vehicle_type, np.memmap)
+    assert cached_loader.labels is None
+    cached_columns = cached_loader.get_label_columns()
+    assert cached_columns['num_frames'] == columns['num_frames']
+    for name in ['vehicle_type', 'color', 'speed', 'intersection']:
+        for actual, expected in zip(cached_columns[name], columns[name]):
+            np.testing.assert_array_equal(actual, expected)
+    assert cached_loader.labels_as_lists() == labels
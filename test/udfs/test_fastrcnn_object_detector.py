@@ -2,6 +2,9 @@ import os
 import unittest
 
 import cv2
+import numpy as np
+import torch
+from unittest.mock import patch
 
 from src.models.storage.batch import FrameBatch
 from src.models.storage.frame import Frame
@@ -32,3 +35,54 @@ class FastRCNNObjectDetectorTest(unittest.TestCase):
 
         self.assertEqual(["dog"], result[0].labels)
         self.assertEqual(["cat", "dog"], result[1].labels)
+
+    @patch('src.udfs.fastrcnn_object_detector.torchvision.models.detection'
+           '.fasterrcnn_resnet50_fpn')
+    def test_should_threshold_predictions_of_the_whole_batch(self,
+                                                             mock_model):
+        def model(images):
+            self.assertFalse(torch.is_grad_enabled())
+            self.assertEqual([(3, 2, 4)] * 2,
+                             [tuple(image.shape) for image in images])
+            self.assertEqual(1.0, float(images[1].max()))
+            return [{'labels': torch.tensor([18, 17]),
+                     'scores': torch.tensor([0.9, 0.3]),
+                     'boxes': torch.tensor([[0., 0., 1., 1.],
+                                            [1., 1., 2., 2.]])},
+                    {'labels': torch.tensor([17]),
+                     'scores': torch.tensor([0.2]),
+                     'boxes': torch.tensor([[0., 0., 1., 1.]])}]
+
+        mock_model.return_value.side_effect = model
+        frames = np.zeros((2, 2, 4, 3), dtype=np.uint8)
+        frames[1] = 255
+        frame_batch = FrameBatch.from_numpy(frames, None)
+        detector = FastRCNNObjectDetector(threshold=0.5)
+        result = detector.classify(frame_batch)
+
+        self.assertEqual(["dog"], result[0].labels)
+        self.assertAlmostEqual(0.9, result[0].scores[0], places=5)
+        self.assertEqual(1.0, result[0].boxes[0].bottom_right.x)
+        self.assertEqual([], result[1].labels)
+
+    @patch('src.udfs.fastrcnn_object_detector.torchvision.models.detection'
+           '.fasterrcnn_resnet50_fpn')
+    def test_should_only_set_num_threads_while_classifying(self, mock_model):
+        threads = torch.get_num_threads()
+        num_threads = 1 if threads > 1 else 2
+
+        def model(images):
+            self.assertEqual(num_threads, torch.get_num_threads())
+            return [{'labels': torch.tensor([], dtype=torch.int64),
+                     'scores': torch.tensor([]),
+                     'boxes': torch.zeros((0, 4))} for _ in images]
+
+        mock_model.return_value.side_effect = model
+        detector = FastRCNNObjectDetector(num_threads=num_threads)
+        self.assertEqual(threads, torch.get_num_threads())
+
+        frames = np.zeros((2, 2, 4, 3), dtype=np.uint8)
+        result = detector.classify(FrameBatch.from_numpy(frames, None))
+        self.assertEqual([[], []], [prediction.labels
+                                    for prediction in result])
+        self.assertEqual(threads, torch.get_num_threads())
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.inference.classifier_prediction import Prediction
+from src.models.storage.batch import FrameBatch
+from src.models.storage.frame import Frame
+from src.udfs.label_index import LabelIndex
+from src.udfs.udf_cache import UDFResultCache
+
+LABELS = [['car'], ['bus', 'car'], [], ['van'], ['car'], ['bus'], [],
+          ['van', 'car'], ['car'], ['bus']]
+
+
+def label_equals(label, etype=ExpressionType.COMPARE_EQUAL):
+    return ComparisonExpression(etype,
+                                TupleValueExpression(col_name='CLASS'),
+                                ConstantValueExpression("'%s'" % label))
+
+
+def expected_frames(condition):
+    return [i for i, labels in enumerate(LABELS) if condition(labels)]
+
+
+class LabelIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        batch = FrameBatch([Frame(i, np.ones((1, 1)), None)
+                            for i in range(len(LABELS))], None)
+        self.predictions = Prediction.predictions_from_batch_and_lists(
+            batch, LABELS, [[0.6 + 0.01 * i] * len(labels)
+                            for i, labels in enumerate(LABELS)])
+        self.index = LabelIndex('CLASS')
+        self.index.add(self.predictions)
+
+    def frames(self, predicate):
+        return list(self.index.frame_ids(self.index.evaluate(predicate)))
+
+    def test_should_answer_equality(self):
+        self.assertEqual(expected_frames(lambda x: 'car' in x),
+                         self.frames(label_equals('car')))
+        self.assertEqual(expected_frames(lambda x: 'car' not in x),
+                         self.frames(label_equals(
+                             'car', ExpressionType.COMPARE_NEQ)))
+        self.assertEqual([], self.frames(label_equals('truck')))
+
+    def test_should_answer_logical_combinations(self):
+        both = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                 label_equals('car'), label_equals('bus'))
+        either = LogicalExpression(ExpressionType.LOGICAL_OR,
+                                   label_equals('van'), label_equals('bus'))
+        negated = LogicalExpression(ExpressionType.LOGICAL_NOT,
+                                    label_equals('car'), None)
+        self.assertEqual(
+            expected_frames(lambda x: 'car' in x and 'bus' in x),
+            self.frames(both))
+        self.assertEqual(
+            expected_frames(lambda x: 'van' in x or 'bus' in x),
+            self.frames(either))
+        self.assertEqual(expected_frames(lambda x: 'car' not in x),
+                         self.frames(negated))
+
+    def test_should_not_answer_other_predicates(self):
+        other_column = ComparisonExpression(
+            ExpressionType.COMPARE_EQUAL,
+            TupleValueExpression(col_name='COLOR'),
+            ConstantValueExpression("'red'"))
+        greater = label_equals('car', ExpressionType.COMPARE_GREATER)
+        self.assertIsNone(self.index.evaluate(other_column))
+        self.assertIsNone(self.index.evaluate(greater))
+        self.assertIsNone(self.index.evaluate(
+            LogicalExpression(ExpressionType.LOGICAL_AND,
+                              label_equals('car'), other_column)))
+
+    def test_should_use_score_ranges(self):
+        low, high = self.index.score_range('car')
+        self.assertAlmostEqual(0.6, low)
+        self.assertAlmostEqual(0.68, high)
+        self.assertIsNotNone(self.index.evaluate(label_equals('car'), 0.5))
+        self.assertIsNone(self.index.evaluate(label_equals('car'), 0.65))
+
+    def test_should_track_indexed_frames(self):
+        index = LabelIndex('CLASS')
+        index.add(self.predictions[2:6])
+        self.assertTrue(index.covers(2, 6))
+        self.assertFalse(index.covers(0, 6))
+        self.assertFalse(index.covers(2, 7))
+        self.assertEqual([4], list(index.frame_ids(
+            index.evaluate(label_equals('car')))))
+
+    def test_should_reindex_frames(self):
+        batch = FrameBatch([Frame(0, np.ones((1, 1)), None)], None)
+        self.index.add(Prediction.predictions_from_batch_and_lists(
+            batch, [['bus']], [[0.9]]))
+        self.assertEqual(expected_frames(lambda x: 'car' in x)[1:],
+                         self.frames(label_equals('car')))
+        self.assertEqual([0] + expected_frames(lambda x: 'bus' in x),
+                         self.frames(label_equals('bus')))
+
+    def test_should_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'index.npz')
+            self.index.save(path)
+            loaded = LabelIndex.load(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual('CLASS', loaded.column)
+        self.assertEqual(sorted(self.index.labels), sorted(loaded.labels))
+        self.assertEqual(self.frames(label_equals('van')),
+                         list(loaded.frame_ids(
+                             loaded.evaluate(label_equals('van')))))
+        self.assertEqual(self.index.score_range('bus'),
+                         loaded.score_range('bus'))
+
+    def test_should_build_from_udf_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = UDFResultCache(os.path.join(directory, 'udf_cache.db'))
+            cache.put('dummy.avi', 'detector', 'v1', self.predictions)
+            index = LabelIndex.from_cache(cache, 'dummy.avi', 'detector',
+                                          'v1', column='CLASS')
+            cache.close()
+        finally:
+            shutil.rmtree(directory)
+        self.assertTrue(index.covers(0, len(LABELS)))
+        self.assertEqual(self.frames(label_equals('bus')),
+                         list(index.frame_ids(
+                             index.evaluate(label_equals('bus')))))
@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.expression.function_expression import FunctionExpression
+from src.models.catalog.properties import VideoFormat
+from src.models.catalog.video_info import VideoMetaInfo
+from src.models.inference.classifier_prediction import Prediction
+from src.models.inference.representation import BoundingBox, Point
+from src.models.storage.batch import FrameBatch
+from src.models.storage.frame import Frame
+from src.query_executor.plan_executor import PlanExecutor
+from src.query_planner.seq_scan_plan import SeqScanPlan
+from src.query_planner.storage_plan import StoragePlan
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.udfs.udf_cache import UDFResultCache, CachedClassifierUDF
+
+
+class DummyClassifier(AbstractClassifierUDF):
+    name = 'dummy'
+    version = 'v1'
+    labels = ['car', 'bus']
+    input_format = None
+
+    def __init__(self):
+        super().__init__()
+        self.classified = []
+
+    def classify(self, batch):
+        self.classified.append([frame.index for frame in batch.frames])
+        return Prediction.predictions_from_batch_and_lists(
+            batch,
+            [['car'] for _ in batch.frames],
+            [[0.5] for _ in batch.frames],
+            boxes=[[BoundingBox(Point(0, 0), Point(frame.index, 1))]
+                   for frame in batch.frames])
+
+
+class UDFResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'udf_cache.db')
+        self.video = VideoMetaInfo('dummy.avi', 10, VideoFormat.AVI)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_batch(self, indices):
+        return FrameBatch([Frame(i, np.ones((1, 1)), None) for i in indices],
+                          None)
+
+    def test_should_only_classify_frames_missing_in_cache(self):
+        classifier = DummyClassifier()
+        cache = UDFResultCache(self.path)
+        udf = CachedClassifierUDF(classifier, self.video, cache)
+
+        expected = classifier.classify(self.create_batch([1, 2]))
+        udf(self.create_batch([1, 2]))
+        actual = udf(self.create_batch([1, 2, 3]))
+
+        self.assertEqual([[1, 2], [1, 2], [3]], classifier.classified)
+        self.assertEqual(expected, actual[:2])
+        self.assertEqual(3, len(cache))
+        cache.close()
+
+    def test_cache_should_persist_across_instances(self):
+        cache = UDFResultCache(self.path)
+        cache.put('dummy.avi', 'dummy', 'v1',
+                  DummyClassifier().classify(self.create_batch([4])))
+        cache.close()
+
+        cache = UDFResultCache(self.path)
+        batch = self.create_batch([4, 5])
+        predictions = cache.get('dummy.avi', 'dummy', 'v1', batch)
+        self.assertEqual(['car'], predictions[0].labels)
+        self.assertIs(batch.frames[0], predictions[0].frame)
+        self.assertIsNone(predictions[1])
+        self.assertEqual([None, None],
+                         cache.get('dummy.avi', 'dummy', 'v2', batch))
+        cache.close()
+
+    def test_should_evict_least_recently_used_predictions(self):
+        classifier = DummyClassifier()
+        predictions = classifier.classify(self.create_batch([1, 2, 3]))
+        size = len(UDFResultCache._serialize(predictions[0]))
+        cache = UDFResultCache(self.path, max_size=2 * size)
+
+        cache.put('dummy.avi', 'dummy', 'v1', predictions[:2])
+        cache.get('dummy.avi', 'dummy', 'v1', self.create_batch([1]))
+        cache.put('dummy.avi', 'dummy', 'v1', predictions[2:])
+
+        found = cache.get('dummy.avi', 'dummy', 'v1',
+                          self.create_batch([1, 2, 3]))
+        self.assertEqual([True, False, True],
+                         [prediction is not None for prediction in found])
+        cache.close()
+
+    def test_should_evict_writes_of_other_instances(self):
+        predictions = DummyClassifier().classify(
+            self.create_batch([1, 2, 3]))
+        size = len(UDFResultCache._serialize(predictions[0]))
+        first = UDFResultCache(self.path, max_size=2 * size)
+        second = UDFResultCache(self.path, max_size=2 * size)
+
+        first.put('dummy.avi', 'dummy', 'v1', predictions[:2])
+        second.put('dummy.avi', 'dummy', 'v1', predictions[2:])
+
+        found = first.get('dummy.avi', 'dummy', 'v1',
+                          self.create_batch([1, 2, 3]))
+        self.assertEqual([False, True, True],
+                         [prediction is not None for prediction in found])
+        first.close()
+        second.close()
+
+    def test_should_store_predictions_as_json(self):
+        cache = UDFResultCache(self.path)
+        cache.QUERY_CHUNK = 2
+        cache.put('dummy.avi', 'dummy', 'v1',
+                  DummyClassifier().classify(self.create_batch(range(5))))
+        found = cache.get('dummy.avi', 'dummy', 'v1',
+                          self.create_batch(range(6)))
+        self.assertEqual([4, 1], [found[4].boxes[0].bottom_right.x,
+                                  found[4].boxes[0].bottom_right.y])
+        self.assertIsNone(found[5])
+        cache.close()
+
+        connection = sqlite3.connect(self.path)
+        value, = connection.execute(
+            'SELECT value FROM udf_predictions WHERE frame=4').fetchone()
+        connection.close()
+        self.assertEqual([['car'], [0.5], [[0, 0, 4, 1]]], json.loads(value))
+
+    def test_should_not_classify_again_when_query_is_rerun(self):
+        path = os.path.join(self.directory, 'dummy.avi')
+        out = cv2.VideoWriter(path,
+                              cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'), 10,
+                              (2, 2))
+        for i in range(10):
+            out.write(np.full((2, 2, 3), 20 * i, dtype=np.uint8))
+        out.release()
+        video = VideoMetaInfo(path, 10, VideoFormat.AVI)
+        classifier = DummyClassifier()
+        cache = UDFResultCache(self.path)
+
+        def run_query():
+            udf = FunctionExpression(classifier, video=video,
+                                     udf_cache=cache)
+            predicate = FunctionExpression(
+                lambda predictions: [prediction.frame.index % 2 == 0
+                                     for prediction in predictions],
+                children=[udf])
+            seq_scan = SeqScanPlan(predicate, [], [], [])
+            seq_scan.append_child(StoragePlan(video, batch_size=4))
+            return [index for batch in
+                    PlanExecutor(seq_scan).execute_plan_iter()
+                    for index in batch.indices]
+
+        self.assertEqual([0, 2, 4, 6, 8], run_query())
+        self.assertEqual([[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]],
+                         classifier.classified)
+        self.assertEqual([0, 2, 4, 6, 8], run_query())
+        self.assertEqual(3, len(classifier.classified))
+        cache.close()
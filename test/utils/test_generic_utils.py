@@ -0,0 +1,31 @@
+import unittest
+
+from src.utils.generic_utils import prefetch
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_should_yield_all_items_in_order(self):
+        self.assertEqual(list(range(10)), list(prefetch(range(10), 2)))
+
+    def test_should_reraise_producer_exception(self):
+        def failing():
+            yield 1
+            raise ValueError('decode failed')
+
+        items = prefetch(failing(), 1)
+        self.assertEqual(1, next(items))
+        self.assertRaises(ValueError, lambda: next(items))
+
+    def test_closing_should_stop_the_producer(self):
+        produced = []
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        items = prefetch(source(), 1)
+        self.assertEqual(0, next(items))
+        items.close()
+        self.assertLess(len(produced), 100)